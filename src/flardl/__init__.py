@@ -10,6 +10,7 @@ from .common import NOBS
 from .common import RAVG
 from .common import TOTAL
 from .common import VALUE
+from .launch_controller import LaunchController
 from .multidispatcher import MultiDispatcher
 from .server_defs import ServerDef
 from .stream_stats import StreamStats
@@ -0,0 +1,119 @@
+"""Lazy reading of arguments from iterables, async iterables, and files."""
+
+import inspect
+import os
+from collections.abc import AsyncIterable
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+from .common import DEFAULT_ARG_BUFFER
+from .common import FILENAME_KEY
+from .common import INDEX_KEY
+from .common import PATH_KEY
+from .common import SIMPLE_TYPES
+from .dict_to_indexed_list import NonStringIterable
+from .dict_to_indexed_list import zip_dict_to_indexed_list
+
+
+ARG_SOURCE_TYPE = Union[
+    Iterable[dict[str, SIMPLE_TYPES]],
+    AsyncIterable[dict[str, SIMPLE_TYPES]],
+    dict[str, Union[NonStringIterable, SIMPLE_TYPES]],
+    str,
+    os.PathLike,
+]
+
+
+def read_path_file(
+    path_file: Union[str, os.PathLike],
+) -> Iterator[dict[str, SIMPLE_TYPES]]:
+    """Generate indexed arguments from a file of paths, one per line.
+
+    Output files are named by the last component of the path.
+    """
+    with Path(path_file).open() as fh:
+        idx = 0
+        for line in fh:
+            path = line.strip()
+            if not path:
+                continue
+            yield {INDEX_KEY: idx, PATH_KEY: path, FILENAME_KEY: Path(path).name}
+            idx += 1
+
+
+class ArgumentSource:
+    """Pull arguments on demand from any supported source.
+
+    A dictionary is zipped on its iterable values, a path, whether a
+    string or path-like, is read as a file of paths, and iterables
+    and async iterables are expected to yield indexed dictionaries.
+    Arguments for which skip returns True are counted and passed to
+    on_skip, if given, as they are read instead of being returned.
+    """
+
+    def __init__(
+        self,
+        source: ARG_SOURCE_TYPE,
+        skip: Optional[Callable[[dict[str, SIMPLE_TYPES]], bool]] = None,
+        on_skip: Optional[
+            Callable[[dict[str, SIMPLE_TYPES]], Optional[Awaitable[None]]]
+        ] = None,
+    ):
+        """Init iterator over source."""
+        self._iter: Optional[Iterator[dict[str, SIMPLE_TYPES]]] = None
+        self._aiter: Optional[AsyncIterator[dict[str, SIMPLE_TYPES]]] = None
+        if isinstance(source, dict):
+            self._iter = zip_dict_to_indexed_list(source)
+        elif isinstance(source, (str, os.PathLike)):
+            self._iter = read_path_file(source)
+        elif isinstance(source, AsyncIterable):
+            self._aiter = source.__aiter__()
+        else:
+            self._iter = iter(source)
+        self.skip = skip
+        self.on_skip = on_skip
+        self.n_skipped = 0
+        self.n_read = 0
+        self.exhausted = False
+
+    async def _next(self) -> dict[str, SIMPLE_TYPES]:
+        """Return next argument, raising StopAsyncIteration at the end."""
+        if self._aiter is not None:
+            return await self._aiter.__anext__()
+        try:
+            return next(self._iter)  # type: ignore[arg-type]
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def read(self, n: int) -> list[dict[str, SIMPLE_TYPES]]:
+        """Return up to n arguments, fewer only if the source is exhausted."""
+        arg_list: list[dict[str, SIMPLE_TYPES]] = []
+        while len(arg_list) < n and not self.exhausted:
+            try:
+                args = await self._next()
+            except StopAsyncIteration:
+                self.exhausted = True
+                break
+            self.n_read += 1
+            if self.skip is not None and self.skip(args):
+                self.n_skipped += 1
+                if self.on_skip is not None:
+                    skipped = self.on_skip(args)
+                    if inspect.isawaitable(skipped):
+                        await skipped
+            else:
+                arg_list.append(args)
+        return arg_list
+
+    async def read_all(self) -> list[dict[str, SIMPLE_TYPES]]:
+        """Return all remaining arguments."""
+        arg_list: list[dict[str, SIMPLE_TYPES]] = []
+        while not self.exhausted:
+            arg_list += await self.read(DEFAULT_ARG_BUFFER)
+        return arg_list
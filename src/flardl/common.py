@@ -15,10 +15,16 @@ import numpy as np
 ALL = "all"
 AVG = "avg"
 HIST = "history"
+FILENAME_KEY = "out_filename"
 INDEX_KEY = "idx"
+PATH_KEY = "path"
 MAX = "maximum"
 MIN = "minimum"
+MODE = "mode"
 NOBS = "n_obs"
+P50 = "p50"
+P95 = "p95"
+P99 = "p99"
 RAVG = "r_avg"
 TOTAL = "total"
 VALUE = "value"
@@ -33,7 +39,12 @@ STAT_SUBLABELS = {
     NOBS: "# ",
     HIST: "history ",
     RAVG: "rolling average ",
+    MODE: "modal ",
+    P50: "median ",
+    P95: "95th-percentile ",
+    P99: "99th-percentile ",
 }
+QUANTILES = {P50: 0.5, P95: 0.95, P99: 0.99}
 DEFAULT_ROUNDING = 2  # digits after decimal
 DEFAULT_MAX_RETRIES = 0
 TIME_ROUNDING = 1  # digits, milliseconds
@@ -44,6 +55,43 @@ RANDOM_SEED = 87507
 DEFAULT_ZIPF_EXPONENT = 1.5  # more divergent as it gets closer to 1
 DEFAULT_ZIPF_SCALE = 1000
 DEFAULT_ZIPF_MIN = 1024
+DEFAULT_MODAL_SIZE = 128 * 1024  # bytes, modal file size if not given
+DEFAULT_BW_MAX_MBPS = 0.0  # maximum permitted download rate, Mbit/s, 0 if unlimited
+NAIVE_BW_MBPS = 1000.0  # download rate for launch rates if B_max is unlimited, Mbit/s
+DEFAULT_N_MIN = 10  # retirements needed to characterize a server
+DEFAULT_HISTORY_LEN = 100  # per-server observations kept for modal estimates
+LAUNCH_RATE_MAX = 100.0  # launches per second, per server
+LAUNCH_RATE_MIN = 0.1  # launches per second, per server
+BW_WINDOW = 1000.0  # milliseconds for current bandwidth estimate
+DEFAULT_QUEUE_DEPTH = 8  # per-server D_max if not set in ServerDef
+HOL_FACTOR = 2.0  # modal service-time ratio signalling head-of-line blocking
+REJECTION_CODES = (429, 503)  # HTTP status codes that lower D_max
+REJECTION_HOLDOFF = 1000.0  # milliseconds after a D_max cut before another
+DEPTH_RECOVERY_N = 20  # clean retirements per unit recovery of a cut D_max
+BW_BURST_TIME = 0.1  # seconds of traffic allowed in a burst by rate shaping
+DEFAULT_CHUNK_SIZE = 64 * 1024  # bytes per streamed chunk
+PARTIAL_SUFFIX = ".part"  # suffix of files being streamed to
+JOURNAL_SUFFIX = ".journal"  # suffix of journal kept with a partial file
+CRAPPIE_CUTOFF = 2.0  # multiple of modal file size above which files are whales
+MANIFEST_FILE = ".flardl_manifest.json"  # validators of files in output dir
+DEFAULT_ARG_BUFFER = 1000  # arguments read ahead of launch from lazy sources
+DEFAULT_STORE_CAPACITY = 1024  # initial rows in columnar result store
+MODE_BIN_WIDTH = 0.1  # natural-log units, about 10% resolution
+TIME_FIT_DECAY = 0.99  # per-observation weight decay in Equation-of-Time fit
+HOL_RESIDUAL_FACTOR = 3.0  # residual scales above fit flagging head-of-line
+SATURATION_FRACTION = 0.95  # fraction of B_eff reached at D_sat
+SATURATION_REFIT_OBS = 16  # observations added between saturation refits
+PROFILE_HALF_LIFE = 7 * 24 * 3600.0  # seconds for server profiles to lose half weight
+PROFILE_MIN_WEIGHT = 0.1  # profiles decayed below this weight are ignored
+HEDGE_POLL_MS = 50.0  # ms between checks of whether a launch straggles
+H2_MAX_STREAMS = 100  # concurrent streams per HTTP/2 connection, RFC 9113 minimum
+KEEPALIVE_EXPIRY = 30.0  # seconds idle connections are kept open
+EVENT_RING_SIZE = 64 * 1024  # launch and retirement events held between drains
+STATS_INTERVAL = 0.25  # seconds between drains of events into stream stats
+METRICS_HOST = "127.0.0.1"  # interface on which metrics are served
+METRICS_TIMEOUT = 5.0  # seconds to wait for a metrics request
+METRICS_READ_LIMIT = 8 * 1024  # bytes of metrics request headers read
+TRACE_ROTATE_BYTES = 256 * 1024 * 1024  # bytes of trace file before a new one is begun
 # types
 LOGMSG_TYPE = Union[str, Exception]
 NUMERIC_TYPE = Union[int, float]
@@ -2,6 +2,7 @@
 
 import abc
 from collections.abc import Iterable
+from collections.abc import Iterator
 from itertools import zip_longest
 from typing import Union
 from typing import cast
@@ -35,9 +36,11 @@ class NonStringIterable(metaclass=abc.ABCMeta):
 
 def zip_dict_to_indexed_list(
     arg_dict: dict[str, Union[NonStringIterable, SIMPLE_TYPES]]
-) -> list[dict[str, SIMPLE_TYPES]]:
-    """Zip on the longest non-string iterables, adding an index."""
-    ret_list = []
+) -> Iterator[dict[str, SIMPLE_TYPES]]:
+    """Zip on the longest non-string iterables, adding an index.
+
+    Arguments are generated lazily, so iterables may be unbounded.
+    """
     iterable_args = [k for k in arg_dict if isinstance(arg_dict[k], NonStringIterable)]
     for idx, iter_tuple in enumerate(zip_longest(
         *[cast(Iterable, arg_dict[k]) for k in iterable_args]
@@ -48,5 +51,4 @@ def zip_dict_to_indexed_list(
                 args[key] = iter_tuple[iterable_args.index(key)]
             else:
                 args[key] = cast(SIMPLE_TYPES, arg_dict[key])
-        ret_list.append(args)
-    return ret_list
+        yield args
@@ -1,8 +1,11 @@
 """Downloads as a MultiDispatcher worker class."""
+import math
 import pathlib
 import sys
+from collections.abc import AsyncIterator
 from typing import Any
 from typing import ClassVar
+from typing import Literal
 from typing import Optional
 from typing import Union
 
@@ -11,13 +14,45 @@ import anyio
 import httpx
 
 # module imports
+from .common import DEFAULT_CHUNK_SIZE
+from .common import DEFAULT_QUEUE_DEPTH
+from .common import FILENAME_KEY
+from .common import H2_MAX_STREAMS
 from .common import INDEX_KEY
+from .common import KEEPALIVE_EXPIRY
+from .common import PARTIAL_SUFFIX
+from .common import REJECTION_CODES
 from .common import SIMPLE_TYPES
 from .common import Logger
 from .common import RandomValueGenerator
 from .instrumented_streams import ArgumentStream
 from .instrumented_streams import FailureStream
 from .instrumented_streams import ResultStream
+from .launch_controller import LaunchController
+from .partial_journal import PartialJournal
+from .sync_manifest import SyncManifest
+
+
+class RejectedRequestError(ValueError):
+    """Server refused a request because of load or policy."""
+
+
+def pool_limits(queue_depth: int, http2: bool) -> httpx.Limits:
+    """Return connection-pool limits for a server's maximum queue depth.
+
+    HTTP/1.1 needs a connection per request in flight.  HTTP/2
+    multiplexes up to H2_MAX_STREAMS requests over each connection.
+    """
+    if queue_depth <= 0:
+        queue_depth = DEFAULT_QUEUE_DEPTH
+    n_connections = queue_depth
+    if http2:
+        n_connections = math.ceil(queue_depth / H2_MAX_STREAMS)
+    return httpx.Limits(
+        max_connections=n_connections,
+        max_keepalive_connections=n_connections,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
 
 
 class StreamWorker:
@@ -29,6 +64,8 @@ class StreamWorker:
         logger: Logger,
         output_dir: Optional[str],
         quiet: bool,
+        controller: Optional[LaunchController],
+        manifest: Optional[SyncManifest],
         /,
         name: str,
         bw_limit_mbps: float = 0.0,
@@ -45,6 +82,8 @@ class StreamWorker:
         if output_dir is not None:
             pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
         self.quiet = quiet
+        self.controller = controller
+        self.manifest = manifest
         # keyworded parameters
         self.name = name
 
@@ -53,17 +92,33 @@ class StreamWorker:
         self.timeout_factor = timeout_factor
         # initialize internal parameters
         self.work_qty_name = "bytes"
+        self.chunk_size = DEFAULT_CHUNK_SIZE
         self.launch_rate = 0.0
         self.n_soft_fails = 0
         self.n_hard_fails = 0
-        self.hard_exceptions: tuple[()] | tuple[type[BaseException]] = ()
-        self.soft_exceptions: tuple[()] | tuple[type[BaseException]] = ()
+        self.hard_exceptions: tuple[type[BaseException], ...] = ()
+        self.soft_exceptions: tuple[type[BaseException], ...] = ()
         self._lock = anyio.Lock()
         self._limiter_delay = RandomValueGenerator().get_wait_time
 
+    async def start(self, probe_path: Optional[str] = None) -> None:
+        """Open resources before the first launch."""
+        _unused = (probe_path,)
+
+    async def stop(self) -> None:
+        """Close resources after the last retirement."""
+
     async def limiter(self):
-        """Fake rate-limiting via sleep."""
-        await anyio.sleep(self._limiter_delay(self.launch_rate))
+        """Wait for the launch controller, else fake rate-limiting via sleep."""
+        if self.controller is not None:
+            await self.controller.wait(self.name)
+        else:
+            await anyio.sleep(self._limiter_delay(self.launch_rate))
+
+    async def shape(self, n_bytes: int):
+        """Wait until bytes may be received within bandwidth limits."""
+        if self.controller is not None:
+            await self.controller.shaper.consume(self.name, n_bytes)
 
     async def add_result(
         self,
@@ -73,9 +128,9 @@ class StreamWorker:
         worker_count: int,
         result_q: ResultStream,
         /,
-        **kwargs: dict[str, SIMPLE_TYPES],
+        **kwargs: SIMPLE_TYPES,
     ):
-        """Put dictionary of results on ouput queue."""
+        """Write data and put dictionary of results on ouput queue."""
         work_qty = len(data)
         if self.output_dir is not None:
             out_file_str = self.output_dir + "/" + filename
@@ -85,6 +140,76 @@ class StreamWorker:
             else:
                 out_file_path = anyio.Path(out_file_str)
                 await out_file_path.write_bytes(data)
+        await self.put_result(work_qty, idx, worker_count, result_q, **kwargs)
+
+    async def stream_result(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        offset: int = 0,
+        journal: Optional[PartialJournal] = None,
+    ) -> int:
+        """Write chunks to a partial file renamed on completion, return bytes.
+
+        Memory use is bounded by chunk size.  If no output directory
+        is set, chunks are only counted.  Chunks are appended to the
+        partial file if offset is nonzero.  If the transfer fails and
+        a journal is given, the partial file is kept for resumption.
+        """
+        n_bytes = 0
+        if self.output_dir is None:
+            async for chunk in chunks:
+                n_bytes += len(chunk)
+            return n_bytes
+        out_file_str = self.output_dir + "/" + filename
+        part_file_str = self.part_file_str(out_file_str)
+        try:
+            mode: Literal["ab", "wb"] = "ab" if offset > 0 else "wb"
+            async with await anyio.open_file(part_file_str, mode) as fp:
+                async for chunk in chunks:
+                    await fp.write(chunk)
+                    n_bytes += len(chunk)
+        except BaseException:
+            if journal is not None and journal.validator() is not None:
+                journal.n_bytes = offset + n_bytes
+                journal.save(part_file_str)
+            else:
+                PartialJournal.discard(part_file_str)
+            raise
+        await anyio.Path(part_file_str).replace(out_file_str)
+        self.discard_partials(out_file_str)
+        return n_bytes
+
+    def part_file_str(self, out_file_str: str, name: Optional[str] = None) -> str:
+        """Return name of partial file, distinct per worker."""
+        return out_file_str + "." + (name or self.name) + PARTIAL_SUFFIX
+
+    def discard_partials(self, out_file_str: str) -> None:
+        """Remove partial files and journals of all servers for an output file.
+
+        Retries may run on any server, so partials left by failed
+        transfers elsewhere are stale once the output file is complete.
+        """
+        names = [self.name]
+        if self.controller is not None:
+            names = list(self.controller.servers)
+        for name in names:
+            PartialJournal.discard(self.part_file_str(out_file_str, name=name))
+
+    def discard_partial(self, **kwargs) -> None:
+        """Remove any partial file left by work on these arguments."""
+        _unused = (kwargs,)
+
+    async def put_result(
+        self,
+        work_qty: int,
+        idx: int,
+        worker_count: int,
+        result_q: ResultStream,
+        /,
+        **kwargs: SIMPLE_TYPES,
+    ):
+        """Put dictionary of results on ouput queue."""
         results = {
             INDEX_KEY: idx,
             "worker": self.name,
@@ -158,8 +283,8 @@ class MockDownloader(StreamWorker):
     def __init__(self, *args, **kwargs):
         """Init with id number."""
         super().__init__(*args, **kwargs)
-        self.hard_exceptions: tuple[()] | tuple[type[BaseException]] = (ValueError,)
-        self.soft_exceptions: tuple[()] | tuple[type[BaseException]] = (
+        self.hard_exceptions: tuple[type[BaseException], ...] = (ValueError,)
+        self.soft_exceptions: tuple[type[BaseException], ...] = (
             ConnectionError,
         )
         self.launch_rate = self.LAUNCH_RATE_MAX / (self.worker_no + 1.0)
@@ -198,6 +323,7 @@ class MockDownloader(StreamWorker):
         receive_time = int(n_dl_bytes / self.DL_CHUNK_SIZE) / self.DL_RATE
         dl_time = round(latency + receive_time, self.TIME_ROUND)
         await anyio.sleep(dl_time)
+        await self.shape(n_dl_bytes)
         out_filename = filename
         await self.add_result(dl_data, out_filename, idx, worker_count, result_q)
 
@@ -215,18 +341,21 @@ class Downloader(StreamWorker):
         server_dir: str,
         transport: str,
         transport_ver: str,
-        bw_limit_mbps: float,
-        queue_depth: int,
         timeout_s: float,
         **super_kwargs,
     ):
         """Init with id number."""
-        _unused = (bw_limit_mbps, queue_depth, )
         super().__init__(*args, **super_kwargs)
-        self.hard_exceptions: tuple[()] | tuple[type[BaseException]] = (
+        self.hard_exceptions: tuple[type[BaseException], ...] = (
             httpx.HTTPStatusError,
         )
-        self.soft_exceptions: tuple[()] | tuple[type[BaseException]] = (ValueError,)
+        self.soft_exceptions: tuple[type[BaseException], ...] = (
+            ValueError,
+            RejectedRequestError,
+            httpx.ReadError,
+            httpx.ReadTimeout,
+            httpx.RemoteProtocolError,
+        )
         self.launch_rate = self.LAUNCH_RATE_MAX
         self.base_url = transport + "://" + server + "/"
         if server_dir != "":
@@ -235,10 +364,40 @@ class Downloader(StreamWorker):
             self.http2 = True
         else:
             self.http2 = False
-        self.client = httpx.AsyncClient(
-            base_url=self.base_url, http2=self.http2, timeout=timeout_s
+        self.timeout_s = timeout_s
+        self.client_transport: Optional[httpx.AsyncBaseTransport] = None
+        self.client = self.new_client()
+
+    def new_client(self) -> httpx.AsyncClient:
+        """Return a client, using client_transport if set."""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            timeout=self.timeout_s,
+            limits=pool_limits(self.queue_depth, self.http2),
+            transport=self.client_transport,
         )
 
+    async def start(self, probe_path: Optional[str] = None) -> None:
+        """Reopen client if closed, and warm a connection with a HEAD probe.
+
+        The probe resolves the server name and completes the TLS
+        handshake so the first launch finds a pooled connection.
+        Probe failures are logged and otherwise ignored.
+        """
+        if self.client.is_closed:
+            self.client = self.new_client()
+        if probe_path is None:
+            return
+        try:
+            await self.client.head(probe_path)
+        except httpx.HTTPError as e:
+            self._logger.warning(f"{self.name} warm-up probe failed: {e!r}")
+
+    async def stop(self) -> None:
+        """Close client and its connections."""
+        await self.client.aclose()
+
     async def worker(
         self,
         result_q: ResultStream,
@@ -248,11 +407,109 @@ class Downloader(StreamWorker):
         path: str,
         out_filename: str,
     ):
-        """Download a file."""
-        response = await self.client.get(path)
-        if response.status_code != httpx.codes.OK:
+        """Stream a file to disk, resuming a partial file if possible."""
+        url = str(self.client.base_url.join(path))
+        part_file_str = self.part_file_str(str(self.output_dir) + "/" + out_filename)
+        prev_journal, offset, headers = self.request_headers(
+            url, part_file_str, out_filename
+        )
+        async with self.client.stream("GET", path, headers=headers) as response:
+            result_q.first_byte(self.name, worker_count)
+            if response.status_code in REJECTION_CODES:
+                if self.controller is not None:
+                    self.controller.reject(self.name)
+                raise RejectedRequestError(
+                    f"{self.name} rejected {path} with status "
+                    + f"{response.status_code}."
+                )
+            if response.status_code == httpx.codes.NOT_MODIFIED:
+                await self.put_result(
+                    0, idx, worker_count, result_q, sync="unmodified"
+                )
+                return
+            if offset > 0 and response.status_code != httpx.codes.OK:
+                self.check_resumed(response, offset, part_file_str)
+            elif response.status_code != httpx.codes.OK:
+                response.raise_for_status()
+            else:
+                # Full content, even if the server ignored a range request.
+                offset = 0
+            new_journal = PartialJournal(
+                url,
+                offset,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            if prev_journal is not None and offset > 0:
+                new_journal.etag = new_journal.etag or prev_journal.etag
+                new_journal.last_modified = (
+                    new_journal.last_modified or prev_journal.last_modified
+                )
+            journal: Optional[PartialJournal] = new_journal
+            if response.headers.get("Content-Encoding", "identity") != "identity":
+                # Ranges apply to encoded bytes, so decoded partials can't resume.
+                journal = None
+            n_bytes = await self.stream_result(
+                self.receive(response), out_filename, offset=offset, journal=journal
+            )
+        if self.manifest is not None:
+            self.manifest.record(
+                out_filename,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            await self.put_result(
+                n_bytes, idx, worker_count, result_q, sync="downloaded"
+            )
+        else:
+            await self.put_result(n_bytes, idx, worker_count, result_q)
+
+    def discard_partial(self, **kwargs) -> None:
+        """Remove any partial file left by work on these arguments."""
+        if self.output_dir is not None and FILENAME_KEY in kwargs:
+            PartialJournal.discard(
+                self.part_file_str(self.output_dir + "/" + kwargs[FILENAME_KEY])
+            )
+
+    def request_headers(
+        self, url: str, part_file_str: str, out_filename: str
+    ) -> tuple[Optional[PartialJournal], int, dict[str, str]]:
+        """Return partial journal, resume offset, and request headers."""
+        prev_journal = None
+        offset = 0
+        headers: dict[str, str] = {}
+        if self.output_dir is None:
+            return prev_journal, offset, headers
+        if self.manifest is not None:
+            headers.update(self.manifest.conditional_headers(out_filename))
+        prev_journal = PartialJournal.load(part_file_str)
+        if prev_journal is not None:
+            offset = prev_journal.resume_offset(part_file_str, url)
+            if offset > 0:
+                headers.update(prev_journal.resume_headers(offset))
+        return prev_journal, offset, headers
+
+    def check_resumed(
+        self, response: httpx.Response, offset: int, part_file_str: str
+    ) -> None:
+        """Check that a resumed response starts at offset, else start over."""
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code == httpx.codes.PARTIAL_CONTENT and (
+            content_range.startswith(f"bytes {offset}-")
+        ):
+            return
+        PartialJournal.discard(part_file_str)
+        if response.status_code not in (
+            httpx.codes.PARTIAL_CONTENT,
+            httpx.codes.REQUESTED_RANGE_NOT_SATISFIABLE,
+        ):
             response.raise_for_status()
-        dl_data = response.content
-        if not self.quiet:
-            print(out_filename)
-        await self.add_result(dl_data, out_filename, idx, worker_count, result_q)
+        raise ValueError(
+            f"{self.name} could not resume {part_file_str} at byte {offset}."
+        )
+
+    async def receive(self, response: httpx.Response) -> AsyncIterator[bytes]:
+        """Yield response chunks within bandwidth limits."""
+        async for chunk in response.aiter_bytes(self.chunk_size):
+            await self.shape(len(chunk))
+            yield chunk
@@ -0,0 +1,105 @@
+"""Ring buffer of launch and retirement events for statistics."""
+
+from typing import Optional
+
+# third-party imports
+import numpy as np
+
+from .common import EVENT_RING_SIZE
+from .common import MillisecondTimer
+
+
+LAUNCH = 0
+RETIRE = 1
+FAIL = 2
+REQUEUE = 3
+EVENT_NAMES = ("launched", "retired", "failed", "requeued")
+
+
+class EventRing:
+    """Preallocated columns of events, written by streams and drained in batches.
+
+    Emitting an event stores a few numbers without awaiting or
+    locking, so it can be done on every launch and retirement.  A
+    single consumer drains all events since the last drain as NumPy
+    arrays.  If the consumer falls more than capacity events behind,
+    the oldest events are overwritten and counted as lost.
+    """
+
+    __slots__ = (
+        "capacity",
+        "columns",
+        "head",
+        "n_lost",
+        "tail",
+        "timer",
+        "worker_index",
+        "workers",
+    )
+
+    def __init__(
+        self,
+        workers: list[str],
+        timer: MillisecondTimer,
+        capacity: int = EVENT_RING_SIZE,
+    ):
+        """Allocate columns."""
+        self.workers = workers
+        self.worker_index = {name: i for i, name in enumerate(workers)}
+        self.timer = timer
+        self.capacity = max(capacity, 1)
+        self.columns: dict[str, np.ndarray] = {
+            "kind": np.zeros(self.capacity, dtype=np.int8),
+            "worker": np.zeros(self.capacity, dtype=np.int16),
+            "idx": np.zeros(self.capacity, dtype=np.int64),
+            "t": np.zeros(self.capacity, dtype=np.float64),
+            "launch_t": np.zeros(self.capacity, dtype=np.float64),
+            "first_byte_t": np.zeros(self.capacity, dtype=np.float64),
+            "n_bytes": np.zeros(self.capacity, dtype=np.int64),
+            "depth": np.zeros(self.capacity, dtype=np.int32),
+            "retries": np.zeros(self.capacity, dtype=np.int32),
+        }
+        self.head = 0
+        self.tail = 0
+        self.n_lost = 0
+
+    def __len__(self) -> int:
+        """Return number of events waiting to be drained."""
+        return self.head - self.tail
+
+    def emit(
+        self,
+        kind: int,
+        worker_name: str,
+        idx: int,
+        launch_t: float = np.nan,
+        n_bytes: int = 0,
+        depth: int = 0,
+        first_byte_t: float = np.nan,
+        retries: int = 0,
+    ) -> None:
+        """Store an event stamped with the current time."""
+        slot = self.head % self.capacity
+        columns = self.columns
+        columns["kind"][slot] = kind
+        columns["worker"][slot] = self.worker_index[worker_name]
+        columns["idx"][slot] = idx
+        columns["t"][slot] = self.timer.time()
+        columns["launch_t"][slot] = launch_t
+        columns["first_byte_t"][slot] = first_byte_t
+        columns["n_bytes"][slot] = n_bytes
+        columns["depth"][slot] = depth
+        columns["retries"][slot] = retries
+        self.head += 1
+        if self.head - self.tail > self.capacity:
+            self.tail += 1
+            self.n_lost += 1
+
+    def drain(self) -> Optional[dict[str, np.ndarray]]:
+        """Return copies of columns of waiting events in order, or None."""
+        n_events = self.head - self.tail
+        if n_events == 0:
+            return None
+        slots = (np.arange(n_events) + self.tail) % self.capacity
+        self.tail = self.head
+        return {key: column[slots] for key, column in self.columns.items()}
@@ -0,0 +1,120 @@
+"""Table of launches in flight on each worker."""
+
+import math
+from collections.abc import Iterator
+from typing import Any
+
+
+class LaunchRecord:
+    """Launch of one set of arguments on a worker."""
+
+    __slots__ = (
+        "cum_launch_rate",
+        "first_byte_t",
+        "idx",
+        "launch_t",
+        "owner",
+        "queue_depth",
+        "retries",
+    )
+
+    def __init__(self) -> None:
+        """Init empty record, to be filled on launch."""
+        self.idx = 0
+        self.queue_depth = 0
+        self.launch_t = 0.0
+        self.first_byte_t = math.nan
+        self.cum_launch_rate = 0.0
+        self.retries = 0
+        self.owner: Any = None
+
+
+class WorkerInflight:
+    """Launches in flight on one worker, keyed by worker count.
+
+    Records are recycled through a free list rather than allocated
+    per launch, and depth is kept as a counter.  Nothing here awaits,
+    so no lock is needed while all streams run on one event loop.  A
+    record returned by pop() is valid until the next add().
+    """
+
+    __slots__ = ("depth", "free", "records")
+
+    def __init__(self) -> None:
+        """Init empty table."""
+        self.records: dict[int, LaunchRecord] = {}
+        self.free: list[LaunchRecord] = []
+        self.depth = 0
+
+    def __len__(self) -> int:
+        """Return number of launches in flight."""
+        return self.depth
+
+    def __contains__(self, worker_count: object) -> bool:
+        """Return True if launch with this worker count is in flight."""
+        return worker_count in self.records
+
+    def __getitem__(self, worker_count: int) -> LaunchRecord:
+        """Return record of launch in flight."""
+        return self.records[worker_count]
+
+    def values(self) -> Iterator[LaunchRecord]:
+        """Iterate over records of launches in flight."""
+        return iter(self.records.values())
+
+    def add(
+        self,
+        worker_count: int,
+        idx: int,
+        launch_t: float,
+        cum_launch_rate: float,
+        owner: Any,
+        retries: int = 0,
+    ) -> LaunchRecord:
+        """Record a launch, returning its record.
+
+        The queue depth of a launch is the number of launches already
+        in flight, so the first launch on an idle worker has depth 0.
+        """
+        record = self.free.pop() if self.free else LaunchRecord()
+        record.idx = idx
+        record.queue_depth = self.depth
+        self.depth += 1
+        record.launch_t = launch_t
+        record.first_byte_t = math.nan
+        record.cum_launch_rate = cum_launch_rate
+        record.retries = retries
+        record.owner = owner
+        self.records[worker_count] = record
+        return record
+
+    def pop(self, worker_count: int) -> LaunchRecord:
+        """Remove and return record of a launch, KeyError if not in flight."""
+        record = self.records.pop(worker_count)
+        self.depth -= 1
+        record.owner = None
+        self.free.append(record)
+        return record
+
+    def discard(self, worker_count: int) -> None:
+        """Remove record of a launch, if it is in flight."""
+        if worker_count in self.records:
+            self.pop(worker_count)
+
+    def discard_owned(self, owner: Any) -> None:
+        """Remove records of all launches by an owner."""
+        for worker_count in [
+            count for count, record in self.records.items() if record.owner is owner
+        ]:
+            self.pop(worker_count)
+
+
+class InflightTable(dict[str, WorkerInflight]):
+    """Per-worker in-flight tables, created on first use."""
+
+    __slots__ = ()
+
+    def __missing__(self, worker_name: str) -> WorkerInflight:
+        """Create table for a worker not yet seen."""
+        table = self[worker_name] = WorkerInflight()
+        return table
@@ -1,23 +1,42 @@
 """Streams instrumented with depth and other stats."""
 
+import inspect
 import math
 from collections import Counter
-from typing import Any
+from collections.abc import Awaitable
+from typing import Callable
 from typing import ClassVar
+from typing import Optional
 from typing import Union
 from typing import cast
 
 # third-party imports
 import anyio
 
+from .argument_source import ARG_SOURCE_TYPE
+from .argument_source import ArgumentSource
+from .common import DEFAULT_ARG_BUFFER
 from .common import INDEX_KEY
 from .common import RATE_ROUNDING
 from .common import SIMPLE_TYPES
 from .common import TIME_EPSILON
 from .common import MillisecondTimer
+from .event_ring import FAIL
+from .event_ring import LAUNCH
+from .event_ring import REQUEUE
+from .event_ring import RETIRE
+from .event_ring import EventRing
+from .inflight_table import InflightTable
+from .inflight_table import LaunchRecord
+from .launch_controller import LaunchController
+from .scheduler import AFFINITY_TYPE
+from .scheduler import PRIORITY_TYPE
+from .scheduler import RETRY_PRIORITY
+from .scheduler import ArgumentScheduler
 
 
 LAUNCH_KEY = "launch_t"
+CONSUMER_TYPE = Callable[[dict[str, SIMPLE_TYPES]], Optional[Awaitable[None]]]
 
 
 def get_index_value(item: dict[str, SIMPLE_TYPES]) -> int:
@@ -26,28 +45,70 @@ def get_index_value(item: dict[str, SIMPLE_TYPES]) -> int:
 
 
 class ArgumentStream:
-    """A stream of dictionaries to be used as arguments."""
+    """A stream of dictionaries to be used as arguments.
+
+    Arguments are launched in order of priority (lowest first, FIFO
+    among equals) with preference for servers to which they have
+    affinity.  Requeued arguments are retried ahead of all others.
+    Arguments are read from their source as needed to keep up to
+    buffer_size waiting, so priorities apply within that window.
+
+    Streams of concurrent jobs may share the in-flight table if they
+    also share a worker_counter, so that worker counts are unique.
+    Launches and requeues are emitted to events, if given.  All
+    bookkeeping is done without awaiting, so no lock is needed.
+    """
 
     def __init__(
         self,
-        arg_list: list[dict[str, SIMPLE_TYPES]],
-        in_process: dict[str, Any],
+        arg_source: Union[ARG_SOURCE_TYPE, ArgumentSource],
+        in_process: InflightTable,
         timer: MillisecondTimer,
+        priority: Optional[PRIORITY_TYPE] = None,
+        affinity: Optional[AFFINITY_TYPE] = None,
+        steal: bool = True,
+        buffer_size: int = DEFAULT_ARG_BUFFER,
+        controller: Optional[LaunchController] = None,
+        worker_counter: Optional[Counter[str]] = None,
+        events: Optional[EventRing] = None,
     ):
         """Initialize data structure for in-flight stats."""
-        self.send_stream: anyio.streams.memory.MemoryObjectSendStream
-        self.receive_stream: anyio.streams.memory.MemoryObjectReceiveStream
-        self.send_stream, self.receive_stream = anyio.create_memory_object_stream(
-            max_buffer_size=math.inf
-        )
-        for args in arg_list:
-            self.send_stream.send_nowait(args)
-        self.n_args = len(arg_list)
+        if isinstance(arg_source, ArgumentSource):
+            self.source = arg_source
+        else:
+            self.source = ArgumentSource(arg_source)
+        self.priority = priority
+        self.affinity = affinity
+        self.controller = controller
+        self.buffer_size = max(buffer_size, 1)
+        self.scheduler = ArgumentScheduler(steal=steal)
         self.inflight = in_process
         self.timer = timer
+        self.start_t = timer.time()
         self.launch_rate = 0.0
-        self.worker_counter: Counter[str] = Counter()
-        self._lock = anyio.Lock()
+        self.worker_counter: Counter[str] = (
+            Counter() if worker_counter is None else worker_counter
+        )
+        self.exception_counter: Counter[int] = Counter()
+        self.events = events
+        self._fill_lock = anyio.Lock()
+
+    @property
+    def n_args(self) -> int:
+        """Return number of arguments read from source."""
+        return self.source.n_read
+
+    async def fill(self) -> None:
+        """Read from source once fewer than half a buffer is waiting."""
+        async with self._fill_lock:
+            n_waiting = len(self.scheduler)
+            if self.source.exhausted or 2 * n_waiting >= self.buffer_size:
+                return
+            self.scheduler.extend(
+                await self.source.read(self.buffer_size - n_waiting),
+                priority=self.priority,
+                affinity=self.affinity,
+            )
 
     async def put(
         self,
@@ -57,43 +118,111 @@ class ArgumentStream:
         worker_count: Union[int, None] = None,
     ):
         """Put on results queue and update stats."""
-        worker_name = cast(str, worker_name)
-        worker_count = cast(int, worker_count)
-        async with self._lock:
-            del self.inflight[worker_name][worker_count]
-        await self.send_stream.send(args)
+        self.release(args, cast(str, worker_name), cast(int, worker_count))
+        self.scheduler.push(
+            args,
+            priority=RETRY_PRIORITY,
+            servers=None if self.affinity is None else self.affinity(args),
+        )
+
+    def release(self, args, worker_name: str, worker_count: int) -> None:
+        """Drop in-flight record of arguments to be requeued."""
+        launch = self.inflight[worker_name].pop(worker_count)
+        if self.events is not None:
+            self.events.emit(
+                REQUEUE,
+                worker_name,
+                args[INDEX_KEY],
+                launch_t=launch.launch_t,
+                depth=launch.queue_depth,
+                first_byte_t=launch.first_byte_t,
+                retries=launch.retries,
+            )
 
     async def get(self, /, worker_name: Union[str, None] = None, **kwargs):
         """Track de-queuing by worker."""
+        _unused = (kwargs,)
         worker_name = cast(str, worker_name)
-        q_entry = self.receive_stream.receive_nowait(**kwargs)
-        async with self._lock:
-            self.worker_counter[worker_name] += 1
-            worker_count = self.worker_counter[worker_name]
-            if worker_name not in self.inflight:
-                self.inflight[worker_name] = {}
-            idx = q_entry[INDEX_KEY]
-            launch_time = self.timer.time()
-            self.launch_rate = round(
-                idx * 1000.0 / (launch_time + TIME_EPSILON), RATE_ROUNDING
-            )
-            self.inflight[worker_name][worker_count] = {
-                INDEX_KEY: idx,
-                "queue_depth": len(self.inflight[worker_name]),
-                LAUNCH_KEY: launch_time,
-                "cum_launch_rate": self.launch_rate,
-            }
+        await self.fill()
+        try:
+            q_entry = self.scheduler.pop(worker_name)
+        except IndexError:
+            raise anyio.WouldBlock from None
+        worker_count = await self.launch(q_entry, worker_name=worker_name)
         return q_entry, worker_count
 
+    async def launch(self, args, /, worker_name: Union[str, None] = None) -> int:
+        """Record launch of arguments on a worker, return worker count."""
+        worker_name = cast(str, worker_name)
+        self.worker_counter[worker_name] += 1
+        worker_count = self.worker_counter[worker_name]
+        idx = args[INDEX_KEY]
+        launch_time = self.timer.time()
+        self.launch_rate = round(
+            idx * 1000.0 / (launch_time - self.start_t + TIME_EPSILON),
+            RATE_ROUNDING,
+        )
+        launch = self.inflight[worker_name].add(
+            worker_count,
+            idx,
+            launch_time,
+            self.launch_rate,
+            self,
+            retries=self.exception_counter.get(idx, 0),
+        )
+        if self.events is not None:
+            self.events.emit(
+                LAUNCH,
+                worker_name,
+                idx,
+                launch_t=launch_time,
+                depth=launch.queue_depth,
+                retries=launch.retries,
+            )
+        if self.controller is not None:
+            self.controller.observe()
+        return worker_count
+
+    def held(self) -> bool:
+        """Return True if arguments are being withheld from launch."""
+        return False
+
+    def owns(self, launch: LaunchRecord) -> bool:
+        """Return True if an in-flight record was launched from this stream."""
+        return launch.owner is self
+
+    def abandon(self, worker_name: str, worker_count: int) -> None:
+        """Drop in-flight record of a launch that will not retire."""
+        self.inflight[worker_name].discard(worker_count)
+
+    def n_inflight(self, worker_name: str) -> int:
+        """Return number of launches from this stream in flight on a worker."""
+        return sum(self.owns(launch) for launch in self.inflight[worker_name].values())
+
+    def abandon_all(self) -> None:
+        """Drop in-flight records of all launches from this stream."""
+        for launches in self.inflight.values():
+            launches.discard_owned(self)
+
 
 class FailureStream:
-    """Anyio stream to track failures."""
+    """Anyio stream to track failures.
+
+    If a consumer is given, each record is passed to it as it retires
+    instead of being held for get_all().  The consumer may be a plain
+    function or a coroutine function and runs in the worker task.
+    Retirements are emitted to events, if given.
+    """
 
     launch_stats_out: ClassVar = []
+    event_kind: ClassVar = FAIL
 
     def __init__(
         self,
-        in_process: dict[str, Any],
+        in_process: InflightTable,
+        controller: Optional[LaunchController] = None,
+        consumer: Optional[CONSUMER_TYPE] = None,
+        events: Optional[EventRing] = None,
     ) -> None:
         """Init stats for queue."""
         self.send_stream: anyio.streams.memory.MemoryObjectSendStream
@@ -102,8 +231,10 @@ class FailureStream:
             max_buffer_size=math.inf
         )
         self.inflight = in_process
+        self.controller = controller
+        self.consumer = consumer
+        self.events = events
         self.count = 0
-        self._lock = anyio.Lock()
 
     async def put(
         self,
@@ -114,27 +245,105 @@ class FailureStream:
     ):
         """Put on results queue and update stats."""
         worker_name = cast(str, worker_name)
-        worker_count = cast(int, worker_count)
-        launch_stats = self.inflight[worker_name][worker_count]
+        launches = self.inflight[worker_name]
+        launch = launches[cast(int, worker_count)]
+        self.retire(worker_name, launch, args)
+        launches.pop(cast(int, worker_count))
         for result_name in self.launch_stats_out:
-            args[result_name] = launch_stats[result_name]
-        async with self._lock:
-            self.count += 1
-            del self.inflight[worker_name][worker_count]
-        await self.send_stream.send(args)
-
-    def get_all(self) -> list[dict[str, SIMPLE_TYPES]]:
-        """Return sorted list of stream contents."""
+            args[result_name] = getattr(launch, result_name)
+        if self.events is not None:
+            self.events.emit(
+                self.event_kind,
+                worker_name,
+                args[INDEX_KEY],
+                launch_t=launch.launch_t,
+                n_bytes=args.get("bytes", 0),
+                depth=launch.queue_depth,
+                first_byte_t=launch.first_byte_t,
+                retries=launch.retries,
+            )
+        self.count += 1
+        await self.consume(args)
+
+    def first_byte(self, worker_name: str, worker_count: int) -> None:
+        """Stamp the time a launch began receiving, if events are kept."""
+        if self.events is not None:
+            self.inflight[worker_name][worker_count].first_byte_t = (
+                self.events.timer.time()
+            )
+
+    def retire(
+        self, worker_name: str, launch: LaunchRecord, args: dict[str, SIMPLE_TYPES]
+    ) -> None:
+        """Act on retirement of a launch before its record is put."""
+        _unused = (worker_name, launch, args)
+
+    async def consume(self, args: dict[str, SIMPLE_TYPES]) -> None:
+        """Pass record to consumer if there is one, else hold it in stream."""
+        if self.consumer is None:
+            await self.send_stream.send(args)
+            return
+        consumed = self.consumer(args)
+        if inspect.isawaitable(consumed):
+            await consumed
+
+    def get_all(self, sort: bool = True) -> list[dict[str, SIMPLE_TYPES]]:
+        """Return list of stream contents, sorted by index if requested."""
         stream_contents = []
         while True:
             try:
                 stream_contents.append(self.receive_stream.receive_nowait())
             except anyio.WouldBlock:
                 break
-        return sorted(stream_contents, key=get_index_value)
+        if sort:
+            stream_contents.sort(key=get_index_value)
+        return stream_contents
 
 
 class ResultStream(FailureStream):
     """Stream for results."""
 
     launch_stats_out: ClassVar = [LAUNCH_KEY]
+    event_kind: ClassVar = RETIRE
+
+    def retire(
+        self, worker_name: str, launch: LaunchRecord, args: dict[str, SIMPLE_TYPES]
+    ) -> None:
+        """Report retirement to the launch controller."""
+        if self.controller is not None:
+            self.controller.retire(
+                worker_name,
+                launch.launch_t,
+                cast(int, args.get("bytes", 0)),
+                queue_depth=launch.queue_depth,
+            )
+
+
+class RacerResultStream:
+    """Result stream seen by one racer of a hedged launch.
+
+    Racers share a list of winners, and only the first racer to put a
+    result retires it.  The winner is recorded before anything is
+    awaited, so the same arguments are never retired twice.  A loser's
+    launch is left in flight, to be abandoned by its racer.
+    """
+
+    __slots__ = ("result_q", "winners")
+
+    def __init__(self, result_q: ResultStream, winners: list[str]) -> None:
+        """Init with shared result stream and list of winners."""
+        self.result_q = result_q
+        self.winners = winners
+
+    def first_byte(self, worker_name: str, worker_count: int) -> None:
+        """Stamp the time a launch began receiving."""
+        self.result_q.first_byte(worker_name, worker_count)
+
+    async def put(self, args, /, worker_name: str, worker_count: int) -> None:
+        """Put result on shared stream, unless the other racer has won."""
+        if self.winners:
+            return
+        self.winners.append(worker_name)
+        await self.result_q.put(
+            args, worker_name=worker_name, worker_count=worker_count
+        )
@@ -0,0 +1,105 @@
+"""Handles on batches submitted to a running MultiDispatcher."""
+
+import sys
+from typing import Any
+from typing import Optional
+
+# third-party imports
+import anyio
+
+
+if sys.version_info < (3, 11):
+    from exceptiongroup import BaseExceptionGroup
+
+
+class JobCancelledError(RuntimeError):
+    """Job was cancelled before it completed."""
+
+
+def sole_exception(error: BaseException) -> BaseException:
+    """Return the exception wrapped by nested single-exception groups."""
+    while isinstance(error, BaseExceptionGroup) and len(error.exceptions) == 1:
+        error = error.exceptions[0]
+    return error
+
+
+class Job:
+    """Handle on one batch of arguments sharing a dispatcher's servers.
+
+    Each job has its own argument, result and failure streams and
+    its own retry counts, while queue-depth gates, launch rates and
+    server statistics are shared with all other jobs.  Live counts
+    are available while the job runs, and wait() returns the results,
+    failures and stats that run() would have.
+    """
+
+    def __init__(self, job_id: int) -> None:
+        """Initialize handle for a job not yet started."""
+        self.job_id = job_id
+        self.arg_q: Optional[Any] = None
+        self.result_q: Optional[Any] = None
+        self.failure_q: Optional[Any] = None
+        self.output: Optional[tuple[Any, Any, dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+        self.cancel_scope = anyio.CancelScope()
+        self._done = anyio.Event()
+
+    def __repr__(self) -> str:
+        """Show job id and state."""
+        return f"Job({self.job_id}, {self.state})"
+
+    @property
+    def state(self) -> str:
+        """Return one of pending, running, done, failed or cancelled."""
+        if not self._done.is_set():
+            return "pending" if self.arg_q is None else "running"
+        if self.error is not None:
+            return "failed"
+        if self.output is None:
+            return "cancelled"
+        return "done"
+
+    def done(self) -> bool:
+        """Return True once the job has finished, failed or been cancelled."""
+        return self._done.is_set()
+
+    def counts(self) -> dict[str, int]:
+        """Return live counts of arguments read, downloaded and failed."""
+        return {
+            "requests": 0 if self.arg_q is None else self.arg_q.n_args,
+            "downloaded": 0 if self.result_q is None else self.result_q.count,
+            "failed": 0 if self.failure_q is None else self.failure_q.count,
+        }
+
+    def attach(self, arg_q: Any, result_q: Any, failure_q: Any) -> None:
+        """Attach the streams of a run started for this job."""
+        self.arg_q = arg_q
+        self.result_q = result_q
+        self.failure_q = failure_q
+
+    def cancel(self) -> None:
+        """Cancel transfers of this job only."""
+        self.cancel_scope.cancel()
+
+    def finish(
+        self,
+        output: Optional[tuple[Any, Any, dict[str, Any]]] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Record output or error and wake waiters."""
+        self.output = output
+        self.error = error
+        self._done.set()
+
+    async def join(self) -> None:
+        """Wait for the job to end, without raising its error."""
+        await self._done.wait()
+
+    async def wait(self) -> tuple[Any, Any, dict[str, Any]]:
+        """Wait for the job, returning results, failures and stats."""
+        await self._done.wait()
+        if self.error is not None:
+            raise self.error
+        if self.output is None:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled.")
+        return self.output
@@ -0,0 +1,427 @@
+"""Adaptilastic control of per-server launch rates."""
+
+import time
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+from typing import Optional
+
+# third-party imports
+import anyio
+import numpy as np
+from attrs import define
+from attrs import field
+
+from .common import BW_WINDOW
+from .common import BYTES_TO_MEGABITS
+from .common import DEFAULT_BW_MAX_MBPS
+from .common import DEFAULT_HISTORY_LEN
+from .common import DEFAULT_MODAL_SIZE
+from .common import DEFAULT_N_MIN
+from .common import DEFAULT_QUEUE_DEPTH
+from .common import DEPTH_RECOVERY_N
+from .common import HOL_FACTOR
+from .common import LAUNCH_RATE_MAX
+from .common import LAUNCH_RATE_MIN
+from .common import MODE_BIN_WIDTH
+from .common import NAIVE_BW_MBPS
+from .common import REJECTION_HOLDOFF
+from .common import TIME_EPSILON
+from .common import MillisecondTimer
+from .common import RandomValueGenerator
+from .rate_shaper import RateShaper
+from .saturation_fit import SaturationFit
+from .server_profile import ServerProfile
+from .time_fit import EquationOfTimeFit
+
+
+# Operating regimes, in order of increasing information.
+NAIVE = "naive"
+INFORMED = "informed"
+ARRIVING = "arriving"
+UPDATED = "updated"
+
+
+def modal_value(values: Iterable[float]) -> Optional[float]:
+    """Return the mode of positive values from a log-binned histogram.
+
+    Long-tailed distributions are close to symmetric in log space,
+    so binning the logarithm gives a mode that is stable against
+    the occasional whale.
+    """
+    log_vals = np.log(np.asarray([v for v in values if v > 0.0], dtype=float))
+    if len(log_vals) == 0:
+        return None
+    log_min = float(log_vals.min())
+    n_bins = int((float(log_vals.max()) - log_min) / MODE_BIN_WIDTH) + 1
+    counts, edges = np.histogram(
+        log_vals, bins=n_bins, range=(log_min, log_min + n_bins * MODE_BIN_WIDTH)
+    )
+    peak = int(np.argmax(counts))
+    return float(np.exp(0.5 * (edges[peak] + edges[peak + 1])))
+
+
+class DepthGate:
+    """Semaphore on per-server queue depth with an adjustable limit.
+
+    All users run on a single event loop, so the depth check and
+    increment in acquire() cannot be interleaved.
+    """
+
+    def __init__(self, limit: int):
+        """Init with depth limit."""
+        self.limit = limit
+        self.in_use = 0
+        self._released: Optional[anyio.Event] = None
+
+    async def acquire(self) -> None:
+        """Wait until depth is below the limit, then take a slot."""
+        while self.in_use >= self.limit:
+            await self.wait_release()
+        self.in_use += 1
+
+    def release(self) -> None:
+        """Give back a slot and wake waiters."""
+        self.in_use -= 1
+        if self._released is not None:
+            self._released.set()
+            self._released = None
+
+    async def wait_release(self) -> None:
+        """Wait for the next release of a slot."""
+        if self._released is None:
+            self._released = anyio.Event()
+        await self._released.wait()
+
+
+@define
+class ServerState:
+    """Launch-control state of a single server."""
+
+    name: str
+    d_max: int = DEFAULT_QUEUE_DEPTH
+    history_len: int = field(default=DEFAULT_HISTORY_LEN, repr=False)
+    n_retired: int = 0
+    d_crit: Optional[int] = None
+    prev_modal_rate: Optional[float] = None
+    prev_bw_mbps: Optional[float] = None
+    last_cut_t: Optional[float] = None
+    n_clean: int = 0
+    d_max_ceiling: int = field(init=False)
+    service_times: deque[float] = field(init=False, repr=False)
+    depth_service_times: dict[int, deque[float]] = field(init=False, repr=False)
+    hol_depths: set[int] = field(init=False, repr=False)
+    gate: DepthGate = field(init=False, repr=False)
+    launch_lock: anyio.Lock = field(init=False, repr=False)
+    time_fit: EquationOfTimeFit = field(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        """Initialize history after history length is set."""
+        self.d_max_ceiling = self.d_max
+        self.service_times = deque(maxlen=self.history_len)
+        self.depth_service_times = {}
+        self.hol_depths = set()
+        self.gate = DepthGate(self.d_max)
+        self.launch_lock = anyio.Lock()
+        self.time_fit = EquationOfTimeFit()
+
+    def modal_rate(self) -> Optional[float]:
+        """Return the modal service rate in files per second."""
+        modal_time = modal_value(self.service_times)
+        if modal_time is None:
+            return None
+        return 1000.0 / modal_time
+
+    def depth_limit(self) -> int:
+        """Return current limit on queue depth, min of D_max and D_crit."""
+        if self.d_crit is None:
+            return self.d_max
+        return min(self.d_max, self.d_crit)
+
+    def update_hol(self, depth: int, n_min: int) -> None:
+        """Flag depth if modal service time shows head-of-line blocking.
+
+        The modal service time at each launch depth (requests already
+        in flight) is compared with that at the lowest well-sampled
+        depth, and D_crit is the lowest depth at which it has grown
+        by HOL_FACTOR.
+        """
+        sampled = sorted(
+            d for d, times in self.depth_service_times.items() if len(times) >= n_min
+        )
+        if depth not in sampled or depth == sampled[0]:
+            return
+        base_time = modal_value(self.depth_service_times[sampled[0]])
+        depth_time = modal_value(self.depth_service_times[depth])
+        if base_time is None or depth_time is None:
+            return
+        if depth_time > HOL_FACTOR * base_time:
+            self.hol_depths.add(depth)
+        else:
+            self.hol_depths.discard(depth)
+        if self.hol_depths:
+            self.d_crit = max(min(self.hol_depths), 1)
+        else:
+            self.d_crit = None
+        self.gate.limit = self.depth_limit()
+
+
+class LaunchController:
+    """Compute per-server launch rates k_j from the applicable regime.
+
+    Workers consult the controller before each launch and the result
+    stream reports each retirement back to it.  See THEORY.md for the
+    rate expressions used in each regime.
+    """
+
+    def __init__(
+        self,
+        timer: MillisecondTimer,
+        inflight: dict[str, Any],
+        /,
+        modal_size: int = DEFAULT_MODAL_SIZE,
+        bw_max_mbps: float = DEFAULT_BW_MAX_MBPS,
+        n_min: int = DEFAULT_N_MIN,
+        history_len: int = DEFAULT_HISTORY_LEN,
+        rate_max: float = LAUNCH_RATE_MAX,
+        rate_min: float = LAUNCH_RATE_MIN,
+    ):
+        """Init with shared timer and in-flight dictionary.
+
+        Downloads are shaped to bw_max_mbps only if it is positive,
+        and otherwise launch rates before characterization assume
+        NAIVE_BW_MBPS.
+        """
+        self.timer = timer
+        self.inflight = inflight
+        self.modal_size = modal_size
+        self.bw_max_mbps = bw_max_mbps
+        self.bw_rate_mbps = bw_max_mbps if bw_max_mbps > 0.0 else NAIVE_BW_MBPS
+        self.n_min = n_min
+        self.history_len = history_len
+        self.rate_max = rate_max
+        self.rate_min = rate_min
+        self.servers: dict[str, ServerState] = {}
+        self.n_retired = 0
+        self.bytes_total = 0
+        self.first_arrival_launch_t: Optional[float] = None
+        self.last_retire_t: Optional[float] = None
+        self._bw_window: deque[tuple[float, int]] = deque()
+        self._bw_window_bytes = 0
+        self.shaper = RateShaper(bw_max_mbps)
+        self.saturation = SaturationFit(n_min=n_min)
+        self._wait_time = RandomValueGenerator().get_wait_time
+
+    def add_server(
+        self, name: str, d_max: int = 0, bw_limit_mbps: float = 0.0
+    ) -> None:
+        """Start tracking a server, with default D_max if not positive."""
+        if d_max <= 0:
+            d_max = DEFAULT_QUEUE_DEPTH
+        self.servers[name] = ServerState(
+            name, d_max=d_max, history_len=self.history_len
+        )
+        self.shaper.add_server(name, bw_limit_mbps=bw_limit_mbps)
+
+    def gate(self, name: str) -> DepthGate:
+        """Return the queue-depth gate for a server."""
+        return self.servers[name].gate
+
+    def reject(self, name: str) -> None:
+        """Lower D_max below the depth at which the server rejected requests.
+
+        Rejections within REJECTION_HOLDOFF of a cut are of requests
+        launched at the old depth and belong to the same episode, so
+        D_max is cut only once per episode.
+        """
+        state = self.servers[name]
+        state.n_clean = 0
+        now = self.timer.time()
+        if state.last_cut_t is not None and now - state.last_cut_t < REJECTION_HOLDOFF:
+            return
+        state.last_cut_t = now
+        state.d_max = max(min(state.d_max, state.gate.in_use) - 1, 1)
+        state.gate.limit = state.depth_limit()
+
+    def recover(self, state: ServerState) -> None:
+        """Raise a cut D_max by one after DEPTH_RECOVERY_N clean retirements."""
+        if state.d_max >= state.d_max_ceiling:
+            return
+        state.n_clean += 1
+        if state.n_clean >= DEPTH_RECOVERY_N:
+            state.n_clean = 0
+            state.d_max += 1
+            state.gate.limit = state.depth_limit()
+
+    def set_previous(self, name: str, modal_rate: float, bw_mbps: float) -> None:
+        """Set modal rate and bandwidth from a previous session."""
+        self.servers[name].prev_modal_rate = modal_rate
+        self.servers[name].prev_bw_mbps = bw_mbps
+
+    def apply_profile(self, name: str, profile: ServerProfile) -> None:
+        """Start a server in the informed regime from a previous profile."""
+        self.set_previous(name, profile.modal_rate, profile.bw_mbps)
+        if profile.d_crit is not None:
+            state = self.servers[name]
+            state.d_crit = profile.d_crit
+            state.gate.limit = state.depth_limit()
+
+    def session_bw_mbps(self) -> Optional[float]:
+        """Return saturation bandwidth if fit, else mean bandwidth since first."""
+        if self.saturation.bw_eff_mbps is not None:
+            return self.saturation.bw_eff_mbps
+        if self.first_arrival_launch_t is None or self.last_retire_t is None:
+            return None
+        elapsed = self.last_retire_t - self.first_arrival_launch_t
+        return self.bytes_total * BYTES_TO_MEGABITS * 1000.0 / (elapsed + TIME_EPSILON)
+
+    def profile(self, name: str) -> Optional[ServerProfile]:
+        """Return profile of a characterized server for use in later runs."""
+        state = self.servers[name]
+        modal_rate = state.modal_rate()
+        bw_mbps = self.session_bw_mbps()
+        if state.n_retired < self.n_min or modal_rate is None or not bw_mbps:
+            return None
+        return ServerProfile(
+            modal_rate,
+            bw_mbps,
+            latency_ms=state.time_fit.latency_ms,
+            d_crit=state.d_crit,
+            updated=time.time(),
+        )
+
+    def depth_total(self) -> int:
+        """Return the in-flight depth summed over all servers."""
+        return sum(len(server) for server in self.inflight.values())
+
+    def bandwidth_mbps(self) -> float:
+        """Return download bit rate over the most recent window."""
+        window_start = self.timer.time() - BW_WINDOW
+        while self._bw_window and self._bw_window[0][0] < window_start:
+            self._bw_window_bytes -= self._bw_window.popleft()[1]
+        return self._bw_window_bytes * BYTES_TO_MEGABITS * 1000.0 / BW_WINDOW
+
+    def regime(self, name: str) -> str:
+        """Return the operating regime for a server."""
+        state = self.servers[name]
+        if state.n_retired >= self.n_min:
+            return UPDATED
+        if self.n_retired > 0:
+            return ARRIVING
+        if state.prev_modal_rate is not None and state.prev_bw_mbps:
+            return INFORMED
+        return NAIVE
+
+    def launch_rate(self, name: str) -> float:
+        """Return the launch rate k_j in launches per second.
+
+        Once a server is characterized, it is launched on at its modal
+        service rate times its depth limit, so that the limit is
+        reached in steady state rather than one request at a time.
+        """
+        state = self.servers[name]
+        regime = self.regime(name)
+        rate: Optional[float] = None
+        if regime == UPDATED:
+            modal_rate = state.modal_rate()
+            if modal_rate is not None:
+                # Little's law: depth_limit requests in flight at the modal rate
+                rate = modal_rate * state.depth_limit()
+        elif regime == ARRIVING:
+            since_first = self.timer.time() - float(self.first_arrival_launch_t or 0.0)
+            rate = self.n_retired * 1000.0 / (since_first + TIME_EPSILON)
+        elif regime == INFORMED:
+            rate = (
+                float(state.prev_modal_rate or 0.0)
+                * self.bw_rate_mbps
+                / float(state.prev_bw_mbps or 1.0)
+            )
+        if rate is None:
+            bw_bytes = self.bw_rate_mbps / BYTES_TO_MEGABITS
+            rate = bw_bytes / (self.modal_size * (self.depth_total() + 1))
+        return min(max(rate, self.rate_min), self.rate_max)
+
+    def observe(self) -> None:
+        """Add current total depth and bandwidth to the saturation fit."""
+        self.saturation.add(self.depth_total(), self.bandwidth_mbps())
+
+    def limit_exceeded(self, name: str) -> bool:
+        """Return True if launching on this server would exceed a limit.
+
+        Limits are B_max, if set, and, once the server is updated and
+        the fit is made, the saturation depth D_sat.  Total depth may run one
+        past D_sat, so that the fit keeps observing whether bandwidth
+        still grows with depth and D_sat can move up.
+        """
+        if 0.0 < self.bw_max_mbps <= self.bandwidth_mbps():
+            return True
+        if self.regime(name) != UPDATED:
+            return False
+        d_sat = self.saturation.d_sat
+        return d_sat is not None and self.depth_total() > d_sat
+
+    def hedge_delay(self, name: str, percentile: float) -> Optional[float]:
+        """Return service time in ms beyond which a launch is a straggler."""
+        state = self.servers[name]
+        if state.n_retired < self.n_min:
+            return None
+        return float(np.percentile(state.service_times, percentile))
+
+    def fastest(
+        self, exclude: Optional[str] = None, idle: bool = False
+    ) -> Optional[str]:
+        """Return the characterized server with the best modal rate.
+
+        If idle is True, only servers with free queue depth are considered.
+        """
+        best_name = None
+        best_rate = 0.0
+        for name, state in self.servers.items():
+            if name == exclude or state.n_retired < self.n_min:
+                continue
+            if idle and state.gate.in_use >= state.gate.limit:
+                continue
+            rate = state.modal_rate()
+            if rate is not None and rate > best_rate:
+                best_name = name
+                best_rate = rate
+        return best_name
+
+    def fastest_idle(self, exclude: str) -> Optional[str]:
+        """Return the characterized server with free depth and best modal rate."""
+        return self.fastest(exclude=exclude, idle=True)
+
+    async def wait(self, name: str) -> None:
+        """Sleep a stochastic launch interval, extended while over limits.
+
+        Waits are serialized per server, so that dispatchers of
+        concurrent jobs share one launch rate.
+        """
+        async with self.servers[name].launch_lock:
+            await anyio.sleep(self._wait_time(self.launch_rate(name)))
+            while self.limit_exceeded(name):
+                await anyio.sleep(self._wait_time(self.launch_rate(name)))
+
+    def retire(
+        self, name: str, launch_t: float, n_bytes: int, queue_depth: int = 0
+    ) -> None:
+        """Update state from a completed transfer."""
+        retire_t = self.timer.time()
+        state = self.servers[name]
+        service_t = max(retire_t - launch_t, TIME_EPSILON)
+        state.n_retired += 1
+        state.service_times.append(service_t)
+        state.time_fit.add(n_bytes, service_t)
+        if queue_depth not in state.depth_service_times:
+            state.depth_service_times[queue_depth] = deque(maxlen=self.history_len)
+        state.depth_service_times[queue_depth].append(service_t)
+        self.recover(state)
+        state.update_hol(queue_depth, self.n_min)
+        self.n_retired += 1
+        if self.first_arrival_launch_t is None:
+            self.first_arrival_launch_t = launch_t
+        self._bw_window.append((retire_t, n_bytes))
+        self._bw_window_bytes += n_bytes
+        self.bytes_total += n_bytes
+        self.last_retire_t = retire_t
+        self.observe()
@@ -0,0 +1,259 @@
+"""Export of dispatcher metrics in OpenMetrics text format."""
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Optional
+
+# third-party imports
+import anyio
+from anyio.abc import SocketAttribute
+from anyio.abc import SocketStream
+
+from .common import ALL
+from .common import METRICS_HOST
+from .common import METRICS_READ_LIMIT
+from .common import METRICS_TIMEOUT
+from .common import NUMERIC_TYPE
+from .common import QUANTILES
+from .common import TOTAL
+from .common import VALUE
+from .common import Logger
+from .event_ring import EVENT_NAMES
+
+
+if TYPE_CHECKING:
+    from .multidispatcher import MultiDispatcher
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "flardl_"
+LABELS_TYPE = dict[str, str]
+SAMPLE_TYPE = tuple[str, LABELS_TYPE, NUMERIC_TYPE]
+
+
+def escape_label(value: str) -> str:
+    """Return label value with backslashes, quotes and newlines escaped."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: LABELS_TYPE) -> str:
+    """Return labels formatted for a sample line."""
+    if not labels:
+        return ""
+    pairs = (f'{key}="{escape_label(val)}"' for key, val in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: NUMERIC_TYPE) -> str:
+    """Return integers as such and other numbers as Python floats."""
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsText:
+    """Accumulates metric families as OpenMetrics text."""
+
+    def __init__(self) -> None:
+        """Init empty exposition."""
+        self.lines: list[str] = []
+
+    def family(
+        self, name: str, metric_type: str, help_text: str, samples: list[SAMPLE_TYPE]
+    ) -> None:
+        """Add a metric family and its samples."""
+        self.lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+        self.lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        for suffix, labels, value in samples:
+            self.lines.append(
+                f"{PREFIX}{name}{suffix}{format_labels(labels)} {format_value(value)}"
+            )
+
+    def render(self) -> str:
+        """Return exposition, terminated as OpenMetrics requires."""
+        return "\n".join([*self.lines, "# EOF", ""])
+
+
+def render_metrics(dispatcher: "MultiDispatcher") -> str:
+    """Return current metrics of a dispatcher as OpenMetrics text.
+
+    Counters of launches, retirements, failures and requeues may be
+    turned into rates by the scraper.  Quantiles of service time are
+    from the stats sketches, so they cover the life of the dispatcher.
+    """
+    stats = dispatcher.queue_stats
+    counts = stats.report_event_counts()
+    servers = [worker.name for worker in dispatcher.workers]
+    text = MetricsText()
+    text.family(
+        "elapsed_seconds",
+        "gauge",
+        "Time since dispatcher creation.",
+        [("", {}, dispatcher.timer.time() / 1000.0)],
+    )
+    text.family(
+        "last_retirement_seconds",
+        "gauge",
+        "Elapsed time at the most recent retirement.",
+        [
+            ("", {"server": name}, retired / 1000.0)
+            for name in [*servers, ALL]
+            if (retired := stats["retirement_t"].get(VALUE, worker=name)) is not None
+        ],
+    )
+    for event_name in EVENT_NAMES:
+        text.family(
+            event_name,
+            "counter",
+            f"Requests {event_name} per server.",
+            [
+                ("_total", {"server": name}, counts[name][event_name])
+                for name in servers
+            ],
+        )
+    text.family(
+        "downloaded_bytes",
+        "counter",
+        "Bytes downloaded per server.",
+        [
+            ("_total", {"server": name}, stats["bytes"].get(TOTAL, worker=name) or 0)
+            for name in servers
+        ],
+    )
+    text.family(
+        "download_rate_mbps",
+        "gauge",
+        "Cumulative download rate in Mbit/s.",
+        [
+            ("", {"server": name}, rate)
+            for name in [*servers, ALL]
+            if (rate := stats["cum_rate"].get(VALUE, worker=name)) is not None
+        ],
+    )
+    text.family(
+        "inflight_depth",
+        "gauge",
+        "Requests in flight per server.",
+        [("", {"server": name}, len(dispatcher.inflight[name])) for name in servers],
+    )
+    text.family(
+        "depth_limit",
+        "gauge",
+        "Current limit on requests in flight per server.",
+        [
+            ("", {"server": name}, state.depth_limit())
+            for name, state in dispatcher.controller.servers.items()
+        ],
+    )
+    service_samples: list[SAMPLE_TYPE] = []
+    for name in [*servers, ALL]:
+        service_t = stats["service_t"][name]
+        for q in QUANTILES.values():
+            value = service_t.quantile(q)
+            if value is not None:
+                service_samples.append(
+                    ("", {"server": name, "quantile": str(q)}, value / 1000.0)
+                )
+        total = service_t.total
+        if total is not None:
+            service_samples.append(("_sum", {"server": name}, total / 1000.0))
+            service_samples.append(("_count", {"server": name}, service_t.n_obs))
+    text.family(
+        "service_seconds", "summary", "Service time of requests.", service_samples
+    )
+    text.family(
+        "soft_fails",
+        "counter",
+        "Failures to be retried, per server.",
+        [("_total", {"server": w.name}, w.n_soft_fails) for w in dispatcher.workers],
+    )
+    text.family(
+        "hard_fails",
+        "counter",
+        "Failures not to be retried, per server.",
+        [("_total", {"server": w.name}, w.n_hard_fails) for w in dispatcher.workers],
+    )
+    text.family(
+        "exceptions",
+        "counter",
+        "Exceptions raised by workers.",
+        [("_total", {}, dispatcher.n_exceptions)],
+    )
+    return text.render()
+
+
+class MetricsExporter:
+    """Writes metrics to a textfile, serves them over HTTP, or both.
+
+    Metrics are rendered by update(), which the dispatcher calls each
+    time stats are drained, so scrapes cost no more than a copy.  The
+    textfile is replaced atomically for the node-exporter collector.
+    """
+
+    def __init__(
+        self,
+        dispatcher: "MultiDispatcher",
+        textfile: Optional[str] = None,
+        port: Optional[int] = None,
+        host: str = METRICS_HOST,
+        logger: Optional[Logger] = None,
+    ) -> None:
+        """Init with dispatcher and outputs."""
+        self.dispatcher = dispatcher
+        self.logger = logger
+        self.textfile = None if textfile is None else Path(textfile)
+        self.port = port
+        self.host = host
+        self.bound_port: Optional[int] = None
+        self.text = render_metrics(dispatcher)
+
+    def update(self) -> None:
+        """Render current metrics and write the textfile, if any."""
+        self.text = render_metrics(self.dispatcher)
+        if self.textfile is not None:
+            tmp_path = self.textfile.with_name(f".{self.textfile.name}.{os.getpid()}")
+            tmp_path.write_text(self.text)
+            tmp_path.replace(self.textfile)
+
+    async def serve(self, *, task_status=anyio.TASK_STATUS_IGNORED) -> None:
+        """Serve metrics over HTTP until cancelled.
+
+        Failure to listen is logged rather than raised, so that
+        downloads go on without metrics.
+        """
+        if self.port is None:
+            task_status.started()
+            return
+        try:
+            listener = await anyio.create_tcp_listener(
+                local_host=self.host, local_port=self.port
+            )
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.error(f"Metrics not served on port {self.port}: {e}")
+            task_status.started()
+            return
+        self.bound_port = listener.listeners[0].extra(SocketAttribute.local_port)
+        task_status.started()
+        await listener.serve(self.handle)
+
+    async def handle(self, client: SocketStream) -> None:
+        """Answer one HTTP request for metrics."""
+        async with client:
+            request = b""
+            with anyio.move_on_after(METRICS_TIMEOUT):
+                while b"\r\n\r\n" not in request and len(request) < METRICS_READ_LIMIT:
+                    try:
+                        request += await client.receive()
+                    except anyio.EndOfStream:
+                        break
+            request_line = request.split(b"\r\n", 1)[0].split()
+            status, content_type, body = "200 OK", CONTENT_TYPE, self.text
+            if request_line[:2] != [b"GET", b"/metrics"]:
+                status, content_type, body = "404 Not Found", "text/plain", "\n"
+            payload = body.encode()
+            header = (
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+            )
+            await client.send(header.encode() + payload)
@@ -2,32 +2,76 @@
 
 import logging
 import sys
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from contextlib import suppress
+from typing import TYPE_CHECKING
+from typing import Any
 from typing import Optional
-from typing import Union
+from typing import cast
 
 # third-party imports
 import anyio
 import httpx
+from anyio.streams.memory import MemoryObjectReceiveStream
+from anyio.streams.memory import MemoryObjectSendStream
 
+from .argument_source import ARG_SOURCE_TYPE
+from .argument_source import ArgumentSource
+from .common import DEFAULT_ARG_BUFFER
+from .common import DEFAULT_BW_MAX_MBPS
 from .common import DEFAULT_MAX_RETRIES
+from .common import DEFAULT_MODAL_SIZE
+from .common import DEFAULT_N_MIN
+from .common import FILENAME_KEY
+from .common import HEDGE_POLL_MS
 from .common import INDEX_KEY
 from .common import SIMPLE_TYPES
+from .common import STATS_INTERVAL
 from .common import Logger
 from .common import MillisecondTimer
-from .dict_to_indexed_list import NonStringIterable
-from .dict_to_indexed_list import zip_dict_to_indexed_list
 from .downloader import Downloader
 from .downloader import MockDownloader
+from .event_ring import EventRing
+from .inflight_table import InflightTable
+from .instrumented_streams import CONSUMER_TYPE
 from .instrumented_streams import ArgumentStream
 from .instrumented_streams import FailureStream
+from .instrumented_streams import RacerResultStream
 from .instrumented_streams import ResultStream
+from .instrumented_streams import get_index_value
+from .job import Job
+from .job import sole_exception
+from .launch_controller import LaunchController
+from .metrics import MetricsExporter
+from .progress import ProgressDisplay
+from .result_store import ResultStore
+from .scheduler import AFFINITY_TYPE
+from .scheduler import PRIORITY_TYPE
 from .server_defs import ServerDef
+from .server_profile import ProfileStore
+from .size_schedule import SIZES_TYPE
+from .size_schedule import SizedArgumentStream
 from .stream_stats import StreamStats
+from .sync_manifest import SyncManifest
+from .trace_sink import TraceSink
+
+
+if TYPE_CHECKING:
+    from anyio.abc import TaskGroup
+
+
+RECORD_ITEM_TYPE = tuple[dict[str, SIMPLE_TYPES], bool]
 
 
 class MultiDispatcher:
-    """Runs multiple single-site dispatchers sharing streams."""
+    """Runs multiple single-site dispatchers sharing streams.
+
+    Within an ``async with`` block, batches may be submitted as jobs
+    that run concurrently, sharing servers, connection pools, launch
+    rates and statistics.
+    """
 
     def __init__(  # noqa: C901
         self,
@@ -41,6 +85,18 @@ class MultiDispatcher:
         output_dir: Optional[str] = None,
         mock: bool = False,
         runner: str = "production",
+        modal_size: int = DEFAULT_MODAL_SIZE,
+        bw_max_mbps: float = DEFAULT_BW_MAX_MBPS,
+        n_min: int = DEFAULT_N_MIN,
+        sync: Optional[str] = None,
+        hedge_percentile: float = 0.0,
+        arg_buffer: int = DEFAULT_ARG_BUFFER,
+        profile_file: Optional[str] = None,
+        probe_path: Optional[str] = None,
+        metrics_file: Optional[str] = None,
+        metrics_port: Optional[int] = None,
+        progress: Optional[bool] = None,
+        trace_file: Optional[str] = None,
     ) -> None:
         """Save list of dispatchers."""
         self._logger: Logger
@@ -60,6 +116,26 @@ class MultiDispatcher:
                     self._logger.error(f"Worker name {worker_name} not found.")
                     sys.exit(1)
                 worker_defs.append(all_worker_defs[worker_idx])
+        self.inflight = InflightTable()
+        self.worker_counter: Counter[str] = Counter()
+        self.timer = MillisecondTimer()
+        self.controller = LaunchController(
+            self.timer,
+            self.inflight,
+            modal_size=modal_size,
+            bw_max_mbps=bw_max_mbps,
+            n_min=n_min,
+        )
+        self.manifest: Optional[SyncManifest] = None
+        if sync is not None:
+            if output_dir is None:
+                self._logger.error("Sync requires an output directory.")
+                sys.exit(1)
+            try:
+                self.manifest = SyncManifest(output_dir, mode=sync)
+            except ValueError as e:
+                self._logger.error(e)
+                sys.exit(1)
         self.workers = []
         worker_factory: type[MockDownloader | Downloader] = Downloader
         if mock:
@@ -67,17 +143,39 @@ class MultiDispatcher:
         for i, worker_def in enumerate(worker_defs):
             try:
                 worker = worker_factory(
-                    i, self._logger, output_dir, quiet, **worker_def.get_all()  # type: ignore
+                    i,
+                    self._logger,
+                    output_dir,
+                    quiet,
+                    self.controller,
+                    self.manifest,
+                    **worker_def.get_all(),  # type: ignore
                 )
             except Exception as e: # noqa: BLE001
                 self._logger.warning(f"Worker {worker_def.name} failed to initialize.")
                 self._logger.warning(e)
                 continue
             self.workers.append(worker)
+            self.controller.add_server(
+                worker.name,
+                d_max=worker.queue_depth,
+                bw_limit_mbps=worker.bw_limit,
+            )
         if len(self.workers) == 0:
             self._logger.error("No valid workers found.")
             sys.exit(1)
+        self.worker_by_name = {worker.name: worker for worker in self.workers}
+        self.profiles: Optional[ProfileStore] = None
+        if profile_file is not None:
+            self.profiles = ProfileStore(profile_file)
+            for worker in self.workers:
+                profile = self.profiles.get(worker.name)
+                if profile is not None:
+                    self.controller.apply_profile(worker.name, profile)
         self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self.arg_buffer = arg_buffer
+        self.probe_path = probe_path
         self.backend_options = {}
         if runner == "production":
             self.backend = "asyncio"
@@ -91,48 +189,358 @@ class MultiDispatcher:
         else:
             self._logger.error(f"Unknown runner configuration {runner}")
             sys.exit(1)
-        self.exception_counter: dict[int, int] = {}
+        self.jobs: set[Job] = set()
+        self.n_jobs = 0
+        self._job_group: Optional[TaskGroup] = None
         self.n_too_many_retries = 0
         self.n_exceptions = 0
         self.quiet = quiet
         self.queue_stats = StreamStats(all_worker_names, history_len=history_len)
+        self.events = EventRing(all_worker_names, self.timer)
+        self._pump_scope: Optional[anyio.CancelScope] = None
         self._lock = anyio.Lock()
-        self.inflight: dict[str, SIMPLE_TYPES] = {}
-        self.timer = MillisecondTimer()
+        self.metrics: Optional[MetricsExporter] = None
+        if metrics_file is not None or metrics_port is not None:
+            self.metrics = MetricsExporter(
+                self, textfile=metrics_file, port=metrics_port, logger=self._logger
+            )
+        if progress is None:
+            progress = not quiet and sys.stderr.isatty()
+        self.progress: Optional[ProgressDisplay] = None
+        if progress:
+            self.progress = ProgressDisplay(self)
+        self.trace: Optional[TraceSink] = None
+        if trace_file is not None:
+            self.trace = TraceSink(trace_file, all_worker_names)
+
+    async def start(self, probe_path: Optional[str] = None) -> None:
+        """Open and warm worker connections, probing a path if given."""
+        async with anyio.create_task_group() as tg:
+            for worker in self.workers:
+                tg.start_soon(worker.start, probe_path)
+
+    async def stop(self) -> None:
+        """Close worker connections."""
+        async with anyio.create_task_group() as tg:
+            for worker in self.workers:
+                tg.start_soon(worker.stop)
+
+    async def __aenter__(self) -> "MultiDispatcher":
+        """Start workers, probing probe_path if set, for repeated runs."""
+        await self.start(self.probe_path)
+        self._job_group = anyio.create_task_group()
+        await self._job_group.__aenter__()
+        self._pump_scope = anyio.CancelScope()
+        self._job_group.start_soon(self.pump_stats, self._pump_scope)
+        if self.progress is not None:
+            self.progress.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> Optional[bool]:
+        """Wait for submitted jobs, then stop workers."""
+        job_group = self._job_group
+        self._job_group = None
+        try:
+            if exc_info[1] is None:
+                while self.jobs:
+                    await next(iter(self.jobs)).join()
+            if self._pump_scope is not None:
+                self._pump_scope.cancel()
+                self._pump_scope = None
+            return await job_group.__aexit__(*exc_info)  # type: ignore
+        finally:
+            self.drain_stats()
+            if self.progress is not None:
+                self.progress.close()
+            if self.trace is not None:
+                await self.trace.close()
+            await self.stop()
+
+    async def pump_stats(self, scope: anyio.CancelScope) -> None:
+        """Drain events into queue stats periodically until cancelled.
+
+        Metrics are served alongside, if a port was given, and traced
+        attempts are written as they are drained.
+        """
+        with scope:
+            async with anyio.create_task_group() as tg:
+                if self.metrics is not None:
+                    await tg.start(self.metrics.serve)
+                while True:
+                    await anyio.sleep(STATS_INTERVAL)
+                    self.drain_stats()
+                    if self.trace is not None:
+                        await self.trace.flush()
+
+    def drain_stats(self) -> None:
+        """Update queue stats from events emitted since the last drain."""
+        events = self.events.drain()
+        if events is not None:
+            self.queue_stats.add_events(events)
+            if self.trace is not None:
+                self.trace.add(events)
+        if self.events.n_lost > 0:
+            self._logger.warning(
+                f"{self.events.n_lost} events were lost before stats update."
+            )
+            self.events.n_lost = 0
+        if self.metrics is not None:
+            self.metrics.update()
+        if self.progress is not None:
+            self.progress.update()
+
+    def submit(self, args: ARG_SOURCE_TYPE, **kwargs) -> Job:
+        """Start a run of args in the background and return its handle.
+
+        Keyword arguments are passed to run().  Jobs run concurrently
+        until they finish or the ``async with`` block is left, which
+        waits for all of them.  Only live jobs are kept in jobs, so
+        handles of finished jobs are held only by the caller.
+        """
+        if self._job_group is None:
+            raise RuntimeError("Jobs may be submitted only within async with.")
+        job = Job(self.n_jobs)
+        self.n_jobs += 1
+        self.jobs.add(job)
+        self._job_group.start_soon(self.run_job, job, args, kwargs)
+        return job
+
+    async def run_job(self, job: Job, args: ARG_SOURCE_TYPE, kwargs: dict) -> None:
+        """Run a job, recording its output or error on its handle."""
+        output = None
+        error = None
+        try:
+            with job.cancel_scope:
+                output = await self.run(args, job=job, **kwargs)
+                output[2]["job"] = job.job_id
+        except Exception as e:  # noqa: BLE001
+            error = sole_exception(e)
+            self._logger.warning(f"Job {job.job_id} failed: {error}")
+        finally:
+            if job.arg_q is not None:
+                job.arg_q.abandon_all()
+            self.jobs.discard(job)
+            job.finish(output, error)
 
     async def run(
         self,
-        args: Union[
-            list[dict[str, SIMPLE_TYPES]],
-            dict[str, Union[NonStringIterable, SIMPLE_TYPES]],
-        ],
+        args: ARG_SOURCE_TYPE,
+        file_sizes: Optional[SIZES_TYPE] = None,
+        priority: Optional[PRIORITY_TYPE] = None,
+        affinity: Optional[AFFINITY_TYPE] = None,
+        on_result: Optional[CONSUMER_TYPE] = None,
+        on_failure: Optional[CONSUMER_TYPE] = None,
+        sort: bool = True,
+        columnar: bool = False,
+        job: Optional[Job] = None,
     ):
-        """Run the multidispatcher queue."""
-        if isinstance(args, list):
-            arg_list = args
-        elif isinstance(args, dict):
-            arg_list = zip_dict_to_indexed_list(args)
-        arg_q = ArgumentStream(arg_list, self.inflight, self.timer)
-        result_stream = ResultStream(self.inflight)
-        failure_stream = FailureStream(self.inflight)
+        """Run the multidispatcher queue.
 
-        async with anyio.create_task_group() as tg:
-            for worker in self.workers:
-                tg.start_soon(
-                    self.dispatcher, worker, arg_q, result_stream, failure_stream
-                )
+        Arguments may be a list or iterable of indexed dictionaries,
+        an async iterable of them, a dictionary to be zipped on its
+        iterable values, or the path of a file of paths.  They are
+        read lazily, no more than arg_buffer ahead of launch.
+
+        If file sizes are given, as a sequence or a dictionary keyed
+        by index, all arguments are read and scheduled by size.
+        Otherwise, priority and affinity are optional functions of
+        arguments returning a priority (lowest launched first) and the
+        names of servers preferred for launch.
+
+        Records are passed to on_result or on_failure as they retire,
+        if given, and are not returned.  If columnar is True, records
+        not passed to a callback are returned in ResultStore columns
+        rather than as lists of dictionaries.  Returned records are
+        sorted by index unless sort is False.
+
+        Runs may overlap.  If a job handle is given, its streams are
+        attached to it for live counts.  A run awaited outside of
+        ``async with`` pumps stats and closes the trace itself.
+        """
+        result_store = ResultStore(self.timer)
+        failure_store = ResultStore(self.timer)
+        if columnar:
+            on_result = on_result or result_store.add
+            on_failure = on_failure or failure_store.add
+        result_stream = ResultStream(
+            self.inflight, self.controller, consumer=on_result, events=self.events
+        )
+        failure_stream = FailureStream(
+            self.inflight, consumer=on_failure, events=self.events
+        )
+        source = ArgumentSource(
+            args,
+            skip=None if self.manifest is None else self.is_current,
+            on_skip=lambda skipped_args: result_stream.consume(
+                self.skipped_result(skipped_args)
+            ),
+        )
+        arg_q = await self.argument_stream(source, file_sizes, priority, affinity)
+        if job is not None:
+            job.attach(arg_q, result_stream, failure_stream)
 
-        # Process results into pandas data frame in input order.
-        results = result_stream.get_all()
-        fails = failure_stream.get_all()
-        stats = {
-            "requests": len(arg_list),
-            "downloaded": len(results),
-            "failed": len(fails),
+        await self.run_dispatchers(arg_q, result_stream, failure_stream)
+
+        results = result_stream.get_all(sort=False)
+        fails = failure_stream.get_all(sort=sort)
+        stats: dict[str, SIMPLE_TYPES] = {
+            "requests": source.n_read,
+            "downloaded": result_stream.count,
+            "failed": failure_stream.count,
             "workers": len(self.workers),
         }
+        stats.update(self.controller.saturation.report())
+        if self.profiles is not None:
+            self.save_profiles(self.profiles)
+        if self.manifest is not None:
+            self.manifest.save()
+            stats["skipped"] = source.n_skipped
+        if columnar:
+            if sort:
+                result_store.sort()
+                failure_store.sort()
+            return result_store, failure_store, stats
+        if sort:
+            results.sort(key=get_index_value)
         return results, fails, stats
 
+    async def run_dispatchers(
+        self,
+        arg_q: ArgumentStream,
+        result_stream: ResultStream,
+        failure_stream: FailureStream,
+    ) -> None:
+        """Run a dispatcher per worker, then drain stats and write the trace.
+
+        Outside of ``async with``, stats are pumped here and the trace
+        is closed at the end, since no __aexit__ will close it.
+        """
+        pump_scope = None
+        if self._pump_scope is None:
+            pump_scope = self._pump_scope = anyio.CancelScope()
+        async with anyio.create_task_group() as pump_tg:
+            if pump_scope is not None:
+                pump_tg.start_soon(self.pump_stats, pump_scope)
+            try:
+                async with anyio.create_task_group() as tg:
+                    for worker in self.workers:
+                        tg.start_soon(
+                            self.dispatcher,
+                            worker,
+                            arg_q,
+                            result_stream,
+                            failure_stream,
+                        )
+            finally:
+                if pump_scope is not None:
+                    pump_scope.cancel()
+                    self._pump_scope = None
+        self.drain_stats()
+        if self.trace is not None:
+            if pump_scope is None:
+                await self.trace.flush()
+            else:
+                await self.trace.close()
+
+    async def argument_stream(
+        self,
+        source: ArgumentSource,
+        file_sizes: Optional[SIZES_TYPE],
+        priority: Optional[PRIORITY_TYPE],
+        affinity: Optional[AFFINITY_TYPE],
+    ) -> ArgumentStream:
+        """Return stream of arguments, scheduled by size if sizes are given."""
+        if file_sizes is not None:
+            return SizedArgumentStream(
+                await source.read_all(),
+                file_sizes,
+                self.inflight,
+                self.timer,
+                self.controller,
+                worker_counter=self.worker_counter,
+                events=self.events,
+            )
+        return ArgumentStream(
+            source,
+            self.inflight,
+            self.timer,
+            priority=priority,
+            affinity=affinity,
+            buffer_size=self.arg_buffer,
+            controller=self.controller,
+            worker_counter=self.worker_counter,
+            events=self.events,
+        )
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        args: ARG_SOURCE_TYPE,
+        max_buffer_size: int = DEFAULT_ARG_BUFFER,
+        **kwargs,
+    ) -> AsyncIterator[MemoryObjectReceiveStream[RECORD_ITEM_TYPE]]:
+        """Run in the background, yielding a stream of records as they retire.
+
+        Stream items are tuples of a record and whether it is a failure.
+        Workers block when max_buffer_size records are waiting to be
+        received, and leaving the context cancels transfers in
+        progress.  Other keyword arguments are passed to run().
+        """
+        send_stream: MemoryObjectSendStream[RECORD_ITEM_TYPE]
+        receive_stream: MemoryObjectReceiveStream[RECORD_ITEM_TYPE]
+        send_stream, receive_stream = anyio.create_memory_object_stream(
+            max_buffer_size=max_buffer_size
+        )
+
+        async def on_result(record: dict[str, SIMPLE_TYPES]) -> None:
+            """Send result record."""
+            await send_stream.send((record, False))
+
+        async def on_failure(record: dict[str, SIMPLE_TYPES]) -> None:
+            """Send failure record."""
+            await send_stream.send((record, True))
+
+        async def run_and_close() -> None:
+            """Run dispatchers, then close stream."""
+            async with send_stream:
+                await self.run(
+                    args, on_result=on_result, on_failure=on_failure, **kwargs
+                )
+
+        async with anyio.create_task_group() as tg, receive_stream:
+            tg.start_soon(run_and_close)
+            try:
+                yield receive_stream
+            finally:
+                tg.cancel_scope.cancel()
+
+    def save_profiles(self, profiles: ProfileStore) -> None:
+        """Update and write profiles of servers characterized this session."""
+        for worker in self.workers:
+            profile = self.controller.profile(worker.name)
+            if profile is not None:
+                profiles.update(worker.name, profile)
+        profiles.save()
+
+    def is_current(self, args: dict[str, SIMPLE_TYPES]) -> bool:
+        """Return True if the manifest shows the output file is current."""
+        filename = args.get(FILENAME_KEY)
+        return (
+            filename is not None
+            and self.manifest is not None
+            and self.manifest.is_current(str(filename))
+        )
+
+    @staticmethod
+    def skipped_result(args: dict[str, SIMPLE_TYPES]) -> dict[str, SIMPLE_TYPES]:
+        """Return result record for arguments skipped as current."""
+        return {
+            INDEX_KEY: args[INDEX_KEY],
+            "worker": None,
+            "bytes": 0,
+            "sync": "skipped",
+        }
+
     async def dispatcher(
         self,
         worker,
@@ -140,68 +548,237 @@ class MultiDispatcher:
         result_q: ResultStream,
         failure_q: FailureStream,
     ):
-        """Dispatch tasks to worker functions and handle exceptions."""
-        while True:
-            try:
-                # Get a set of arguments from the queue.
-                kwargs, worker_count = await arg_q.get(worker_name=worker.name)
-            except anyio.WouldBlock:
-                return
-            if worker_count > 0:
-                # Do rate limiting, if a limiter is found in worker.
-                with suppress(AttributeError): # okay if worker has no limiter
-                    await worker.limiter()
-            # Do the work and handle any exceptions encountered.
-            try:
-                await worker.worker(result_q, worker_count, **kwargs)
-            except worker.soft_exceptions as e:
-                # Errors to be requeued by worker, unless too many
-                async with self._lock:
-                    idx = kwargs[INDEX_KEY]
-                    self.n_exceptions += 1
-                    if idx not in self.exception_counter:
-                        self.exception_counter[idx] = 1
-                    else:
-                        self.exception_counter[idx] += 1
-                    n_exceptions = self.exception_counter[idx]
-                if self.max_retries > 0 and n_exceptions >= self.max_retries:
-                    await worker.hard_exception_handler(
-                        idx, worker.name, worker_count, e, failure_q
-                    )
+        """Launch tasks on a worker while its queue depth allows."""
+        gate = self.controller.gate(worker.name)
+        shutdown = anyio.Event()
+        n_launched = 0
+        async with anyio.create_task_group() as tg:
+            while not shutdown.is_set():
+                await gate.acquire()
+                launched = False
+                try:
+                    if shutdown.is_set():
+                        break
+                    if n_launched > 0:
+                        # Do rate limiting before launch, if a limiter is found.
+                        with suppress(AttributeError): # okay if worker has no limiter
+                            await worker.limiter()
+                    with suppress(anyio.WouldBlock):
+                        # Get a set of arguments from the queue.
+                        kwargs, worker_count = await arg_q.get(worker_name=worker.name)
+                        tg.start_soon(
+                            self.launch,
+                            worker,
+                            kwargs,
+                            worker_count,
+                            arg_q,
+                            result_q,
+                            failure_q,
+                            shutdown,
+                        )
+                        launched = True
+                finally:
+                    # Slots not passed to a launch are given back, even on cancel.
+                    if not launched:
+                        gate.release()
+                if launched:
+                    n_launched += 1
+                elif arg_q.n_inflight(worker.name) > 0:
+                    # In-flight requests may yet requeue arguments.
+                    await gate.wait_release()
+                elif arg_q.held():
+                    with suppress(AttributeError):
+                        await worker.limiter()
                 else:
-                    await worker.soft_exception_handler(
-                        kwargs, worker.name, worker_count, e, arg_q
-                    )
-            except worker.hard_exceptions as e:
-                idx = kwargs[INDEX_KEY]
+                    return
+
+    async def launch(
+        self,
+        worker,
+        kwargs: dict[str, SIMPLE_TYPES],
+        worker_count: int,
+        arg_q: ArgumentStream,
+        result_q: ResultStream,
+        failure_q: FailureStream,
+        shutdown: anyio.Event,
+    ):
+        """Do one work unit on a worker, then give back its depth slot."""
+        try:
+            await self.work(
+                worker, kwargs, worker_count, arg_q, result_q, failure_q, shutdown
+            )
+        except BaseException:
+            # Cancelled launches will not retire.
+            arg_q.abandon(worker.name, worker_count)
+            raise
+        finally:
+            self.controller.gate(worker.name).release()
+
+    async def work(
+        self,
+        worker,
+        kwargs: dict[str, SIMPLE_TYPES],
+        worker_count: int,
+        arg_q: ArgumentStream,
+        result_q: ResultStream,
+        failure_q: FailureStream,
+        shutdown: anyio.Event,
+    ):
+        """Do one work unit on a worker and handle exceptions."""
+        try:
+            if self.hedge_percentile > 0.0:
+                await self.hedged_work(worker, kwargs, worker_count, arg_q, result_q)
+            else:
+                await worker.worker(result_q, worker_count, **kwargs)
+        except worker.soft_exceptions as e:
+            # Errors to be requeued by worker, unless too many
+            async with self._lock:
+                idx = cast(int, kwargs[INDEX_KEY])
+                self.n_exceptions += 1
+                arg_q.exception_counter[idx] += 1
+                n_exceptions = arg_q.exception_counter[idx]
+            if self.max_retries > 0 and n_exceptions >= self.max_retries:
                 await worker.hard_exception_handler(
                     idx, worker.name, worker_count, e, failure_q
                 )
-            except httpx.ConnectError:
+            else:
                 await worker.soft_exception_handler(
-                    kwargs,
-                    worker.name,
-                    worker_count,
-                    f"Server '{worker.name!r}' shutdown due to ConnectError",
-                    arg_q,
+                    kwargs, worker.name, worker_count, e, arg_q
                 )
-                return
-            except Exception as e: # noqa: BLE001
-                # unhandled errors go to unhandled exception handler
-                idx = kwargs[INDEX_KEY]
-                await worker.unhandled_exception_handler(idx, e)
+        except worker.hard_exceptions as e:
+            idx = cast(int, kwargs[INDEX_KEY])
+            await worker.hard_exception_handler(
+                idx, worker.name, worker_count, e, failure_q
+            )
+        except httpx.ConnectError:
+            await worker.soft_exception_handler(
+                kwargs,
+                worker.name,
+                worker_count,
+                f"Server '{worker.name!r}' shutdown due to ConnectError",
+                arg_q,
+            )
+            shutdown.set()
+        except Exception as e: # noqa: BLE001
+            # unhandled errors go to unhandled exception handler
+            idx = cast(int, kwargs[INDEX_KEY])
+            await worker.unhandled_exception_handler(idx, e)
+
+    async def hedged_work(
+        self,
+        worker,
+        kwargs: dict[str, SIMPLE_TYPES],
+        worker_count: int,
+        arg_q: ArgumentStream,
+        result_q: ResultStream,
+    ):
+        """Do a work unit, racing a duplicate launch if it straggles.
+
+        If the work takes longer than the hedge percentile of this
+        server's service times, a duplicate is launched on the fastest
+        idle server.  Only the first racer to finish retires a result,
+        and the other is cancelled or, if it finished too, abandoned.
+        """
+        winners: list[str] = []
+        race_q = RacerResultStream(result_q, winners)
+        primary_error = None
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(
+                self.hedge,
+                worker,
+                kwargs,
+                self.timer.time(),
+                arg_q,
+                race_q,
+                tg.cancel_scope,
+            )
+            try:
+                await worker.worker(race_q, worker_count, **kwargs)
+            except Exception as e:  # noqa: BLE001
+                primary_error = e
+            if not winners or winners == [worker.name]:
+                # else the hedge is left to finish putting its result
+                tg.cancel_scope.cancel()
+        if winners and winners != [worker.name]:
+            arg_q.abandon(worker.name, worker_count)
+            worker.discard_partial(**kwargs)
+        elif primary_error is not None:
+            raise primary_error
+
+    async def hedge(
+        self,
+        primary,
+        kwargs: dict[str, SIMPLE_TYPES],
+        launch_t: float,
+        arg_q: ArgumentStream,
+        race_q: RacerResultStream,
+        race_scope: anyio.CancelScope,
+    ):
+        """Once a launch straggles, race a duplicate on the fastest idle server.
+
+        The hedge delay is the hedge percentile of the primary
+        server's service times, checked as they accumulate, so there
+        is no hedging until the server is characterized.
+        """
+        while True:
+            delay = self.controller.hedge_delay(primary.name, self.hedge_percentile)
+            wait_ms = HEDGE_POLL_MS
+            if delay is not None:
+                wait_ms = min(delay - (self.timer.time() - launch_t), wait_ms)
+                if wait_ms <= 0.0:
+                    break
+            await anyio.sleep(wait_ms / 1000.0)
+        name = self.controller.fastest_idle(exclude=primary.name)
+        if name is None:
+            return
+        hedger = self.worker_by_name[name]
+        gate = self.controller.gate(name)
+        await gate.acquire()
+        worker_count: Optional[int] = None
+        won = False
+        try:
+            worker_count = await arg_q.launch(kwargs, worker_name=name)
+            await cast(Any, hedger).worker(race_q, worker_count, **kwargs)
+            won = race_q.winners == [name]
+        except Exception as e:  # noqa: BLE001
+            if not self.quiet:
+                self._logger.warning(f"Hedged request on {name} failed: {e}")
+        finally:
+            gate.release()
+            if not won:
+                if worker_count is not None:
+                    arg_q.abandon(name, worker_count)
+                hedger.discard_partial(**kwargs)
+        if won:
+            race_scope.cancel()
+
+    async def run_started(self, *args):
+        """Run between start and stop of workers."""
+        async with self:
+            return await self.run(*args)
 
     def main(
         self,
-        arg_list: Union[
-            list[dict[str, SIMPLE_TYPES]],
-            dict[str, Union[NonStringIterable, SIMPLE_TYPES]],
-        ],
+        arg_list: ARG_SOURCE_TYPE,
+        file_sizes: Optional[SIZES_TYPE] = None,
+        priority: Optional[PRIORITY_TYPE] = None,
+        affinity: Optional[AFFINITY_TYPE] = None,
+        on_result: Optional[CONSUMER_TYPE] = None,
+        on_failure: Optional[CONSUMER_TYPE] = None,
+        sort: bool = True,
+        columnar: bool = False,
     ):
-        """Start the multidispatcher queue."""
+        """Start the multidispatcher queue in a new event loop."""
         return anyio.run(
-            self.run,
+            self.run_started,
             arg_list,
+            file_sizes,
+            priority,
+            affinity,
+            on_result,
+            on_failure,
+            sort,
+            columnar,
             backend=self.backend,
             backend_options=self.backend_options,
         )
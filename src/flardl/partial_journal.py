@@ -0,0 +1,71 @@
+"""Journal of partially-downloaded files for resumption via HTTP Range."""
+
+import json
+import pathlib
+from typing import Optional
+
+from attrs import asdict
+from attrs import define
+
+from .common import JOURNAL_SUFFIX
+
+
+@define
+class PartialJournal:
+    """Record of a partial download kept next to the partial file.
+
+    The partial file itself is the authority on bytes received, since
+    a run may be killed before the journal is updated.  The journal
+    supplies the URL and the validators needed to resume safely.
+    """
+
+    url: str
+    n_bytes: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @staticmethod
+    def path(part_file_str: str) -> pathlib.Path:
+        """Return path of journal for a partial file."""
+        return pathlib.Path(part_file_str + JOURNAL_SUFFIX)
+
+    @classmethod
+    def load(cls, part_file_str: str) -> Optional["PartialJournal"]:
+        """Return journal for a partial file, or None if absent or bad."""
+        journal_path = cls.path(part_file_str)
+        if not journal_path.exists():
+            return None
+        try:
+            return cls(**json.loads(journal_path.read_text()))
+        except (ValueError, TypeError):
+            return None
+
+    @classmethod
+    def discard(cls, part_file_str: str) -> None:
+        """Remove partial file and its journal, if present."""
+        pathlib.Path(part_file_str).unlink(missing_ok=True)
+        cls.path(part_file_str).unlink(missing_ok=True)
+
+    def save(self, part_file_str: str) -> None:
+        """Write journal for a partial file."""
+        self.path(part_file_str).write_text(json.dumps(asdict(self)))
+
+    def validator(self) -> Optional[str]:
+        """Return strong ETag or Last-Modified date for If-Range."""
+        if self.etag is not None and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def resume_offset(self, part_file_str: str, url: str) -> int:
+        """Return bytes that may be resumed from the partial file."""
+        part_path = pathlib.Path(part_file_str)
+        if url != self.url or self.validator() is None or not part_path.exists():
+            return 0
+        return part_path.stat().st_size
+
+    def resume_headers(self, offset: int) -> dict[str, str]:
+        """Return request headers to resume at offset."""
+        return {
+            "Range": f"bytes={offset}-",
+            "If-Range": str(self.validator()),
+        }
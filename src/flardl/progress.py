@@ -0,0 +1,94 @@
+"""Live display of download progress."""
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Optional
+from typing import TextIO
+
+# third-party imports
+from tqdm import tqdm  # type: ignore[import]
+
+from .common import ALL
+from .common import TOTAL
+from .common import VALUE
+
+
+if TYPE_CHECKING:
+    from .multidispatcher import MultiDispatcher
+
+
+class ProgressDisplay:
+    """Bars of overall progress and of progress on each server.
+
+    The overall bars count files retired and bytes downloaded, and
+    there is one bar of files retired per server with its depth in
+    flight and download rate.  Bars are moved by update(), which the
+    dispatcher calls each time stats are drained, so nothing is
+    printed per file.
+    """
+
+    def __init__(
+        self, dispatcher: "MultiDispatcher", file: Optional[TextIO] = None
+    ) -> None:
+        """Init with dispatcher whose stats are shown and stream shown on."""
+        self.dispatcher = dispatcher
+        self.file = file
+        self.bars: dict[str, Any] = {}
+
+    def bar(self, position: int, **kwargs) -> Any:
+        """Return a new bar refreshed only when moved."""
+        return tqdm(
+            position=position,
+            file=self.file,
+            mininterval=0.0,
+            dynamic_ncols=True,
+            leave=True,
+            **kwargs,
+        )
+
+    def open(self) -> None:
+        """Create bars."""
+        names = [worker.name for worker in self.dispatcher.workers]
+        width = max(len(name) for name in [*names, "files"])
+        self.bars = {
+            "files": self.bar(0, desc="files".ljust(width), unit="file"),
+            "bytes": self.bar(
+                1,
+                desc="bytes".ljust(width),
+                unit="B",
+                unit_scale=True,
+                unit_divisor=1024,
+            ),
+        }
+        for position, name in enumerate(names, start=2):
+            self.bars[name] = self.bar(position, desc=name.ljust(width), unit="file")
+
+    def update(self) -> None:
+        """Move bars to current counts."""
+        if not self.bars:
+            return
+        stats = self.dispatcher.queue_stats
+        counts = stats.report_event_counts()
+        self.move("files", counts[ALL]["retired"], failed=counts[ALL]["failed"])
+        self.move("bytes", int(stats["bytes"].get(TOTAL) or 0))
+        for worker in self.dispatcher.workers:
+            self.move(
+                worker.name,
+                counts[worker.name]["retired"],
+                depth=len(self.dispatcher.inflight[worker.name]),
+                mbps=stats["cum_rate"].get(VALUE, worker=worker.name) or 0,
+            )
+
+    def move(self, key: str, n: int, **postfix) -> None:
+        """Move a bar to count n, showing postfix values if given."""
+        progress_bar = self.bars[key]
+        if postfix:
+            progress_bar.set_postfix(postfix, refresh=False)
+        progress_bar.update(n - progress_bar.n)
+
+    def close(self) -> None:
+        """Update and close bars."""
+        self.update()
+        for progress_bar in self.bars.values():
+            progress_bar.close()
+        self.bars = {}
@@ -0,0 +1,102 @@
+"""Mergeable streaming quantile and mode estimates from log-binned counts."""
+
+import math
+from collections import Counter
+from collections.abc import Iterable
+from typing import Optional
+
+# third-party imports
+import numpy as np
+
+from .common import MODE_BIN_WIDTH
+from .common import NUMERIC_TYPE
+
+
+class LogHistogramSketch:
+    """Counts of positive values in bins of fixed width in log space.
+
+    Memory grows only with the dynamic range of the values (about
+    280 bins for twelve decades at the default width), and estimates
+    are good to about half a bin width, 5% by default.  Non-positive
+    values are counted below the lowest bin.  Estimates are clamped
+    to the observed range, so they are exact for a single value.
+    Sketches with the same bin width can be merged.
+    """
+
+    __slots__ = ("bin_width", "counts", "maximum", "minimum", "n_nonpos", "n_obs")
+
+    def __init__(self, bin_width: float = MODE_BIN_WIDTH):
+        """Init empty sketch."""
+        self.bin_width = bin_width
+        self.counts: Counter[int] = Counter()
+        self.n_nonpos = 0
+        self.n_obs = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def _update_range(self, low: float, high: float) -> None:
+        """Extend observed range."""
+        if self.minimum is None or low < self.minimum:
+            self.minimum = low
+        if self.maximum is None or high > self.maximum:
+            self.maximum = high
+
+    def add(self, value: NUMERIC_TYPE) -> None:
+        """Count one value."""
+        self.n_obs += 1
+        self._update_range(value, value)
+        if value > 0:
+            self.counts[math.floor(math.log(value) / self.bin_width)] += 1
+        else:
+            self.n_nonpos += 1
+
+    def add_many(self, values: Iterable[NUMERIC_TYPE]) -> None:
+        """Count many values at once."""
+        arr = np.asarray(values if isinstance(values, np.ndarray) else list(values))
+        if arr.size == 0:
+            return
+        self.n_obs += int(arr.size)
+        self._update_range(float(arr.min()), float(arr.max()))
+        positive = arr[arr > 0]
+        self.n_nonpos += int(arr.size - positive.size)
+        bins, bin_counts = np.unique(
+            np.floor(np.log(positive) / self.bin_width).astype(np.int64),
+            return_counts=True,
+        )
+        self.counts.update(dict(zip(bins.tolist(), bin_counts.tolist())))
+
+    def merge(self, other: "LogHistogramSketch") -> None:
+        """Add counts from another sketch of the same bin width."""
+        if other.bin_width != self.bin_width:
+            raise ValueError("Cannot merge sketches of different bin widths.")
+        if other.n_obs == 0:
+            return
+        self.counts.update(other.counts)
+        self.n_nonpos += other.n_nonpos
+        self.n_obs += other.n_obs
+        self._update_range(float(other.minimum), float(other.maximum))  # type: ignore
+
+    def _center(self, bin_idx: int) -> float:
+        """Return geometric center of a bin, clamped to observed range."""
+        center = math.exp((bin_idx + 0.5) * self.bin_width)
+        return min(max(center, float(self.minimum)), float(self.maximum))  # type: ignore
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return estimate of the q-th quantile, for q between 0 and 1."""
+        if self.n_obs == 0:
+            return None
+        rank = q * self.n_obs
+        if rank <= self.n_nonpos:
+            return float(self.minimum)  # type: ignore
+        cumulative = self.n_nonpos
+        for bin_idx in sorted(self.counts):
+            cumulative += self.counts[bin_idx]
+            if cumulative >= rank:
+                return self._center(bin_idx)
+        return float(self.maximum)  # type: ignore
+
+    def mode(self) -> Optional[float]:
+        """Return center of the most populated bin."""
+        if not self.counts:
+            return self.minimum
+        return self._center(max(self.counts, key=self.counts.__getitem__))
@@ -0,0 +1,67 @@
+"""Token-bucket shaping of download bandwidth."""
+
+from time import monotonic
+from typing import Optional
+
+# third-party imports
+import anyio
+
+from .common import BW_BURST_TIME
+from .common import BYTES_TO_MEGABITS
+
+
+class TokenBucket:
+    """Bucket of byte tokens refilled at a fixed rate.
+
+    Consumers reserve tokens immediately and may drive the bucket
+    into debt, then sleep until the debt would have been repaid.
+    This keeps each draw O(1) and serves waiters in arrival order.
+    """
+
+    def __init__(self, rate_mbps: float, burst_time: float = BW_BURST_TIME):
+        """Init with rate in Mbit/s and burst duration in seconds."""
+        self.rate = rate_mbps / BYTES_TO_MEGABITS  # bytes per second
+        self.capacity = self.rate * burst_time
+        self.tokens = self.capacity
+        self._last = monotonic()
+
+    def reserve(self, n_bytes: int) -> float:
+        """Take tokens and return seconds to wait before using them."""
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= n_bytes
+        if self.tokens >= 0.0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateShaper:
+    """Global and per-server token buckets drawn on per chunk."""
+
+    def __init__(self, bw_max_mbps: float = 0.0):
+        """Init global bucket, if a positive limit is given."""
+        self.global_bucket: Optional[TokenBucket] = None
+        if bw_max_mbps > 0.0:
+            self.global_bucket = TokenBucket(bw_max_mbps)
+        self.server_buckets: dict[str, TokenBucket] = {}
+
+    def add_server(self, name: str, bw_limit_mbps: float = 0.0) -> None:
+        """Add per-server bucket, if a positive limit is given."""
+        if bw_limit_mbps > 0.0:
+            self.server_buckets[name] = TokenBucket(bw_limit_mbps)
+
+    def reserve(self, name: str, n_bytes: int) -> float:
+        """Reserve bytes on the global and server buckets, return wait."""
+        delay = 0.0
+        if self.global_bucket is not None:
+            delay = self.global_bucket.reserve(n_bytes)
+        if name in self.server_buckets:
+            delay = max(delay, self.server_buckets[name].reserve(n_bytes))
+        return delay
+
+    async def consume(self, name: str, n_bytes: int) -> None:
+        """Wait until bytes may be received within bandwidth limits."""
+        delay = self.reserve(name, n_bytes)
+        if delay > 0.0:
+            await anyio.sleep(delay)
@@ -0,0 +1,184 @@
+"""Columnar storage of result and failure records."""
+
+from typing import Any
+from typing import Optional
+
+# third-party imports
+import numpy as np
+
+from .common import DEFAULT_STORE_CAPACITY
+from .common import INDEX_KEY
+from .common import SIMPLE_TYPES
+from .common import MillisecondTimer
+
+
+RETIRE_KEY = "retire_t"
+MISSING_INT = -1
+MISSING_CODE = -1
+
+
+class ResultStore:
+    """Growable typed columns in place of a list of record dictionaries.
+
+    Columns are created on first appearance of a key: integers and
+    booleans are stored as int64, floats as float64, and strings as
+    int32 codes into a list of categories.  Rows lacking a key get
+    MISSING_INT, NaN, or MISSING_CODE.  Capacity doubles as needed.
+    If a timer is given, the time of each addition is stored as a
+    retirement time.
+
+    Results and failures are kept in separate stores rather than
+    flagged by a status column; failure stores have an error column.
+    """
+
+    def __init__(
+        self,
+        timer: Optional[MillisecondTimer] = None,
+        capacity: int = DEFAULT_STORE_CAPACITY,
+    ):
+        """Init empty columns."""
+        self.timer = timer
+        self.capacity = max(capacity, 1)
+        self.n_rows = 0
+        self.arrays: dict[str, np.ndarray] = {}
+        self.categories: dict[str, list[str]] = {}
+        self._codes: dict[str, dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        """Return number of rows."""
+        return self.n_rows
+
+    def _new_column(self, key: str, value: SIMPLE_TYPES) -> np.ndarray:
+        """Create column with dtype appropriate to value."""
+        if isinstance(value, (bool, int)):
+            array = np.full(self.capacity, MISSING_INT, dtype=np.int64)
+        elif isinstance(value, float):
+            array = np.full(self.capacity, np.nan, dtype=np.float64)
+        else:
+            array = np.full(self.capacity, MISSING_CODE, dtype=np.int32)
+            self.categories[key] = []
+            self._codes[key] = {}
+        self.arrays[key] = array
+        return array
+
+    def _grow(self) -> None:
+        """Double capacity of all columns."""
+        for key, array in self.arrays.items():
+            fill = np.nan if array.dtype == np.float64 else MISSING_INT
+            grown = np.full(2 * self.capacity, fill, dtype=array.dtype)
+            grown[: self.capacity] = array
+            self.arrays[key] = grown
+        self.capacity *= 2
+
+    def _code(self, key: str, value: SIMPLE_TYPES) -> int:
+        """Return code of string value, adding a category if new."""
+        if value is None:
+            return MISSING_CODE
+        codes = self._codes[key]
+        str_value = str(value)
+        if str_value not in codes:
+            codes[str_value] = len(codes)
+            self.categories[key].append(str_value)
+        return codes[str_value]
+
+    def _set(self, key: str, row: int, value: SIMPLE_TYPES) -> None:
+        """Set value in a column, creating or promoting it as needed."""
+        array = self.arrays.get(key)
+        if array is None:
+            if value is None:
+                return
+            array = self._new_column(key, value)
+        if key in self.categories:
+            array[row] = self._code(key, value)
+        elif value is None:
+            return
+        elif array.dtype == np.int64 and isinstance(value, float):
+            array = array.astype(np.float64)
+            array[array == MISSING_INT] = np.nan
+            self.arrays[key] = array
+            array[row] = value
+        else:
+            array[row] = value
+
+    def add(self, record: dict[str, SIMPLE_TYPES]) -> None:
+        """Append a record as a row."""
+        for key, value in record.items():
+            numeric = key in self.arrays and key not in self.categories
+            if numeric and isinstance(value, str):
+                raise TypeError(f"String value for numeric column {key}.")
+        if self.n_rows == self.capacity:
+            self._grow()
+        row = self.n_rows
+        if self.timer is not None:
+            self._set(RETIRE_KEY, row, self.timer.time())
+        for key, value in record.items():
+            self._set(key, row, value)
+        self.n_rows += 1
+
+    def column(self, key: str) -> np.ndarray:
+        """Return view of filled rows of a column."""
+        return self.arrays[key][: self.n_rows]
+
+    def sort(self, key: str = INDEX_KEY) -> None:
+        """Sort rows in place by values of a column."""
+        if key not in self.arrays or self.n_rows == 0:
+            return
+        order = np.argsort(self.column(key), kind="stable")
+        for array in self.arrays.values():
+            array[: self.n_rows] = array[: self.n_rows][order]
+
+    def records(self) -> list[dict[str, SIMPLE_TYPES]]:
+        """Return rows as a list of dictionaries, omitting missing values."""
+        return [self._record(row) for row in range(self.n_rows)]
+
+    def _record(self, row: int) -> dict[str, SIMPLE_TYPES]:
+        """Return one row as a dictionary."""
+        record: dict[str, SIMPLE_TYPES] = {}
+        for key, array in self.arrays.items():
+            value = array[row]
+            if key in self.categories:
+                if value != MISSING_CODE:
+                    record[key] = self.categories[key][value]
+            elif array.dtype == np.float64:
+                if not np.isnan(value):
+                    record[key] = float(value)
+            elif value != MISSING_INT:
+                record[key] = int(value)
+        return record
+
+    def to_arrow(self) -> Any:
+        """Return an Arrow table, with strings dictionary-encoded.
+
+        Requires the optional pyarrow package (the columnar extra).
+        """
+        import pyarrow as pa  # type: ignore[import]
+
+        columns = {}
+        for key, array in self.arrays.items():
+            values = array[: self.n_rows]
+            if key in self.categories:
+                columns[key] = pa.DictionaryArray.from_arrays(
+                    pa.array(values, mask=values == MISSING_CODE),
+                    pa.array(self.categories[key], type=pa.string()),
+                )
+            else:
+                columns[key] = pa.array(values)
+        return pa.table(columns)
+
+    def to_pandas(self) -> Any:
+        """Return a data frame, with strings as categoricals.
+
+        Requires the optional pandas package (the columnar extra).
+        """
+        import pandas as pd  # type: ignore[import]
+
+        columns = {}
+        for key, array in self.arrays.items():
+            values = array[: self.n_rows]
+            if key in self.categories:
+                columns[key] = pd.Categorical.from_codes(
+                    values, categories=self.categories[key]
+                )
+            else:
+                columns[key] = values
+        return pd.DataFrame(columns)
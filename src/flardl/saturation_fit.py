@@ -0,0 +1,111 @@
+"""Online fit of bandwidth saturation with total queue depth."""
+
+import math
+from typing import Optional
+
+# third-party imports
+import numpy as np
+
+from .common import DEFAULT_N_MIN
+from .common import NUMERIC_TYPE
+from .common import SATURATION_FRACTION
+from .common import SATURATION_REFIT_OBS
+from .common import TIME_FIT_DECAY
+
+
+N_SCALES = 64  # candidate depth scales searched per fit
+MIN_DEPTHS = 3  # distinct depths needed for a fit
+
+
+class SaturationFit:
+    """Fit of B = B_eff (1 - exp(-D/D_scale)) to live observations.
+
+    Bandwidth observations are averaged per total queue depth D with
+    weights decaying by decay per observation at that depth, so memory
+    is bounded by the largest depth seen.  For each candidate depth
+    scale, B_eff follows from weighted least squares, and the scale
+    with least squared error is chosen.  D_sat is the depth at which
+    bandwidth reaches fraction of B_eff.  If bandwidth is already
+    saturated at the lowest depth observed, the curve is not
+    determined and there is no fit.  The fit is redone lazily when
+    read after refit_obs new observations, since it is read on every
+    launch and observations are added on every launch and retirement.
+    """
+
+    __slots__ = (
+        "_fit",
+        "_n_fit_obs",
+        "decay",
+        "depths",
+        "fraction",
+        "n_min",
+        "n_obs",
+        "refit_obs",
+    )
+
+    def __init__(
+        self,
+        decay: float = TIME_FIT_DECAY,
+        fraction: float = SATURATION_FRACTION,
+        n_min: int = DEFAULT_N_MIN,
+        refit_obs: int = SATURATION_REFIT_OBS,
+    ):
+        """Init empty fit."""
+        self.decay = decay
+        self.fraction = fraction
+        self.n_min = n_min
+        self.refit_obs = refit_obs
+        self.n_obs = 0
+        self.depths: dict[int, list[float]] = {}  # depth: [weight, mean]
+        self._fit: Optional[tuple[float, float]] = None
+        self._n_fit_obs = 0
+
+    def add(self, depth: int, bw_mbps: NUMERIC_TYPE) -> None:
+        """Add an observation of bandwidth at a total queue depth."""
+        self.n_obs += 1
+        weight_mean = self.depths.setdefault(depth, [0.0, 0.0])
+        weight_mean[0] = self.decay * weight_mean[0] + 1.0
+        weight_mean[1] += (bw_mbps - weight_mean[1]) / weight_mean[0]
+
+    def fit(self) -> Optional[tuple[float, float]]:
+        """Return B_eff in Mbit/s and depth scale, or None if unfit."""
+        if self.n_obs - self._n_fit_obs < self.refit_obs:
+            return self._fit
+        self._n_fit_obs = self.n_obs
+        positive = [d for d in self.depths if d > 0]
+        if self.n_obs < self.n_min or len(positive) < MIN_DEPTHS:
+            return self._fit
+        depth = np.fromiter(self.depths.keys(), dtype=float)
+        weight, mean = np.asarray(list(self.depths.values())).T
+        scales = np.geomspace(0.1, 10.0 * max(positive), N_SCALES)
+        shape = 1.0 - np.exp(-depth[np.newaxis, :] / scales[:, np.newaxis])
+        b_eff = (shape * weight * mean).sum(axis=1) / (
+            (shape * shape * weight).sum(axis=1)
+        )
+        sse = (weight * (mean - b_eff[:, np.newaxis] * shape) ** 2).sum(axis=1)
+        best = int(np.argmin(sse))
+        self._fit = float(b_eff[best]), float(scales[best])
+        if 1.0 - math.exp(-min(positive) / self._fit[1]) >= self.fraction:
+            # already saturated at the lowest depth, so D_sat is unknown
+            self._fit = None
+        return self._fit
+
+    @property
+    def bw_eff_mbps(self) -> Optional[float]:
+        """Saturation bandwidth B_eff in Mbit/s."""
+        fit = self.fit()
+        if fit is None:
+            return None
+        return fit[0]
+
+    @property
+    def d_sat(self) -> Optional[int]:
+        """Total queue depth at which bandwidth saturates."""
+        fit = self.fit()
+        if fit is None:
+            return None
+        return max(math.ceil(-fit[1] * math.log(1.0 - self.fraction)), 1)
+
+    def report(self) -> dict[str, Optional[NUMERIC_TYPE]]:
+        """Return fitted values."""
+        return {"bw_eff_mbps": self.bw_eff_mbps, "d_sat": self.d_sat}
@@ -0,0 +1,144 @@
+"""Priority scheduling of arguments with per-server affinity and stealing."""
+
+import heapq
+from collections import Counter
+from collections.abc import Iterable
+from collections.abc import Sequence
+from itertools import count
+from typing import Callable
+from typing import Optional
+
+from .common import SIMPLE_TYPES
+
+
+RETRY_PRIORITY = float("-inf")  # requeued arguments go to the head of the line
+ARGS_TYPE = dict[str, SIMPLE_TYPES]
+PRIORITY_TYPE = Callable[[ARGS_TYPE], float]
+AFFINITY_TYPE = Callable[[ARGS_TYPE], Optional[Sequence[str]]]
+
+
+class ScheduleEntry:
+    """Arguments with priority and the servers that hold them."""
+
+    __slots__ = ("args", "live", "priority", "seq", "servers")
+
+    def __init__(
+        self,
+        args: ARGS_TYPE,
+        priority: float,
+        seq: int,
+        servers: Sequence[str],
+    ):
+        """Init live entry."""
+        self.args = args
+        self.priority = priority
+        self.seq = seq
+        self.servers = servers
+        self.live = True
+
+    def __lt__(self, other: "ScheduleEntry") -> bool:
+        """Order by priority, then by order of insertion."""
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _peek_live(heap: list[ScheduleEntry]) -> Optional[ScheduleEntry]:
+    """Drop taken entries from top of heap and return the live top."""
+    while heap and not heap[0].live:
+        heapq.heappop(heap)
+    if heap:
+        return heap[0]
+    return None
+
+
+class ArgumentScheduler:
+    """Heap of arguments shared by all servers plus per-server affinity heaps.
+
+    Lower priority values are launched sooner, and entries of equal
+    priority are first-in, first-out.  An entry with affinity to one
+    or more servers is pushed onto each of their heaps and taken by
+    whichever server gets to it first; entries taken via one heap
+    are lazily dropped from the others.  A server prefers its own
+    heap unless the shared heap has a more urgent entry and, if both
+    are empty, steals from the server with the most entries waiting.
+    """
+
+    def __init__(self, steal: bool = True):
+        """Init empty heaps."""
+        self.steal = steal
+        self.shared: list[ScheduleEntry] = []
+        self.affine: dict[str, list[ScheduleEntry]] = {}
+        self.n_affine: Counter[str] = Counter()
+        self.n_live = 0
+        self._seq = count()
+
+    def __len__(self) -> int:
+        """Return number of entries waiting."""
+        return self.n_live
+
+    def _entry(
+        self, args: ARGS_TYPE, priority: float, servers: Optional[Sequence[str]]
+    ) -> ScheduleEntry:
+        """Create entry and count it."""
+        entry = ScheduleEntry(args, priority, next(self._seq), tuple(servers or ()))
+        self.n_live += 1
+        for server in entry.servers:
+            self.n_affine[server] += 1
+        return entry
+
+    def push(
+        self,
+        args: ARGS_TYPE,
+        priority: float = 0.0,
+        servers: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Add arguments with priority and optional server affinity."""
+        entry = self._entry(args, priority, servers)
+        if not entry.servers:
+            heapq.heappush(self.shared, entry)
+        for server in entry.servers:
+            heapq.heappush(self.affine.setdefault(server, []), entry)
+
+    def extend(
+        self,
+        arg_iter: Iterable[ARGS_TYPE],
+        priority: Optional[PRIORITY_TYPE] = None,
+        affinity: Optional[AFFINITY_TYPE] = None,
+    ) -> None:
+        """Add many arguments, heapifying once."""
+        for args in arg_iter:
+            entry = self._entry(
+                args,
+                0.0 if priority is None else priority(args),
+                None if affinity is None else affinity(args),
+            )
+            if not entry.servers:
+                self.shared.append(entry)
+            for server in entry.servers:
+                self.affine.setdefault(server, []).append(entry)
+        heapq.heapify(self.shared)
+        for heap in self.affine.values():
+            heapq.heapify(heap)
+
+    def pop(self, server: str) -> ARGS_TYPE:
+        """Take the most urgent arguments for a server.
+
+        Raises IndexError if there are none.
+        """
+        own = _peek_live(self.affine.get(server, []))
+        shared = _peek_live(self.shared)
+        entry = own
+        if shared is not None and (own is None or shared < own):
+            entry = shared
+        if entry is None and self.steal:
+            victim, n_waiting = max(
+                self.n_affine.items(), key=lambda item: item[1], default=("", 0)
+            )
+            if n_waiting > 0:
+                entry = _peek_live(self.affine[victim])
+        if entry is None:
+            raise IndexError("no arguments waiting")
+        entry.live = False
+        self.n_live -= 1
+        for affine_server in entry.servers:
+            self.n_affine[affine_server] -= 1
+        return entry.args
@@ -0,0 +1,101 @@
+"""Per-server performance profiles persisted between runs."""
+
+import json
+import pathlib
+import time
+from typing import Optional
+
+from attrs import asdict
+from attrs import define
+
+from .common import PROFILE_HALF_LIFE
+from .common import PROFILE_MIN_WEIGHT
+
+
+@define
+class ServerProfile:
+    """Performance of a server as measured in previous runs."""
+
+    modal_rate: float  # files per second
+    bw_mbps: float  # bandwidth at which modal rate was seen
+    latency_ms: Optional[float] = None
+    d_crit: Optional[int] = None
+    updated: float = 0.0  # seconds since epoch
+    weight: float = 1.0  # runs averaged, decayed by age
+
+    def decayed_weight(self, now: float) -> float:
+        """Return weight after decay with age."""
+        age = max(now - self.updated, 0.0)
+        return self.weight * 0.5 ** (age / PROFILE_HALF_LIFE)
+
+    def merge(self, new: "ServerProfile") -> "ServerProfile":
+        """Return average with a newer profile, weighting this one by age."""
+        old_weight = self.decayed_weight(new.updated)
+        total = old_weight + new.weight
+
+        def average(old_val: Optional[float], new_val: Optional[float]):
+            """Return weighted average if both values are known."""
+            if old_val is None:
+                return new_val
+            if new_val is None:
+                return old_val
+            return (old_weight * old_val + new.weight * new_val) / total
+
+        return ServerProfile(
+            modal_rate=average(self.modal_rate, new.modal_rate),
+            bw_mbps=average(self.bw_mbps, new.bw_mbps),
+            latency_ms=average(self.latency_ms, new.latency_ms),
+            d_crit=new.d_crit if new.d_crit is not None else self.d_crit,
+            updated=new.updated,
+            weight=total,
+        )
+
+
+class ProfileStore:
+    """Server profiles in a JSON file, keyed by server name.
+
+    Profiles are read once at creation, and those decayed below
+    PROFILE_MIN_WEIGHT are dropped.  Profiles updated during the
+    session are merged with those read, and written atomically by
+    save().  Updates replace earlier updates in the same session,
+    so a session is counted once however often it is saved.
+    """
+
+    def __init__(self, path: str):
+        """Load profiles from file, if present."""
+        self.path = pathlib.Path(path)
+        self.profiles: dict[str, ServerProfile] = {}
+        self.loaded: dict[str, ServerProfile] = {}
+        if not self.path.exists():
+            return
+        now = time.time()
+        try:
+            entries = json.loads(self.path.read_text())
+            for name, entry in entries.items():
+                profile = ServerProfile(**entry)
+                if profile.decayed_weight(now) >= PROFILE_MIN_WEIGHT:
+                    self.profiles[name] = profile
+        except (ValueError, TypeError, AttributeError):
+            self.profiles = {}
+        self.loaded = dict(self.profiles)
+
+    def get(self, name: str) -> Optional[ServerProfile]:
+        """Return profile of a server, if known."""
+        return self.profiles.get(name)
+
+    def update(self, name: str, profile: ServerProfile) -> None:
+        """Merge a profile of this session with any loaded one."""
+        previous = self.loaded.get(name)
+        if previous is None:
+            self.profiles[name] = profile
+        else:
+            self.profiles[name] = previous.merge(profile)
+
+    def save(self) -> None:
+        """Write profiles atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({name: asdict(p) for name, p in self.profiles.items()})
+        )
+        tmp_path.replace(self.path)
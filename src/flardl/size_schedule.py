@@ -0,0 +1,153 @@
+"""Size-aware ordering of arguments into crappies and whales lists."""
+
+from collections import Counter
+from collections import deque
+from collections.abc import Sequence
+from typing import Optional
+from typing import Union
+from typing import cast
+
+# third-party imports
+import anyio
+
+from .common import CRAPPIE_CUTOFF
+from .common import INDEX_KEY
+from .common import SIMPLE_TYPES
+from .common import MillisecondTimer
+from .event_ring import EventRing
+from .inflight_table import InflightTable
+from .instrumented_streams import ArgumentStream
+from .launch_controller import LaunchController
+from .launch_controller import modal_value
+
+
+SIZES_TYPE = Union[Sequence[int], dict[int, int]]
+
+
+def schedule_by_size(
+    arg_list: list[dict[str, SIMPLE_TYPES]],
+    sizes: SIZES_TYPE,
+    n_servers: int,
+    n_first: int,
+) -> tuple[list[dict[str, SIMPLE_TYPES]], list[dict[str, SIMPLE_TYPES]]]:
+    """Sort arguments into a tiered crappies list and a whales-first list.
+
+    Files no bigger than CRAPPIE_CUTOFF times the modal size are
+    crappies.  The first list is built from tiers of n_servers
+    crappies, alternating between the smallest and the biggest
+    remaining, until it holds at least n_first files.  The second
+    list is all other files in order of descending size.  Files of
+    unknown size are taken to be of modal size.
+    """
+    size_map = sizes if isinstance(sizes, dict) else dict(enumerate(sizes))
+    modal_size = modal_value(size_map.values()) or 0.0
+
+    def size_of(args: dict[str, SIMPLE_TYPES]) -> float:
+        """Return size of file in arguments."""
+        return float(size_map.get(cast(int, args[INDEX_KEY]), modal_size))
+
+    by_size = sorted(arg_list, key=size_of)
+    crappies = [a for a in by_size if size_of(a) <= CRAPPIE_CUTOFF * modal_size]
+    whales = by_size[len(crappies) :]
+    first: list[dict[str, SIMPLE_TYPES]] = []
+    low = 0
+    high = len(crappies)
+    take_smallest = True
+    tier_size = max(n_servers, 1)
+    while len(first) < n_first and low < high:
+        if take_smallest:
+            tier = crappies[low : min(low + tier_size, high)]
+            low += len(tier)
+        else:
+            tier = crappies[max(high - tier_size, low) : high][::-1]
+            high -= len(tier)
+        first.extend(tier)
+        take_smallest = not take_smallest
+    second = sorted(crappies[low:high] + whales, key=size_of, reverse=True)
+    return first, second
+
+
+class SizedArgumentStream(ArgumentStream):
+    """Argument stream that holds whales until the crappies have returned.
+
+    Arguments in the second list are released only after all
+    arguments in the first list have retired or failed.  The fastest
+    characterized server then draws from the big end of the second
+    list and all other servers from the small end.
+    """
+
+    controller: LaunchController
+
+    def __init__(
+        self,
+        arg_list: list[dict[str, SIMPLE_TYPES]],
+        sizes: SIZES_TYPE,
+        in_process: InflightTable,
+        timer: MillisecondTimer,
+        controller: LaunchController,
+        worker_counter: Optional[Counter[str]] = None,
+        events: Optional[EventRing] = None,
+    ):
+        """Sort arguments into lists."""
+        super().__init__(
+            [],
+            in_process,
+            timer,
+            controller=controller,
+            worker_counter=worker_counter,
+            events=events,
+        )
+        first, second = schedule_by_size(
+            arg_list,
+            sizes,
+            n_servers=len(controller.servers),
+            n_first=controller.n_min * len(controller.servers),
+        )
+        self.n_sized = len(arg_list)
+        self.first_idxs = {args[INDEX_KEY] for args in first}
+        self.first: deque[dict[str, SIMPLE_TYPES]] = deque(first)
+        self.second: deque[dict[str, SIMPLE_TYPES]] = deque(second)
+
+    @property
+    def n_args(self) -> int:
+        """Return number of arguments scheduled."""
+        return self.n_sized
+
+    def held(self) -> bool:
+        """Return True while arguments from the first list are outstanding."""
+        if self.first:
+            return True
+        return any(
+            self.owns(launch) and launch.idx in self.first_idxs
+            for worker in self.inflight.values()
+            for launch in worker.values()
+        )
+
+    async def put(
+        self,
+        args,
+        /,
+        worker_name: Union[str, None] = None,
+        worker_count: Union[int, None] = None,
+    ):
+        """Requeue arguments at the head of their list."""
+        self.release(args, cast(str, worker_name), cast(int, worker_count))
+        if args[INDEX_KEY] in self.first_idxs:
+            self.first.appendleft(args)
+        else:
+            self.second.appendleft(args)
+
+    async def get(self, /, worker_name: Union[str, None] = None, **kwargs):
+        """Get from the first list, else from the second if not held."""
+        _unused = (kwargs,)
+        worker_name = cast(str, worker_name)
+        if self.first:
+            q_entry = self.first.popleft()
+        elif not self.second or self.held():
+            raise anyio.WouldBlock
+        elif self.controller.fastest() in (None, worker_name):
+            q_entry = self.second.popleft()
+        else:
+            q_entry = self.second.pop()
+        worker_count = await self.launch(q_entry, worker_name=worker_name)
+        return q_entry, worker_count
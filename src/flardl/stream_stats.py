@@ -1,28 +1,39 @@
 """Simple stream-associated statistical functions."""
 import contextlib
+from collections import Counter
 from collections import UserDict
 from collections import deque
+from collections.abc import Iterable
 from typing import Any
 from typing import ClassVar
 from typing import Optional
 from typing import TypeVar
 from typing import Union
 
-from attrs import Attribute
-from attrs import asdict
+# third-party imports
+import numpy as np
 from attrs import define
-from attrs import field
 
 from .common import ALL
 from .common import BYTES_TO_MEGABITS
 from .common import DEFAULT_ROUNDING
 from .common import HIST
 from .common import MAX
+from .common import MODE
 from .common import NUMERIC_TYPE
+from .common import P50
+from .common import P95
+from .common import P99
+from .common import QUANTILES
 from .common import RAVG
 from .common import STAT_SUBLABELS
+from .common import TIME_EPSILON
 from .common import TOTAL
 from .common import VALUE
+from .event_ring import EVENT_NAMES
+from .event_ring import RETIRE
+from .quantile_sketch import LogHistogramSketch
+from .time_fit import EquationOfTimeFit
 
 
 # type definitions
@@ -30,7 +41,6 @@ OPTIONAL_NUMERIC = Optional[NUMERIC_TYPE]
 OPTIONAL_NUMERIC_LIST = Union[OPTIONAL_NUMERIC, list[NUMERIC_TYPE]]
 
 StreamStatsType = TypeVar("StreamStatsType", bound="StreamStats")
-StatType = TypeVar("StatType", bound="Stat")
 U = TypeVar("U")
 
 
@@ -49,59 +59,181 @@ def _round(val: NUMERIC_TYPE, rounding: int) -> NUMERIC_TYPE:
     return rounded_val
 
 
-def _set_stat(instance: StatType, attrib: Attribute, val: NUMERIC_TYPE) -> NUMERIC_TYPE:
-    """Round stat value and set derived quantities."""
-    _unused = (attrib,)
-    rounded_val = _round(val, instance.rounding)
-    instance.n_obs += 1
-    if instance.value is None:
-        instance.minimum = rounded_val
-        instance.maximum = rounded_val
-        instance.total = rounded_val
-        instance.avg = rounded_val
-    else:
-        if instance.minimum is None:
-            raise TypeError
-        instance.minimum = min(rounded_val, _nn(instance.minimum))
-        instance.maximum = max(rounded_val, _nn(instance.maximum))
-        instance.total = _round(_nn(instance.total) + rounded_val, instance.rounding)
-        instance.avg = _round(_nn(instance.total) / instance.n_obs, instance.rounding)
-    instance.history.append(rounded_val)
-    if instance.history_len > 0 and len(instance.history) == instance.history_len:
-        instance.r_avg = _round(
-            float(sum(instance.history)) / instance.history_len, instance.rounding
-        )
-    return rounded_val
+class Stat:
+    """Class of derived statistics on numeric value.
+
+    Running sums make every update O(1), including the rolling
+    average over history.  Values are kept at full precision and
+    rounded only when read.  If sketch is True, a log-histogram
+    sketch gives the mode and quantiles in constant memory.
+    """
+
+    __slots__ = (
+        "_hist_sum",
+        "_maximum",
+        "_minimum",
+        "_n_since_sum",
+        "_total",
+        "_value",
+        "history",
+        "history_len",
+        "n_obs",
+        "rounding",
+        "sketch",
+    )
 
+    def __init__(
+        self,
+        history_len: int = 0,
+        rounding: int = DEFAULT_ROUNDING,
+        sketch: bool = False,
+    ):
+        """Init empty accumulator."""
+        self.sketch: Optional[LogHistogramSketch] = None
+        if sketch:
+            self.sketch = LogHistogramSketch()
+        self.history_len = history_len
+        self.rounding = rounding
+        self.n_obs = 0
+        self._value: OPTIONAL_NUMERIC = None
+        self._total: NUMERIC_TYPE = 0
+        self._minimum: OPTIONAL_NUMERIC = None
+        self._maximum: OPTIONAL_NUMERIC = None
+        self.history: deque[NUMERIC_TYPE] = deque(maxlen=history_len)
+        self._hist_sum: NUMERIC_TYPE = 0
+        self._n_since_sum = 0
+
+    def __repr__(self) -> str:
+        """Show rounded values."""
+        return (
+            f"Stat(value={self.value}, total={self.total}, n_obs={self.n_obs}, "
+            + f"avg={self.avg}, minimum={self.minimum}, maximum={self.maximum}, "
+            + f"r_avg={self.r_avg})"
+        )
 
-@define
-class Stat:
-    """Class of derived statistics on numeric value."""
-
-    history_len: int = field(default=0, repr=False)
-    rounding: int = field(default=DEFAULT_ROUNDING, repr=False)
-    value: OPTIONAL_NUMERIC = field(default=None, on_setattr=_set_stat)
-    total: OPTIONAL_NUMERIC = None
-    n_obs: int = 0
-    avg: OPTIONAL_NUMERIC = None
-    minimum: OPTIONAL_NUMERIC = None
-    maximum: OPTIONAL_NUMERIC = None
-    history: deque[NUMERIC_TYPE] = field(init=False, repr=False)
-    r_avg: OPTIONAL_NUMERIC = None
-
-    def __attrs_post_init__(self):
-        """Initialize history after history length is set."""
-        self.history = deque(maxlen=self.history_len)
+    def _rounded(self, val: OPTIONAL_NUMERIC) -> OPTIONAL_NUMERIC:
+        """Round if not None."""
+        if val is None:
+            return None
+        return _round(val, self.rounding)
+
+    @property
+    def value(self) -> OPTIONAL_NUMERIC:
+        """Most recent value."""
+        return self._rounded(self._value)
+
+    @value.setter
+    def value(self, val: NUMERIC_TYPE) -> None:
+        """Add an observation."""
+        self.n_obs += 1
+        self._value = val
+        self._total += val
+        if self._minimum is None or val < self._minimum:
+            self._minimum = val
+        if self._maximum is None or val > self._maximum:
+            self._maximum = val
+        if self.sketch is not None:
+            self.sketch.add(val)
+        if self.history_len > 0:
+            if len(self.history) == self.history_len:
+                self._hist_sum -= self.history[0]
+            self.history.append(val)
+            self._hist_sum += val
+            self._n_since_sum += 1
+            if self._n_since_sum >= self.history_len:
+                # resum once per cycle to bound rounding drift
+                self._hist_sum = sum(self.history)
+                self._n_since_sum = 0
+
+    def set_values(self, values: Iterable[NUMERIC_TYPE]) -> None:
+        """Add many observations at once."""
+        arr = values if isinstance(values, np.ndarray) else np.asarray(list(values))
+        if arr.size == 0:
+            return
+        self.n_obs += arr.size
+        self._value = arr[-1].item()
+        self._total += arr.sum().item()
+        arr_min = arr.min().item()
+        arr_max = arr.max().item()
+        if self._minimum is None or arr_min < self._minimum:
+            self._minimum = arr_min
+        if self._maximum is None or arr_max > self._maximum:
+            self._maximum = arr_max
+        if self.sketch is not None:
+            self.sketch.add_many(arr)
+        if self.history_len > 0:
+            self.history.extend(arr[-self.history_len :].tolist())
+            self._hist_sum = sum(self.history)
+            self._n_since_sum = 0
+
+    @property
+    def total(self) -> OPTIONAL_NUMERIC:
+        """Sum of values."""
+        if self.n_obs == 0:
+            return None
+        return self._rounded(self._total)
+
+    @property
+    def avg(self) -> OPTIONAL_NUMERIC:
+        """Mean of values."""
+        if self.n_obs == 0:
+            return None
+        return self._rounded(self._total / self.n_obs)
+
+    @property
+    def minimum(self) -> OPTIONAL_NUMERIC:
+        """Minimum value."""
+        return self._rounded(self._minimum)
+
+    @property
+    def maximum(self) -> OPTIONAL_NUMERIC:
+        """Maximum value."""
+        return self._rounded(self._maximum)
+
+    @property
+    def r_avg(self) -> OPTIONAL_NUMERIC:
+        """Rolling average over full history."""
+        if self.history_len == 0 or len(self.history) < self.history_len:
+            return None
+        return self._rounded(float(self._hist_sum) / self.history_len)
+
+    @property
+    def mode(self) -> OPTIONAL_NUMERIC:
+        """Modal value, if sketched."""
+        if self.sketch is None:
+            return None
+        return self._rounded(self.sketch.mode())
+
+    def quantile(self, q: float) -> OPTIONAL_NUMERIC:
+        """Return q-th quantile, if sketched."""
+        if self.sketch is None:
+            return None
+        return self._rounded(self.sketch.quantile(q))
+
+    @property
+    def p50(self) -> OPTIONAL_NUMERIC:
+        """Median value, if sketched."""
+        return self.quantile(QUANTILES[P50])
+
+    @property
+    def p95(self) -> OPTIONAL_NUMERIC:
+        """95th-percentile value, if sketched."""
+        return self.quantile(QUANTILES[P95])
+
+    @property
+    def p99(self) -> OPTIONAL_NUMERIC:
+        """99th-percentile value, if sketched."""
+        return self.quantile(QUANTILES[P99])
 
     def get(self, key: str = VALUE) -> OPTIONAL_NUMERIC_LIST:
         """Return value of attribute."""
-        if key is HIST:
+        if key == HIST:
             if self.history_len > 0 and len(self.history) == self.history_len:
-                return list(self.history)
-            else: # noqa: RET505
-                return None
-        return asdict(self, filter=lambda attr, value: # noqa: ARG005
-                      not attr.name.startswith("_"))[key]
+                return [_round(v, self.rounding) for v in self.history]
+            return None
+        if key not in STAT_SUBLABELS:
+            raise KeyError(key)
+        return getattr(self, key)
 
 
 class WorkerStat(UserDict):
@@ -113,6 +245,7 @@ class WorkerStat(UserDict):
         workers: list[str],
         rounding: int = DEFAULT_ROUNDING,
         history_len: int = 0,
+        sketch: bool = False,
     ):
         """Initialize storage of stats."""
         self.label = label
@@ -120,7 +253,9 @@ class WorkerStat(UserDict):
         self.history_len = history_len
         super().__init__()
         for worker in workers:
-            self[worker] = Stat(rounding=self.rounding, history_len=self.history_len)
+            self[worker] = Stat(
+                rounding=self.rounding, history_len=self.history_len, sketch=sketch
+            )
 
     def __repr__(self):
         """String of the overall stats."""
@@ -134,6 +269,19 @@ class WorkerStat(UserDict):
         if worker is not ALL and set_global:
             self[ALL].value = value
 
+    def set_values(
+        self,
+        values: Iterable[NUMERIC_TYPE],
+        worker: str = ALL,
+        set_global: bool = True,
+    ) -> None:
+        """Set many values for a worker at once."""
+        if not isinstance(values, np.ndarray):
+            values = np.asarray(list(values))
+        self[worker].set_values(values)
+        if worker is not ALL and set_global:
+            self[ALL].set_values(values)
+
     def get(
         self,
         key: str,
@@ -159,6 +307,7 @@ class StatData:
 
     label: str
     rounding: int = DEFAULT_ROUNDING
+    sketch: bool = False
 
 
 @define
@@ -179,9 +328,9 @@ class StreamStats(UserDict):
     stat_data: ClassVar = {
         "retirement_t": StatData("retirement time, ms", rounding=2),
         "launch_t": StatData("launch time, ms", rounding=2),
-        "service_t": StatData("service time, ns", rounding=2),
-        "bytes": StatData("bytes downloaded", rounding=0),
-        "dl_rate": StatData("per-file download rate, /s", rounding=1),
+        "service_t": StatData("service time, ns", rounding=2, sketch=True),
+        "bytes": StatData("bytes downloaded", rounding=0, sketch=True),
+        "dl_rate": StatData("per-file download rate, /s", rounding=1, sketch=True),
         "cum_rate": StatData("download rate, Mbit/s", rounding=0),
     }
     worker_stats: ClassVar = [
@@ -201,6 +350,13 @@ class StreamStats(UserDict):
             rounding=1,
             label="Total MB downloaded",
         ),
+        ReportData("service_t", MODE),
+        ReportData("service_t", P50),
+        ReportData("service_t", P95),
+        ReportData("service_t", P99),
+        ReportData("dl_rate", P50),
+        ReportData("dl_rate", P95),
+        ReportData("bytes", MODE),
     ]
     file_stats: ClassVar = [
         ReportData("retirement_t", VALUE),
@@ -234,10 +390,76 @@ class StreamStats(UserDict):
                     workers=self.workers,
                     rounding=d.rounding,
                     history_len=history_len,
+                    sketch=d.sketch,
                 )
                 for s, d in self.stat_data.items()
             }
         )
+        self.time_fits = {worker: EquationOfTimeFit() for worker in self.workers}
+        self.event_counts: dict[str, Counter[str]] = {
+            worker: Counter() for worker in self.workers
+        }
+
+    def add_events(self, events: dict[str, np.ndarray]) -> None:
+        """Update from a batch of events drained from an EventRing.
+
+        Worker numbers in events index the workers given at creation.
+        """
+        kinds = events["kind"]
+        workers = events["worker"]
+        n_workers = len(self.workers) - 1
+        for kind, name in enumerate(EVENT_NAMES):
+            counts = np.bincount(workers[kinds == kind], minlength=n_workers)
+            for worker_no in np.flatnonzero(counts):
+                n_events = int(counts[worker_no])
+                self.event_counts[self.workers[worker_no]][name] += n_events
+                self.event_counts[ALL][name] += n_events
+        retired = kinds == RETIRE
+        for worker_no in np.unique(workers[retired]):
+            mask = retired & (workers == worker_no)
+            self.add_retirements(
+                events["launch_t"][mask],
+                events["t"][mask],
+                events["n_bytes"][mask],
+                worker=self.workers[worker_no],
+            )
+
+    def add_retirements(
+        self,
+        launch_t: np.ndarray,
+        retirement_t: np.ndarray,
+        n_bytes: np.ndarray,
+        worker: str = ALL,
+    ) -> None:
+        """Update from arrays of launch times, retirement times and bytes."""
+        service_t = np.maximum(retirement_t - launch_t, TIME_EPSILON)
+        self["launch_t"].set_values(launch_t, worker=worker)
+        self["retirement_t"].set_values(retirement_t, worker=worker)
+        self["bytes"].set_values(n_bytes, worker=worker)
+        self["service_t"].set_values(service_t, worker=worker)
+        self["dl_rate"].set_values(
+            n_bytes * 1000.0 / 1024.0 / 1024.0 / service_t, worker=worker
+        )
+        for worker_bytes, worker_service_t in zip(n_bytes.tolist(), service_t.tolist()):
+            self.time_fits[worker].add(worker_bytes, worker_service_t)
+            if worker is not ALL:
+                self.time_fits[ALL].add(worker_bytes, worker_service_t)
+        for cum_worker in {worker, ALL}:
+            self["cum_rate"].set_value(
+                self["bytes"].get(TOTAL, worker=cum_worker)
+                * BYTES_TO_MEGABITS
+                * 1000.0
+                / max(self["retirement_t"].get(VALUE, worker=cum_worker), TIME_EPSILON),
+                worker=cum_worker,
+                set_global=False,
+            )
+
+    def report_event_counts(self) -> dict[str, dict[str, int]]:
+        """Return per-worker counts of launches, retirements and failures."""
+        return {
+            worker: {name: self.event_counts[worker][name] for name in EVENT_NAMES}
+            for worker in self.workers
+        }
 
     def update_stats(self, *args, worker: str = ALL) -> None:
         """Update using update methods in queue stats."""
@@ -293,6 +515,10 @@ class StreamStats(UserDict):
             )
         return ret_dict
 
+    def report_time_fits(self) -> dict[str, dict[str, Optional[float]]]:
+        """Return per-worker latency, bandwidth, and head-of-line estimates."""
+        return {worker: self.time_fits[worker].report() for worker in self.workers}
+
     def report_summary_stats(
         self, worker: str = ALL
     ) -> dict[Optional[str], OPTIONAL_NUMERIC]:
@@ -323,13 +549,16 @@ class StreamStats(UserDict):
         worker: str = ALL,
     ):
         """Calculate all derived values."""
-        # service_t
+        # service_t and Equation-of-Time fit
         with contextlib.suppress(TypeError):
-            self["service_t"].set_value(
-                self["retirement_t"].get(VALUE, worker)
-                - self["launch_t"].get(VALUE, worker),
-                worker,
-            )
+            retirement_t = self["retirement_t"].get(VALUE, worker)
+            service_t = retirement_t - self["launch_t"].get(VALUE, worker)
+            self["service_t"].set_value(service_t, worker)
+            n_bytes = self["bytes"].get(VALUE, worker)
+            if n_bytes is not None:
+                self.time_fits[worker].add(n_bytes, service_t)
+                if worker is not ALL:
+                    self.time_fits[ALL].add(n_bytes, service_t)
         # dl_rate
         try:
             self["dl_rate"].set_value(
@@ -0,0 +1,101 @@
+"""Manifest of downloaded files for incremental sync of an output directory."""
+
+import json
+import pathlib
+from email.utils import formatdate
+from typing import Optional
+
+from .common import MANIFEST_FILE
+from .common import SIMPLE_TYPES
+
+
+# Sync modes
+SKIP = "skip"  # skip files present and unchanged since download
+CONDITIONAL = "conditional"  # GET present files with If-None-Match/If-Modified-Since
+SYNC_MODES = (SKIP, CONDITIONAL)
+
+
+class SyncManifest:
+    """Sizes, times, and validators of files in an output directory.
+
+    The manifest is read once at creation, updated in memory as
+    files are retired, and written atomically by save().
+    """
+
+    def __init__(self, output_dir: str, mode: str = SKIP):
+        """Load manifest from output directory, if present."""
+        if mode not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode {mode}")
+        self.mode = mode
+        self.output_dir = pathlib.Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        self.entries: dict[str, dict[str, SIMPLE_TYPES]] = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except ValueError:
+                self.entries = {}
+
+    def _stat(self, filename: str) -> Optional[tuple[int, int]]:
+        """Return size and mtime in ns of an output file, if present."""
+        try:
+            stat = (self.output_dir / filename).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_current(self, filename: str) -> bool:
+        """Return True if a file may be skipped outright.
+
+        A file is current if it is present and, if recorded in the
+        manifest, unchanged in size and time since it was downloaded.
+        """
+        if self.mode != SKIP:
+            return False
+        stat = self._stat(filename)
+        if stat is None or stat[0] == 0:
+            return False
+        entry = self.entries.get(filename)
+        if entry is None:
+            return True
+        return (entry.get("size"), entry.get("mtime_ns")) == stat
+
+    def conditional_headers(self, filename: str) -> dict[str, str]:
+        """Return headers for a conditional GET of a present file."""
+        if self.mode != CONDITIONAL:
+            return {}
+        stat = self._stat(filename)
+        if stat is None:
+            return {}
+        entry = self.entries.get(filename, {})
+        headers = {}
+        if entry.get("etag") is not None:
+            headers["If-None-Match"] = str(entry["etag"])
+        if entry.get("last_modified") is not None:
+            headers["If-Modified-Since"] = str(entry["last_modified"])
+        else:
+            headers["If-Modified-Since"] = formatdate(stat[1] / 1e9, usegmt=True)
+        return headers
+
+    def record(
+        self,
+        filename: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Record validators and current size and time of a file."""
+        stat = self._stat(filename)
+        if stat is None:
+            return
+        self.entries[filename] = {
+            "size": stat[0],
+            "mtime_ns": stat[1],
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def save(self) -> None:
+        """Write manifest atomically."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.entries))
+        tmp_path.replace(self.path)
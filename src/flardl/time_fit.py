@@ -0,0 +1,128 @@
+"""Online fit of service time to file size, per the Equation of Time."""
+
+from typing import Optional
+
+from .common import BYTES_TO_MEGABITS
+from .common import DEFAULT_N_MIN
+from .common import HOL_RESIDUAL_FACTOR
+from .common import NUMERIC_TYPE
+from .common import TIME_FIT_DECAY
+
+
+class EquationOfTimeFit:
+    """Exponentially-weighted least-squares fit of t = L + S/B_eff + H.
+
+    Service times t (ms) are regressed on file sizes S (bytes) with
+    weights decaying by decay per observation, so the fit follows
+    changing conditions.  Once n_min observations are in, those with
+    residuals above hol_factor times the running mean absolute
+    residual are taken to include head-of-line latency H; they are
+    left out of the fit and their residuals averaged as the estimate
+    of H.  Slope 1/B_eff includes acknowledgement latency, so B_eff
+    is the effective bandwidth of a single transfer.
+    """
+
+    __slots__ = (
+        "_sw",
+        "_sx",
+        "_sxx",
+        "_sxy",
+        "_sy",
+        "decay",
+        "hol_factor",
+        "hol_fraction",
+        "hol_ms",
+        "n_hol",
+        "n_min",
+        "n_obs",
+        "scale",
+    )
+
+    def __init__(
+        self,
+        decay: float = TIME_FIT_DECAY,
+        hol_factor: float = HOL_RESIDUAL_FACTOR,
+        n_min: int = DEFAULT_N_MIN,
+    ):
+        """Init empty fit."""
+        self.decay = decay
+        self.hol_factor = hol_factor
+        self.n_min = n_min
+        self.n_obs = 0
+        self.n_hol = 0
+        self.hol_ms = 0.0
+        self.hol_fraction = 0.0
+        self.scale: Optional[float] = None
+        self._sw = 0.0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    def coefficients(self) -> Optional[tuple[float, float]]:
+        """Return intercept (ms) and slope (ms/byte), or None if unfit."""
+        if self._sw == 0.0:
+            return None
+        mean_x = self._sx / self._sw
+        mean_y = self._sy / self._sw
+        var_x = self._sxx / self._sw - mean_x * mean_x
+        if var_x <= 1e-9 * max(mean_x * mean_x, 1.0):
+            return None
+        slope = (self._sxy / self._sw - mean_x * mean_y) / var_x
+        return mean_y - slope * mean_x, slope
+
+    def predict(self, n_bytes: NUMERIC_TYPE) -> Optional[float]:
+        """Return expected service time in ms without head-of-line latency."""
+        coeffs = self.coefficients()
+        if coeffs is None:
+            return None
+        return max(coeffs[0], 0.0) + max(coeffs[1], 0.0) * n_bytes
+
+    def add(self, n_bytes: NUMERIC_TYPE, service_t: NUMERIC_TYPE) -> None:
+        """Add an observation of service time in ms for file size in bytes."""
+        self.n_obs += 1
+        predicted = self.predict(n_bytes)
+        if predicted is not None and self.scale is not None:
+            residual = service_t - predicted
+            bounded = min(abs(residual), self.hol_factor * self.scale)
+            is_hol = self.n_obs > self.n_min and residual > bounded
+            self.scale = self.decay * self.scale + (1.0 - self.decay) * bounded
+            self.hol_fraction = self.decay * self.hol_fraction + (
+                1.0 - self.decay
+            ) * float(is_hol)
+            if is_hol:
+                self.n_hol += 1
+                self.hol_ms += (residual - self.hol_ms) / self.n_hol
+                return
+        elif predicted is not None:
+            self.scale = abs(service_t - predicted)
+        self._sw = self.decay * self._sw + 1.0
+        self._sx = self.decay * self._sx + n_bytes
+        self._sy = self.decay * self._sy + service_t
+        self._sxx = self.decay * self._sxx + n_bytes * n_bytes
+        self._sxy = self.decay * self._sxy + n_bytes * service_t
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        """Service latency L_j in ms."""
+        coeffs = self.coefficients()
+        if coeffs is None:
+            return None
+        return max(coeffs[0], 0.0)
+
+    @property
+    def bw_eff_mbps(self) -> Optional[float]:
+        """Effective single-transfer bandwidth in Mbit/s."""
+        coeffs = self.coefficients()
+        if coeffs is None or coeffs[1] <= 0.0:
+            return None
+        return 1000.0 * BYTES_TO_MEGABITS / coeffs[1]
+
+    def report(self) -> dict[str, Optional[float]]:
+        """Return fitted values."""
+        return {
+            "latency_ms": self.latency_ms,
+            "bw_eff_mbps": self.bw_eff_mbps,
+            "hol_ms": self.hol_ms if self.n_hol > 0 else None,
+            "hol_fraction": self.hol_fraction,
+        }
@@ -0,0 +1,159 @@
+"""Trace of request attempts for offline analysis."""
+
+import json
+import math
+from pathlib import Path
+from typing import Any
+
+# third-party imports
+import anyio
+import numpy as np
+
+from .common import TRACE_ROTATE_BYTES
+from .event_ring import EVENT_NAMES
+from .event_ring import LAUNCH
+
+
+PARQUET_SUFFIX = ".parquet"
+TRACE_FIELDS = (
+    "idx",
+    "server",
+    "depth",
+    "launch_t",
+    "first_byte_t",
+    "retire_t",
+    "bytes",
+    "status",
+    "retries",
+)
+
+
+class TraceSink:
+    """Writes one record per attempt from drained events.
+
+    Attempts end as retired, failed, or requeued for retry.  Times are
+    in milliseconds on the dispatcher's timer, and first_byte_t is
+    null if no response was received.  Existing files are replaced.
+    Records are buffered by add()
+    and written by flush() in a worker thread, as JSON lines or, if
+    the path ends in .parquet, as Parquet row groups (which requires
+    the optional pyarrow package, in the columnar extra).  Once a file
+    reaches rotate_bytes, writing goes on in a new file numbered
+    before the suffix.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        workers: list[str],
+        rotate_bytes: int = TRACE_ROTATE_BYTES,
+    ) -> None:
+        """Init with base path and worker names indexed by events."""
+        self.path = Path(path)
+        self.workers = workers
+        self.rotate_bytes = rotate_bytes
+        self.parquet = self.path.suffix == PARQUET_SUFFIX
+        self.n_files = 0
+        self.n_records = 0
+        self.fresh = True
+        self.buffer: list[dict[str, np.ndarray]] = []
+        self._writer: Any = None
+        self._lock = anyio.Lock()
+
+    @property
+    def current_path(self) -> Path:
+        """Return path of file being written."""
+        if self.n_files == 0:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}.{self.n_files}{self.path.suffix}")
+
+    def add(self, events: dict[str, np.ndarray]) -> None:
+        """Buffer attempts ended in a batch of events."""
+        ended = events["kind"] != LAUNCH
+        if ended.any():
+            self.buffer.append({key: column[ended] for key, column in events.items()})
+
+    async def flush(self) -> None:
+        """Write buffered records."""
+        async with self._lock:
+            if not self.buffer:
+                return
+            batches, self.buffer = self.buffer, []
+            columns = {
+                key: np.concatenate([batch[key] for batch in batches])
+                for key in batches[0]
+            }
+            await anyio.to_thread.run_sync(self.write, columns)
+
+    async def close(self) -> None:
+        """Write buffered records and close file.
+
+        A closed Parquet file cannot be appended to, so any records
+        written later go to the next numbered file.
+        """
+        await self.flush()
+        if self._writer is not None:
+            await anyio.to_thread.run_sync(self._writer.close)
+            self._writer = None
+            self.n_files += 1
+            self.fresh = True
+
+    def records(self, columns: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+        """Return records of attempts from event columns."""
+        return [
+            dict(zip(TRACE_FIELDS, values))
+            for values in zip(
+                columns["idx"].tolist(),
+                [self.workers[i] for i in columns["worker"].tolist()],
+                columns["depth"].tolist(),
+                columns["launch_t"].tolist(),
+                [
+                    None if math.isnan(t) else t
+                    for t in columns["first_byte_t"].tolist()
+                ],
+                columns["t"].tolist(),
+                columns["n_bytes"].tolist(),
+                [EVENT_NAMES[kind] for kind in columns["kind"].tolist()],
+                columns["retries"].tolist(),
+            )
+        ]
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        """Write records to current file, then rotate if it is full."""
+        records = self.records(columns)
+        self.n_records += len(records)
+        if self.parquet:
+            self.write_parquet(records)
+        else:
+            with self.current_path.open("w" if self.fresh else "a") as fh:
+                fh.writelines(json.dumps(record) + "\n" for record in records)
+        self.fresh = False
+        if self.current_path.stat().st_size >= self.rotate_bytes:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self.n_files += 1
+            self.fresh = True
+
+    def write_parquet(self, records: list[dict[str, Any]]) -> None:
+        """Write records as a row group of the current Parquet file."""
+        import pyarrow as pa  # type: ignore[import]
+        import pyarrow.parquet as pq  # type: ignore[import]
+
+        schema = pa.schema(
+            [
+                ("idx", pa.int64()),
+                ("server", pa.string()),
+                ("depth", pa.int32()),
+                ("launch_t", pa.float64()),
+                ("first_byte_t", pa.float64()),
+                ("retire_t", pa.float64()),
+                ("bytes", pa.int64()),
+                ("status", pa.string()),
+                ("retries", pa.int32()),
+            ]
+        )
+        table = pa.Table.from_pylist(records, schema=schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(str(self.current_path), table.schema)
+        self._writer.write_table(table)
@@ -3,12 +3,24 @@ from __future__ import annotations
 
 import contextlib
 import functools
+import logging
 import os
 from pathlib import Path
 from typing import Callable
 
+# third-party imports
+import httpx
+
+from flardl import MultiDispatcher
+from flardl import ServerDef
+
 
 NO_LEVEL_BELOW = 100
+FILE_SIZE = 200_000
+MOCK_SERVER_DEFS = [
+    ServerDef("a", "a.example.org"),
+    ServerDef("b", "b.example.org"),
+]
 
 
 @contextlib.contextmanager
@@ -37,3 +49,26 @@ def print_docstring() -> Callable:
         return wrapper
 
     return decorator
+
+
+def serve_file(request: httpx.Request) -> httpx.Response:
+    """Return fixed-size content, or 404 for bad paths."""
+    if "bad" in request.url.path:
+        return httpx.Response(404)
+    return httpx.Response(200, content=b"x" * FILE_SIZE)
+
+
+def mock_runner(output_dir, handler=serve_file, **kwargs) -> MultiDispatcher:
+    """Create a dispatcher whose clients use a mock transport."""
+    runner = MultiDispatcher(
+        MOCK_SERVER_DEFS,
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        output_dir=str(output_dir),
+        **kwargs,
+    )
+    for worker in runner.workers:
+        worker.client_transport = httpx.MockTransport(handler)
+        worker.client = worker.new_client()
+    return runner
@@ -1,4 +1,5 @@
 """Test stream stats functionality."""
+import numpy as np
 import pytest
 
 from flardl import ALL
@@ -12,6 +13,7 @@ from flardl import TOTAL
 from flardl import VALUE
 from flardl import StreamStats
 from flardl import WorkerStat
+from flardl.stream_stats import Stat
 
 # module imports
 from . import print_docstring
@@ -88,6 +90,28 @@ def test_worker_stat():
     return
 
 
+@print_docstring()
+def test_batch_stats():
+    """Test batch updates match one-at-a-time updates."""
+    values = np.random.default_rng(0).uniform(0.0, 100.0, size=1000)
+    single = Stat(history_len=10, rounding=3)
+    for value in values:
+        single.value = value
+    batch = Stat(history_len=10, rounding=3)
+    batch.set_values(values[:500])
+    batch.set_values(values[500:])
+    assert repr(batch) == repr(single)
+    assert batch.get(HIST) == single.get(HIST)
+    assert batch.get(RAVG) == round(float(values[-10:].mean()), 3)
+    with pytest.raises(KeyError):
+        batch.get("median")
+    int_stat = WorkerStat("count", ["worker0", ALL], rounding=0)
+    int_stat.set_values([1, 2, 3], worker="worker0")
+    assert int_stat.get(TOTAL) == 6
+    assert int_stat.get(MAX, worker="worker0") == 3
+    assert int_stat.get(NOBS) == 3
+
+
 @print_docstring()
 def test_stream_stats():
     """Test StreamStats functionality."""
@@ -124,11 +148,27 @@ def test_stream_stats():
         {"retirement_t": 988.2, "launch_t": 100.2, "bytes": 1.5 * 1024 * 1024},
         worker="worker1",
     )
-    assert qs.report_worker_stats() == {
-        "worker0": {"elapsed_t": 0.8, "dl_rate_maximum": 2.5, "bytes_total": 2.0},
-        "worker1": {"elapsed_t": 1.0, "dl_rate_maximum": 1.7, "bytes_total": 1.5},
-        "all": {"elapsed_t": 1.0, "dl_rate_maximum": 2.5, "bytes_total": 3.5},
+    worker_stats = qs.report_worker_stats()
+    assert worker_stats["worker0"] == {
+        "elapsed_t": 0.8,
+        "dl_rate_maximum": 2.5,
+        "bytes_total": 2.0,
+        "service_t_mode": 800.0,
+        "service_t_p50": 800.0,
+        "service_t_p95": 800.0,
+        "service_t_p99": 800.0,
+        "dl_rate_p50": 2.5,
+        "dl_rate_p95": 2.5,
+        "bytes_mode": 2097152,
     }
+    assert worker_stats["worker1"]["elapsed_t"] == 1.0
+    assert worker_stats["worker1"]["dl_rate_maximum"] == 1.7
+    assert worker_stats["worker1"]["bytes_total"] == 1.5
+    assert worker_stats["worker1"]["service_t_p99"] == 888.0
+    # sketch estimates are good to about 5%
+    assert worker_stats[ALL]["service_t_p50"] == 800.0
+    assert worker_stats[ALL]["service_t_p95"] == pytest.approx(888.0, rel=0.05)
+    assert worker_stats[ALL]["dl_rate_p95"] == 2.5
     assert qs.report_file_stats(worker="worker0") == {
         "retirement_t": 800.1,
         "launch_t": 0.1,
@@ -142,9 +182,9 @@ def test_stream_stats():
         "bytes": 2097152,
         "dl_rate_r_avg": None,
     }
-    assert qs.report_summary_stats(worker="worker0") == {
-        "Elapsed time, s": 0.8,
-        "Maximum per-file download rate, /s": 2.5,
-        "Total MB downloaded": 2.0,
-    }
+    summary_stats = qs.report_summary_stats(worker="worker0")
+    assert summary_stats["Elapsed time, s"] == 0.8
+    assert summary_stats["Maximum per-file download rate, /s"] == 2.5
+    assert summary_stats["Total MB downloaded"] == 2.0
+    assert summary_stats["95th-percentile service time, ns"] == 800.0
     return
@@ -0,0 +1,103 @@
+"""Test lazy reading of arguments."""
+
+import logging
+
+# third-party imports
+import pytest
+
+from flardl import INDEX_KEY
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.argument_source import ArgumentSource
+from flardl.common import FILENAME_KEY
+from flardl.common import PATH_KEY
+from flardl.common import MillisecondTimer
+from flardl.inflight_table import InflightTable
+from flardl.instrumented_streams import ArgumentStream
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+async def async_args(n: int):
+    """Generate indexed mock arguments asynchronously."""
+    for i in range(n):
+        yield {INDEX_KEY: i, "code": f"{i:04}", "file_type": "txt"}
+
+
+@pytest.mark.anyio()
+async def test_argument_source(tmp_path):
+    """Test reading from dictionaries, async iterables, and path files."""
+    source = ArgumentSource({"code": (str(i) for i in range(5)), "file_type": "txt"})
+    assert [a[INDEX_KEY] for a in await source.read(3)] == [0, 1, 2]
+    assert source.n_read == 3
+    assert not source.exhausted
+    assert len(await source.read_all()) == 2
+    assert source.exhausted
+    skipped: list = []
+    source = ArgumentSource(
+        async_args(6), skip=lambda a: a[INDEX_KEY] % 3 == 0, on_skip=skipped.append
+    )
+    assert [a[INDEX_KEY] for a in await source.read(10)] == [1, 2, 4, 5]
+    assert [a[INDEX_KEY] for a in skipped] == [0, 3]
+    assert source.n_skipped == 2
+    path_file = tmp_path / "paths.txt"
+    path_file.write_text("dir/a.txt\n\ndir/b.txt\n")
+    arg_list = await ArgumentSource(path_file).read_all()
+    assert arg_list[1] == {INDEX_KEY: 1, PATH_KEY: "dir/b.txt", FILENAME_KEY: "b.txt"}
+    # a string is a path, not an iterable of characters
+    assert await ArgumentSource(str(path_file)).read_all() == arg_list
+
+
+@pytest.mark.anyio()
+async def test_bounded_buffer():
+    """Test arguments are read no further than the buffer ahead."""
+    arg_q = ArgumentStream(
+        async_args(100), InflightTable(), MillisecondTimer(), buffer_size=10
+    )
+    assert arg_q.n_args == 0
+    for _i in range(6):
+        await arg_q.get(worker_name="a")
+    assert arg_q.n_args == 10
+    await arg_q.get(worker_name="a")
+    assert arg_q.n_args == 16
+    assert len(arg_q.scheduler) == 9
+
+
+@print_docstring()
+def test_lazy_multidispatcher():
+    """Test mock downloads from an unsized async iterable."""
+    n_items = 50
+    runner = MultiDispatcher(
+        [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")],
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+        arg_buffer=4,
+    )
+    result_list, fail_list, global_stats = runner.main(async_args(n_items))
+    assert len(result_list) + len(fail_list) == n_items
+    assert global_stats["requests"] == n_items
+
+
+@print_docstring()
+def test_path_file(tmp_path):
+    """Test downloads from a file of paths."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    path_file = tmp_path / "paths.txt"
+    path_file.write_text("".join(f"dir/file{i}.txt\n" for i in range(10)))
+    result_list, fail_list, global_stats = mock_runner(out_dir).main(path_file)
+    assert len(result_list) == 10
+    assert (out_dir / "file9.txt").stat().st_size == FILE_SIZE
@@ -0,0 +1,97 @@
+"""Test consuming results as they retire."""
+
+import logging
+
+# third-party imports
+import anyio
+import pytest
+
+from flardl import INDEX_KEY
+from flardl import MultiDispatcher
+from flardl import ServerDef
+
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+N_ITEMS = 50
+ARG_DICT = {
+    "code": [f"{i:04}" for i in range(N_ITEMS)],
+    "file_type": "txt",
+}
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+def mock_dispatcher() -> MultiDispatcher:
+    """Return mock dispatcher that fails some jobs."""
+    return MultiDispatcher(
+        [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")],
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+    )
+
+
+@print_docstring()
+def test_callbacks():
+    """Test records are passed to callbacks rather than returned."""
+    results = []
+    fails = []
+
+    async def on_failure(record):
+        """Collect failure record asynchronously."""
+        fails.append(record)
+
+    result_list, fail_list, global_stats = mock_dispatcher().main(
+        ARG_DICT, on_result=results.append, on_failure=on_failure
+    )
+    assert result_list == []
+    assert fail_list == []
+    assert len(results) == global_stats["downloaded"]
+    assert len(fails) == global_stats["failed"]
+    assert len(results) + len(fails) == N_ITEMS
+
+
+@print_docstring()
+def test_unsorted():
+    """Test sorting by index is optional."""
+    result_list, fail_list, global_stats = mock_dispatcher().main(
+        ARG_DICT, sort=False
+    )
+    assert len(result_list) + len(fail_list) == N_ITEMS
+    idxs = [r[INDEX_KEY] for r in result_list]
+    assert idxs != sorted(idxs)
+
+
+@pytest.mark.anyio()
+async def test_stream():
+    """Test records are streamed as they retire."""
+    n_received = 0
+    n_failed = 0
+    async with mock_dispatcher().stream(ARG_DICT, max_buffer_size=1) as records:
+        async for _record, failed in records:
+            n_received += 1
+            n_failed += failed
+    assert n_received == N_ITEMS
+    assert n_failed > 0
+
+
+@pytest.mark.anyio()
+async def test_stream_early_exit():
+    """Test leaving a stream early frees depth for a following run."""
+    dispatcher = mock_dispatcher()
+    async with dispatcher:
+        async with dispatcher.stream(ARG_DICT, max_buffer_size=1) as records:
+            async for _record in records:
+                break
+        assert all(s.gate.in_use == 0 for s in dispatcher.controller.servers.values())
+        assert all(not launches for launches in dispatcher.inflight.values())
+        with anyio.fail_after(30):
+            result_list, fail_list, global_stats = await dispatcher.run(ARG_DICT)
+    assert len(result_list) + len(fail_list) == N_ITEMS
@@ -0,0 +1,69 @@
+"""Test columnar result store."""
+
+import logging
+
+# third-party imports
+import numpy as np
+import pytest
+
+from flardl import INDEX_KEY
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.result_store import MISSING_INT
+from flardl.result_store import RETIRE_KEY
+from flardl.result_store import ResultStore
+
+from . import print_docstring
+
+
+@print_docstring()
+def test_result_store():
+    """Test typed columns, growth, sorting, and conversion back to records."""
+    store = ResultStore(capacity=2)
+    store.add({INDEX_KEY: 2, "worker": "a", "bytes": 10})
+    store.add({INDEX_KEY: 0, "worker": "b", "bytes": 20, "sync": "skipped"})
+    store.add({INDEX_KEY: 1, "worker": "a", "bytes": 5, "launch_t": 1.5})
+    store.add({INDEX_KEY: 3, "worker": None, "bytes": 2.5})
+    assert len(store) == 4
+    assert store.capacity == 4
+    assert store.column("bytes").dtype == np.float64
+    assert store.column("worker").dtype == np.int32
+    assert store.categories["worker"] == ["a", "b"]
+    store.sort()
+    assert list(store.column(INDEX_KEY)) == [0, 1, 2, 3]
+    assert store.records() == [
+        {INDEX_KEY: 0, "worker": "b", "bytes": 20.0, "sync": "skipped"},
+        {INDEX_KEY: 1, "worker": "a", "bytes": 5.0, "launch_t": 1.5},
+        {INDEX_KEY: 2, "worker": "a", "bytes": 10.0},
+        {INDEX_KEY: 3, "bytes": 2.5},
+    ]
+    frame = store.to_pandas()
+    assert list(frame["worker"].cat.categories) == ["a", "b"]
+    assert frame["worker"].isna().sum() == 1
+    with pytest.raises(TypeError):
+        store.add({INDEX_KEY: "four"})
+
+
+@print_docstring()
+def test_columnar_multidispatcher():
+    """Test mock downloads returned in columns."""
+    n_items = 50
+    runner = MultiDispatcher(
+        [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")],
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+    )
+    arg_dict = {
+        "code": [f"{i:04}" for i in range(n_items)],
+        "file_type": "txt",
+    }
+    results, fails, global_stats = runner.main(arg_dict, columnar=True)
+    assert isinstance(results, ResultStore)
+    assert len(results) + len(fails) == n_items
+    idxs = results.column(INDEX_KEY)
+    assert (np.diff(idxs) > 0).all()
+    assert (results.column(RETIRE_KEY) >= results.column("launch_t")).all()
+    assert (results.column("bytes") != MISSING_INT).all()
+    assert len(fails.categories["error"]) > 0
@@ -0,0 +1,37 @@
+"""Test streaming quantile sketch."""
+
+# third-party imports
+import numpy as np
+import pytest
+
+from flardl.quantile_sketch import LogHistogramSketch
+
+from . import print_docstring
+
+
+@print_docstring()
+def test_quantile_sketch():
+    """Test quantiles and mode of a long-tailed sample within bin accuracy."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=5.0, sigma=1.0, size=20000)
+    sketch = LogHistogramSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.mode() is None
+    sketch.add_many(values[:10000])
+    for value in values[10000:12000]:
+        sketch.add(value)
+    other = LogHistogramSketch()
+    other.add_many(values[12000:])
+    sketch.merge(other)
+    assert sketch.n_obs == len(values)
+    assert len(sketch.counts) < 200
+    for q in (0.5, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.06)
+    # log-binned mode is near the peak in log space, exp(mu)
+    q25, q75 = np.quantile(values, [0.25, 0.75])
+    assert q25 < sketch.mode() < q75
+    assert sketch.quantile(1.0) == pytest.approx(values.max(), rel=0.06)
+    sketch.add(0.0)
+    assert sketch.quantile(0.0) == 0.0
+    with pytest.raises(ValueError, match="bin widths"):
+        sketch.merge(LogHistogramSketch(bin_width=0.2))
@@ -0,0 +1,65 @@
+"""Test online Equation-of-Time fit."""
+
+# third-party imports
+import numpy as np
+import pytest
+
+from flardl import ALL
+from flardl import StreamStats
+from flardl.common import BYTES_TO_MEGABITS
+from flardl.time_fit import EquationOfTimeFit
+
+from . import print_docstring
+
+
+LATENCY = 20.0  # ms
+SLOPE = 1e-4  # ms per byte
+HOL_DELAY = 500.0  # ms
+HOL_PROB = 0.1
+
+
+def synthetic_times(n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return sizes and service times with occasional head-of-line delays."""
+    rng = np.random.default_rng(1)
+    sizes = rng.lognormal(11.0, 1.5, size=n)
+    times = LATENCY + SLOPE * sizes + rng.normal(0.0, 2.0, size=n)
+    times += HOL_DELAY * (rng.random(size=n) < HOL_PROB)
+    return sizes, times
+
+
+@print_docstring()
+def test_time_fit():
+    """Test latency, bandwidth, and head-of-line estimates."""
+    fit = EquationOfTimeFit()
+    assert fit.report()["latency_ms"] is None
+    fit.add(1000, 50.0)
+    assert fit.predict(1000) is None
+    for n_bytes, service_t in zip(*synthetic_times(2000)):
+        fit.add(n_bytes, service_t)
+    report = fit.report()
+    assert report["latency_ms"] == pytest.approx(LATENCY, rel=0.1)
+    bw_mbps = 1000.0 * BYTES_TO_MEGABITS / SLOPE
+    assert report["bw_eff_mbps"] == pytest.approx(bw_mbps, rel=0.05)
+    assert report["hol_ms"] == pytest.approx(HOL_DELAY, rel=0.2)
+    assert report["hol_fraction"] == pytest.approx(HOL_PROB, abs=0.05)
+    assert fit.predict(1e5) == pytest.approx(LATENCY + SLOPE * 1e5, rel=0.1)
+
+
+@print_docstring()
+def test_stream_stats_time_fit():
+    """Test fit is fed from stream stats updates."""
+    qs = StreamStats(["worker0"], history_len=0)
+    launch_t = 0.0
+    for n_bytes, service_t in zip(*synthetic_times(200)):
+        qs.update_stats(
+            {
+                "launch_t": launch_t,
+                "retirement_t": launch_t + service_t,
+                "bytes": int(n_bytes),
+            },
+            worker="worker0",
+        )
+        launch_t += 10.0
+    fits = qs.report_time_fits()
+    assert fits["worker0"]["latency_ms"] == pytest.approx(LATENCY, rel=0.2)
+    assert fits[ALL]["latency_ms"] == fits["worker0"]["latency_ms"]
@@ -0,0 +1,70 @@
+"""Test online fit of bandwidth saturation."""
+
+import math
+
+# third-party imports
+import numpy as np
+import pytest
+
+from flardl import LaunchController
+from flardl.common import MillisecondTimer
+from flardl.saturation_fit import SaturationFit
+
+from . import print_docstring
+
+
+B_EFF = 800.0  # Mbit/s
+D_SCALE = 6.0
+
+
+@print_docstring()
+def test_saturation_fit():
+    """Test B_eff and D_sat are recovered from noisy observations."""
+    rng = np.random.default_rng(0)
+    fit = SaturationFit()
+    assert fit.report() == {"bw_eff_mbps": None, "d_sat": None}
+    for _i in range(3000):
+        depth = int(rng.integers(0, 40))
+        fit.add(depth, B_EFF * (1.0 - math.exp(-depth / D_SCALE)) + rng.normal(0, 30))
+    assert fit.bw_eff_mbps == pytest.approx(B_EFF, rel=0.05)
+    assert fit.d_sat == pytest.approx(-D_SCALE * math.log(0.05), abs=3)
+    # no fit if saturated at the lowest depth
+    flat = SaturationFit()
+    for depth in range(1, 20):
+        flat.add(depth, B_EFF)
+    assert flat.d_sat is None
+
+
+@print_docstring()
+def test_saturation_limit():
+    """Test updated servers stop adding depth one past D_sat."""
+    inflight: dict = {"a": {}}
+    controller = LaunchController(MillisecondTimer(), inflight, n_min=3)
+    controller.add_server("a")
+    for depth in range(1, 30):
+        controller.saturation.add(depth, B_EFF * (1.0 - math.exp(-depth / 2.0)))
+    d_sat = controller.saturation.d_sat
+    assert d_sat is not None
+    inflight["a"] = {i: {} for i in range(d_sat + 1)}
+    # not limited before the server is characterized
+    assert not controller.limit_exceeded("a")
+    controller.servers["a"].n_retired = controller.n_min
+    assert controller.limit_exceeded("a")
+    # depth may probe one past D_sat
+    del inflight["a"][d_sat]
+    assert not controller.limit_exceeded("a")
+
+
+@print_docstring()
+def test_refit_interval():
+    """Test the fit is redone only after refit_obs observations."""
+    fit = SaturationFit(n_min=3, refit_obs=8)
+    for depth in range(1, 9):
+        fit.add(depth, B_EFF * (1.0 - math.exp(-depth / 2.0)))
+    first_fit = fit.fit()
+    assert first_fit is not None
+    for depth in range(9, 16):
+        fit.add(depth, B_EFF)
+    assert fit.fit() == first_fit
+    fit.add(16, B_EFF)
+    assert fit.fit() != first_fit
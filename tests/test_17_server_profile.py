@@ -0,0 +1,79 @@
+"""Test server profiles persisted between runs."""
+
+import json
+import logging
+import time
+
+# third-party imports
+import pytest
+
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.common import PROFILE_HALF_LIFE
+from flardl.launch_controller import INFORMED
+from flardl.launch_controller import NAIVE
+from flardl.server_profile import ProfileStore
+from flardl.server_profile import ServerProfile
+
+from . import print_docstring
+
+
+SERVER_DEFS = [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")]
+
+
+@print_docstring()
+def test_profile_store(tmp_path):
+    """Test age-decayed merging, expiry, and round trip."""
+    path = tmp_path / "profiles.json"
+    now = time.time()
+    old = ServerProfile(10.0, 100.0, latency_ms=30.0, updated=now - PROFILE_HALF_LIFE)
+    new = ServerProfile(20.0, 100.0, d_crit=4, updated=now)
+    merged = old.merge(new)
+    assert merged.weight == pytest.approx(1.5)
+    assert merged.modal_rate == pytest.approx((0.5 * 10.0 + 20.0) / 1.5)
+    assert merged.latency_ms == 30.0
+    assert merged.d_crit == 4
+    store = ProfileStore(str(path))
+    store.update("a", merged)
+    store.update("stale", ServerProfile(1.0, 1.0, updated=now - 10 * PROFILE_HALF_LIFE))
+    store.save()
+    reloaded = ProfileStore(str(path))
+    assert reloaded.get("a") == merged
+    # repeated updates within a session count the session once
+    for _i in range(3):
+        reloaded.update("a", new)
+    assert reloaded.get("a") == merged.merge(new)
+    assert reloaded.get("stale") is None
+    path.write_text("not json")
+    assert ProfileStore(str(path)).profiles == {}
+
+
+@print_docstring()
+def test_profiled_multidispatcher(tmp_path):
+    """Test profiles written by one run start the next one informed."""
+    profile_file = str(tmp_path / "profiles.json")
+    arg_dict = {
+        "code": [f"{i:04}" for i in range(100)],
+        "file_type": "txt",
+    }
+    runner = MultiDispatcher(
+        SERVER_DEFS,
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+        n_min=3,
+        profile_file=profile_file,
+    )
+    assert runner.controller.regime("aws") == NAIVE
+    runner.main(arg_dict)
+    saved = json.loads((tmp_path / "profiles.json").read_text())
+    assert set(saved) == {"aws", "us"}
+    assert saved["aws"]["modal_rate"] > 0.0
+    runner = MultiDispatcher(
+        SERVER_DEFS,
+        logger=logging.getLogger(__name__),
+        mock=True,
+        profile_file=profile_file,
+    )
+    assert runner.controller.regime("aws") == INFORMED
@@ -0,0 +1,39 @@
+"""Test connection-pool limits."""
+
+import logging
+
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.common import DEFAULT_QUEUE_DEPTH
+from flardl.downloader import pool_limits
+
+from . import print_docstring
+
+
+@print_docstring()
+def test_pool_limits():
+    """Test pools hold a connection per request, or per 100 HTTP/2 streams."""
+    limits = pool_limits(0, http2=False)
+    assert limits.max_connections == DEFAULT_QUEUE_DEPTH
+    assert limits.max_keepalive_connections == DEFAULT_QUEUE_DEPTH
+    assert pool_limits(16, http2=False).max_connections == 16
+    assert pool_limits(16, http2=True).max_connections == 1
+    assert pool_limits(250, http2=True).max_connections == 3
+
+
+@print_docstring()
+def test_worker_pools(tmp_path):
+    """Test worker clients get limits from their server definitions."""
+    runner = MultiDispatcher(
+        [
+            ServerDef("h1", "h1.example.org", queue_depth=4),
+            ServerDef("h2", "h2.example.org", transport_ver="2", queue_depth=32),
+        ],
+        logger=logging.getLogger(__name__),
+        quiet=True,
+        output_dir=str(tmp_path),
+    )
+    pools = {w.name: w.client._transport._pool for w in runner.workers}  # noqa: SLF001
+    assert pools["h1"]._max_connections == 4  # noqa: SLF001
+    assert pools["h2"]._max_connections == 1  # noqa: SLF001
+    assert pools["h2"]._http2  # noqa: SLF001
@@ -0,0 +1,64 @@
+"""Test worker client lifecycle."""
+
+# third-party imports
+import httpx
+import pytest
+
+from . import mock_runner
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+class CountingServer:
+    """Mock server that logs request methods."""
+
+    def __init__(self):
+        """Init request log."""
+        self.methods: list = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        """Serve small content."""
+        self.methods.append(request.method)
+        return httpx.Response(200, content=b"x" * 100)
+
+
+@pytest.mark.anyio()
+async def test_context_manager(tmp_path):
+    """Test probes on entry, client reuse across runs, and close on exit."""
+    server = CountingServer()
+    runner = mock_runner(tmp_path, handler=server, probe_path="")
+    clients = [w.client for w in runner.workers]
+    async with runner:
+        assert server.methods == ["HEAD", "HEAD"]
+        for batch in range(2):
+            names = [f"file{batch}_{i}" for i in range(5)]
+            result_list, fail_list, stats = await runner.run(
+                {"path": names, "out_filename": names}
+            )
+            assert len(result_list) == 5
+        assert [w.client for w in runner.workers] == clients
+    assert all(client.is_closed for client in clients)
+    assert server.methods.count("GET") == 10
+
+
+@print_docstring()
+def test_main_reopens(tmp_path):
+    """Test main reopens clients closed by a previous call."""
+    server = CountingServer()
+    runner = mock_runner(tmp_path, handler=server)
+    for batch in range(2):
+        names = [f"file{batch}_{i}" for i in range(5)]
+        result_list, fail_list, stats = runner.main(
+            {"path": names, "out_filename": names}
+        )
+        assert len(result_list) == 5
+        assert all(w.client.is_closed for w in runner.workers)
+    assert server.methods == ["GET"] * 10
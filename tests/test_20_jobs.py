@@ -0,0 +1,91 @@
+"""Test concurrent jobs sharing one dispatcher."""
+
+# third-party imports
+import anyio
+import pytest
+
+from flardl.job import JobCancelledError
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+def batch_args(prefix: str, n_files: int) -> dict:
+    """Return arguments for a batch of uniquely-named files."""
+    names = [f"{prefix}{i}.txt" for i in range(n_files)]
+    return {"path": names, "out_filename": names}
+
+
+@pytest.mark.anyio()
+async def test_overlapping_jobs(tmp_path):
+    """Test overlapping jobs with the same indices keep separate results."""
+    runner = mock_runner(tmp_path)
+    async with runner:
+        first = runner.submit(batch_args("a", 15))
+        second = runner.submit(batch_args("b", 10))
+        assert first.state in ("pending", "running")
+        assert runner.jobs == {first, second}
+        results_a, fails_a, stats_a = await first.wait()
+        results_b, fails_b, stats_b = await second.wait()
+        assert runner.jobs == set()
+    assert first.state == second.state == "done"
+    assert stats_a["job"] == 0
+    assert stats_b["job"] == 1
+    assert len(results_a) == stats_a["downloaded"] == 15
+    assert len(results_b) == stats_b["downloaded"] == 10
+    assert fails_a == fails_b == []
+    assert [r["idx"] for r in results_b] == list(range(10))
+    assert all(r["bytes"] == FILE_SIZE for r in results_a + results_b)
+    assert second.counts() == {"requests": 10, "downloaded": 10, "failed": 0}
+    assert runner.controller.depth_total() == 0
+    assert sum(runner.worker_counter.values()) == 25
+    assert sum(s.n_retired for s in runner.controller.servers.values()) == 25
+
+
+@pytest.mark.anyio()
+async def test_job_cancel_and_error(tmp_path):
+    """Test one job's cancellation or error leaves others to finish."""
+
+    def bad_priority(args):
+        """Raise on priority evaluation."""
+        _unused = (args,)
+        raise ValueError("no priority")
+
+    runner = mock_runner(tmp_path)
+    async with runner:
+        cancelled = runner.submit(batch_args("c", 200))
+        failed = runner.submit(batch_args("d", 5), priority=bad_priority)
+        good = runner.submit(batch_args("e", 5))
+        await anyio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(JobCancelledError):
+            await cancelled.wait()
+        with pytest.raises(ValueError, match="no priority"):
+            await failed.wait()
+        results, fails, stats = await good.wait()
+    assert (cancelled.state, failed.state, good.state) == (
+        "cancelled",
+        "failed",
+        "done",
+    )
+    assert len(results) == 5
+    assert all(s.gate.in_use == 0 for s in runner.controller.servers.values())
+    assert runner.controller.depth_total() == 0
+
+
+@print_docstring()
+def test_submit_outside_context(tmp_path):
+    """Test jobs may not be submitted outside async with."""
+    runner = mock_runner(tmp_path)
+    with pytest.raises(RuntimeError):
+        runner.submit(batch_args("f", 1))
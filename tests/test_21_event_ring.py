@@ -0,0 +1,111 @@
+"""Test event ring feeding stream stats."""
+
+# third-party imports
+import anyio
+import numpy as np
+import pytest
+
+from flardl import ALL
+from flardl import TOTAL
+from flardl import VALUE
+from flardl import StreamStats
+from flardl.common import STATS_INTERVAL
+from flardl.common import MillisecondTimer
+from flardl.event_ring import FAIL
+from flardl.event_ring import LAUNCH
+from flardl.event_ring import RETIRE
+from flardl.event_ring import EventRing
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+from . import serve_file
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+@print_docstring()
+def test_ring_wraparound():
+    """Test events drain in order across wraparound and overflow."""
+    ring = EventRing(["a", "b"], MillisecondTimer(), capacity=4)
+    assert ring.drain() is None
+    for idx in range(3):
+        ring.emit(LAUNCH, "a", idx)
+    assert list(ring.drain()["idx"]) == [0, 1, 2]
+    for idx in range(3, 9):
+        ring.emit(RETIRE, "b", idx, n_bytes=idx)
+    assert len(ring) == 4
+    assert ring.n_lost == 2
+    events = ring.drain()
+    assert list(events["idx"]) == [5, 6, 7, 8]
+    assert list(events["worker"]) == [1] * 4
+    assert len(ring) == 0
+
+
+@print_docstring()
+def test_add_events():
+    """Test a drained batch updates counts and retirement stats."""
+    timer = MillisecondTimer()
+    ring = EventRing(["a", "b"], timer)
+    stats = StreamStats(["a", "b"], history_len=0)
+    launch_t = timer.time() - 100.0
+    for idx in range(5):
+        ring.emit(LAUNCH, "a", idx)
+        ring.emit(RETIRE, "a", idx, launch_t=launch_t, n_bytes=1000)
+    ring.emit(LAUNCH, "b", 5)
+    ring.emit(FAIL, "b", 5, launch_t=launch_t)
+    stats.add_events(ring.drain())
+    counts = stats.report_event_counts()
+    assert counts["a"] == {"launched": 5, "retired": 5, "failed": 0, "requeued": 0}
+    assert counts["b"]["failed"] == 1
+    assert counts[ALL]["launched"] == 6
+    assert stats["bytes"].get(TOTAL, worker="a") == 5000
+    assert stats["bytes"].get(TOTAL, worker="b") is None
+    assert stats["service_t"].get(VALUE, worker="a") >= 100.0
+    assert stats["cum_rate"].get(VALUE, worker=ALL) > 0.0
+    assert np.isfinite(stats["dl_rate"].get(VALUE, worker="a"))
+
+
+@pytest.mark.anyio()
+async def test_live_stats(tmp_path):
+    """Test dispatcher stats are fed from events while a job runs."""
+    runner = mock_runner(tmp_path)
+    names = [f"file{i}.txt" for i in range(20)]
+    async with runner:
+        job = runner.submit({"path": names, "out_filename": names})
+        await anyio.sleep(2 * STATS_INTERVAL)
+        results, fails, stats = await job.wait()
+    counts = runner.queue_stats.report_event_counts()[ALL]
+    assert counts["launched"] == len(names)
+    assert counts["retired"] == stats["downloaded"] == len(names)
+    assert runner.queue_stats["bytes"].get(TOTAL) == len(names) * FILE_SIZE
+    assert set(runner.queue_stats.report_worker_stats()) == {"a", "b", ALL}
+
+
+@pytest.mark.anyio()
+async def test_direct_run_stats(tmp_path):
+    """Test a run awaited outside of async with drains stats as it goes."""
+
+    async def slow_file(request):
+        """Serve a file after a delay."""
+        await anyio.sleep(0.05)
+        return serve_file(request)
+
+    async def on_result(_record):
+        """Note retirements counted in stats when each record arrives."""
+        seen.append(runner.queue_stats.report_event_counts()[ALL]["retired"])
+
+    seen: list[int] = []
+    runner = mock_runner(tmp_path, handler=slow_file)
+    names = [f"file{i}.txt" for i in range(40)]
+    await runner.run({"path": names, "out_filename": names}, on_result=on_result)
+    assert len(seen) == len(names)
+    assert 0 < max(seen) < len(names)
+    assert runner.queue_stats.report_event_counts()[ALL]["retired"] == len(names)
@@ -0,0 +1,44 @@
+"""Test in-flight table."""
+
+# third-party imports
+import pytest
+
+from flardl.inflight_table import InflightTable
+
+from . import print_docstring
+
+
+@print_docstring()
+def test_inflight_table():
+    """Test depth counting, record recycling, and removal by owner."""
+    table = InflightTable()
+    launches = table["a"]
+    assert table == {"a": launches}
+    first, second = object(), object()
+    for count in range(1, 4):
+        record = launches.add(count, count * 10, 100.0 + count, 0.0, first)
+        assert record.queue_depth == count - 1
+    launches.add(4, 40, 104.0, 0.0, second)
+    assert len(launches) == 4
+    popped = launches.pop(2)
+    assert (popped.idx, popped.launch_t) == (20, 102.0)
+    assert 2 not in launches
+    assert launches.add(5, 50, 105.0, 0.0, second) is popped
+    assert launches[5].queue_depth == 3
+    with pytest.raises(KeyError):
+        launches.pop(2)
+    launches.discard(2)
+    launches.discard_owned(first)
+    assert sorted(record.idx for record in launches.values()) == [40, 50]
+    assert len(launches) == 2
+    assert sum(len(worker) for worker in table.values()) == 2
+
+
+@print_docstring()
+def test_first_launch_depth():
+    """Test the first launch on an idle worker has depth 0."""
+    launches = InflightTable()["a"]
+    assert launches.add(1, 10, 100.0, 0.0, None).queue_depth == 0
+    launches.pop(1)
+    assert launches.add(2, 20, 101.0, 0.0, None).queue_depth == 0
+    assert launches.add(3, 30, 102.0, 0.0, None).queue_depth == 1
@@ -0,0 +1,78 @@
+"""Test export of metrics."""
+
+import re
+
+# third-party imports
+import anyio
+import httpx
+import pytest
+
+from flardl.metrics import CONTENT_TYPE
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+N_FILES = 12
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+def sample_sum(text: str, name: str) -> float:
+    """Return sum of samples of a metric over servers."""
+    return sum(
+        float(value)
+        for value in re.findall(rf'^{name}{{server="\w+"}} (\S+)$', text, re.MULTILINE)
+    )
+
+
+def file_args(n_files: int) -> dict:
+    """Return arguments for a batch of files."""
+    names = [f"file{i}.txt" for i in range(n_files)]
+    return {"path": names, "out_filename": names}
+
+
+@print_docstring()
+def test_metrics_textfile(tmp_path):
+    """Test metrics are written to a textfile in OpenMetrics format."""
+    metrics_file = tmp_path / "flardl.prom"
+    runner = mock_runner(tmp_path, metrics_file=str(metrics_file))
+    runner.main(file_args(N_FILES))
+    text = metrics_file.read_text()
+    assert text.endswith("# EOF\n")
+    assert "# TYPE flardl_retired counter" in text
+    assert sample_sum(text, "flardl_launched_total") == N_FILES
+    assert sample_sum(text, "flardl_retired_total") == N_FILES
+    assert sample_sum(text, "flardl_downloaded_bytes_total") == N_FILES * FILE_SIZE
+    assert sample_sum(text, "flardl_inflight_depth") == 0
+    assert sample_sum(text, "flardl_soft_fails_total") == 0
+    assert 'flardl_service_seconds{server="all",quantile="0.5"}' in text
+    assert f'flardl_service_seconds_count{{server="all"}} {N_FILES}' in text
+    assert not list(tmp_path.glob(".flardl.prom.*"))
+
+
+@pytest.mark.anyio()
+async def test_metrics_http(tmp_path):
+    """Test metrics are served over HTTP while a job runs."""
+    runner = mock_runner(tmp_path, metrics_port=0)
+    async with runner:
+        with anyio.fail_after(5):
+            while runner.metrics.bound_port is None:
+                await anyio.sleep(0.01)
+        url = f"http://127.0.0.1:{runner.metrics.bound_port}"
+        await runner.submit(file_args(N_FILES)).wait()
+        runner.drain_stats()
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url + "/metrics")
+            missing = await client.get(url + "/")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    assert response.text.endswith("# EOF\n")
+    assert sample_sum(response.text, "flardl_retired_total") == N_FILES
+    assert missing.status_code == 404
@@ -0,0 +1,42 @@
+"""Test live progress display."""
+
+import io
+import re
+
+from . import mock_runner
+from . import print_docstring
+
+
+N_FILES = 12
+
+
+def file_args(n_files: int) -> dict:
+    """Return arguments for a batch of files."""
+    names = [f"file{i}.txt" for i in range(n_files)]
+    return {"path": names, "out_filename": names}
+
+
+@print_docstring()
+def test_progress_bars(tmp_path):
+    """Test bars show overall and per-server counts."""
+    runner = mock_runner(tmp_path, progress=True)
+    out = io.StringIO()
+    runner.progress.file = out
+    runner.main(file_args(N_FILES))
+    final_counts = dict(re.findall(r"\r(\w+)\s*: (\d+)file", out.getvalue()))
+    assert int(final_counts.pop("files")) == N_FILES
+    assert set(final_counts) == {"a", "b"}
+    assert sum(int(n) for n in final_counts.values()) == N_FILES
+    assert "depth=0" in out.getvalue()
+    assert runner.progress.bars == {}
+
+
+@print_docstring()
+def test_no_per_file_output(tmp_path, capsys):
+    """Test nothing is printed per file when progress is off."""
+    runner = mock_runner(tmp_path, progress=False)
+    for worker in runner.workers:
+        worker.quiet = False
+    runner.main(file_args(N_FILES))
+    assert runner.progress is None
+    assert ".txt" not in capsys.readouterr().out
@@ -0,0 +1,132 @@
+"""Test trace of request attempts."""
+
+import json
+
+# third-party imports
+import anyio
+import httpx
+import pytest
+
+from flardl.common import MillisecondTimer
+from flardl.event_ring import FAIL
+from flardl.event_ring import LAUNCH
+from flardl.event_ring import REQUEUE
+from flardl.event_ring import RETIRE
+from flardl.event_ring import EventRing
+from flardl.trace_sink import TRACE_FIELDS
+from flardl.trace_sink import TraceSink
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+from . import serve_file
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+def read_trace(paths) -> list[dict]:
+    """Return records of JSONL trace files."""
+    return [
+        json.loads(line) for path in paths for line in path.read_text().splitlines()
+    ]
+
+
+@pytest.mark.anyio()
+async def test_trace_rotation(tmp_path):
+    """Test attempts are written once each, rotating files when full."""
+    ring = EventRing(["a", "b"], MillisecondTimer())
+    trace = TraceSink(str(tmp_path / "trace.jsonl"), ["a", "b"], rotate_bytes=1000)
+    for idx in range(30):
+        ring.emit(LAUNCH, "a", idx)
+        kind = (RETIRE, REQUEUE, FAIL)[idx % 3]
+        ring.emit(kind, "b", idx, launch_t=1.0, n_bytes=idx, depth=2, retries=1)
+        if idx % 10 == 9:
+            trace.add(ring.drain())
+            await trace.flush()
+    await trace.close()
+    paths = sorted(tmp_path.glob("trace*.jsonl"))
+    assert [p.name for p in paths] == ["trace.1.jsonl", "trace.2.jsonl", "trace.jsonl"]
+    records = read_trace([paths[-1], *paths[:-1]])
+    assert [r["idx"] for r in records] == list(range(30))
+    assert tuple(records[0]) == TRACE_FIELDS
+    assert records[1]["status"] == "requeued"
+    assert records[2]["status"] == "failed"
+    assert records[3] == {
+        "idx": 3,
+        "server": "b",
+        "depth": 2,
+        "launch_t": 1.0,
+        "first_byte_t": None,
+        "retire_t": records[3]["retire_t"],
+        "bytes": 3,
+        "status": "retired",
+        "retries": 1,
+    }
+    assert trace.n_records == 30
+
+
+@print_docstring()
+def test_dispatcher_trace(tmp_path):
+    """Test a run traces each attempt, including retries and failures."""
+
+    def fail_once(request):
+        """Serve files, rejecting the first request for one of them."""
+        if request.url.path == "/file3.txt" and not seen:
+            seen.append(request)
+            return httpx.Response(503)
+        return serve_file(request)
+
+    seen: list = []
+    trace_file = tmp_path / "trace.jsonl"
+    runner = mock_runner(tmp_path, handler=fail_once, trace_file=str(trace_file))
+    names = [f"file{i}.txt" for i in range(10)]
+    results, fails, _stats = runner.main({"path": names, "out_filename": names})
+    records = read_trace([trace_file])
+    retired = [r for r in records if r["status"] == "retired"]
+    assert len(retired) == len(results) == 10
+    assert all(r["bytes"] == FILE_SIZE for r in retired)
+    assert all(r["launch_t"] <= r["first_byte_t"] <= r["retire_t"] for r in retired)
+    assert {r["server"] for r in records} <= {"a", "b"}
+    requeued = [r for r in records if r["status"] == "requeued"]
+    assert [r["idx"] for r in requeued] == [3]
+    assert [r["retries"] for r in records if r["idx"] == 3] == [0, 1]
+    assert fails == []
+
+
+@pytest.mark.anyio()
+async def test_trace_parquet(tmp_path):
+    """Test attempts are written as Parquet row groups, in a new file after close."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    ring = EventRing(["a"], MillisecondTimer())
+    trace = TraceSink(str(tmp_path / "trace.parquet"), ["a"])
+    for idx in range(4):
+        ring.emit(RETIRE, "a", idx, launch_t=1.0, n_bytes=10)
+        trace.add(ring.drain())
+        await trace.flush()
+    await trace.close()
+    ring.emit(RETIRE, "a", 4, launch_t=1.0, n_bytes=10)
+    trace.add(ring.drain())
+    await trace.close()
+    table = pq.read_table(tmp_path / "trace.parquet")
+    assert table.column_names == list(TRACE_FIELDS)
+    assert table.column("idx").to_pylist() == list(range(4))
+    assert pq.read_table(tmp_path / "trace.1.parquet").column("idx").to_pylist() == [4]
+
+
+@print_docstring()
+def test_direct_run_trace(tmp_path):
+    """Test a run outside of async with writes its trace when done."""
+    trace_file = tmp_path / "trace.jsonl"
+    runner = mock_runner(tmp_path, trace_file=str(trace_file))
+    names = [f"file{i}.txt" for i in range(5)]
+    anyio.run(runner.run, {"path": names, "out_filename": names})
+    records = read_trace([trace_file])
+    assert sorted(r["idx"] for r in records) == list(range(5))
+    assert runner.trace.buffer == []
@@ -0,0 +1,230 @@
+"""Test adaptilastic launch controller."""
+
+from collections import defaultdict
+
+import anyio
+import pytest
+
+from flardl import LaunchController
+from flardl.common import BYTES_TO_MEGABITS
+from flardl.common import DEFAULT_QUEUE_DEPTH
+from flardl.common import DEPTH_RECOVERY_N
+from flardl.common import NAIVE_BW_MBPS
+from flardl.common import REJECTION_HOLDOFF
+from flardl.common import MillisecondTimer
+from flardl.launch_controller import ARRIVING
+from flardl.launch_controller import INFORMED
+from flardl.launch_controller import NAIVE
+from flardl.launch_controller import UPDATED
+from flardl.launch_controller import DepthGate
+from flardl.launch_controller import modal_value
+
+from . import mock_runner
+from . import print_docstring
+from . import serve_file
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+@print_docstring()
+def test_modal_value():
+    """Test mode estimate is insensitive to a whale."""
+    assert modal_value([]) is None
+    values = [10.0] * 20 + [11.0] * 10 + [10000.0]
+    mode = modal_value(values)
+    assert mode is not None
+    assert 9.0 < mode < 12.0
+
+
+@print_docstring()
+def test_launch_regimes():
+    """Test transitions between regimes and resulting rates."""
+    inflight: dict = {}
+    controller = LaunchController(
+        MillisecondTimer(),
+        inflight,
+        modal_size=1024 * 1024,
+        bw_max_mbps=80.0,
+        n_min=3,
+        rate_max=1000.0,
+    )
+    controller.add_server("a")
+    controller.add_server("b")
+    assert controller.regime("a") == NAIVE
+    naive_rate = 80.0 / BYTES_TO_MEGABITS / (1024 * 1024)
+    assert controller.launch_rate("a") == pytest.approx(naive_rate)
+    # naive rates slow down with total queue depth
+    inflight["a"] = {1: {}, 2: {}}
+    assert controller.launch_rate("b") == pytest.approx(naive_rate / 3.0)
+    inflight["a"] = {}
+    controller.set_previous("b", modal_rate=5.0, bw_mbps=40.0)
+    assert controller.regime("b") == INFORMED
+    assert controller.launch_rate("b") == pytest.approx(10.0)
+    # first arrival anywhere moves all servers to arriving
+    controller.retire("a", controller.timer.time() - 100.0, 1024)
+    assert controller.regime("a") == ARRIVING
+    assert controller.regime("b") == ARRIVING
+    for _i in range(2):
+        controller.retire("a", controller.timer.time() - 100.0, 1024)
+    assert controller.regime("a") == UPDATED
+    assert controller.regime("b") == ARRIVING
+    # updated rate keeps the depth limit in flight at the modal rate
+    modal_rate = controller.servers["a"].modal_rate()
+    assert 5.0 < modal_rate < 20.0
+    assert controller.launch_rate("a") == pytest.approx(
+        modal_rate * DEFAULT_QUEUE_DEPTH
+    )
+    assert controller.bandwidth_mbps() > 0.0
+    assert not controller.limit_exceeded("a")
+
+
+@print_docstring()
+def test_unshaped_default():
+    """Test downloads are shaped and limited only if B_max is set."""
+    controller = LaunchController(
+        MillisecondTimer(), {}, modal_size=1024 * 1024, rate_max=1000.0
+    )
+    controller.add_server("a")
+    assert controller.shaper.global_bucket is None
+    naive_rate = NAIVE_BW_MBPS / BYTES_TO_MEGABITS / (1024 * 1024)
+    assert controller.launch_rate("a") == pytest.approx(naive_rate)
+    controller.retire("a", controller.timer.time() - 100.0, 10**9)
+    assert controller.bandwidth_mbps() > NAIVE_BW_MBPS
+    assert not controller.limit_exceeded("a")
+    shaped = LaunchController(MillisecondTimer(), {}, bw_max_mbps=80.0)
+    shaped.add_server("a")
+    assert shaped.shaper.global_bucket is not None
+    shaped.retire("a", shaped.timer.time() - 100.0, 10**9)
+    assert shaped.limit_exceeded("a")
+
+
+@print_docstring()
+def test_queue_depth_limits():
+    """Test D_max reduction on rejection and D_crit estimate."""
+    controller = LaunchController(MillisecondTimer(), {}, n_min=3)
+    controller.add_server("a", d_max=4)
+    controller.add_server("b")
+    assert controller.gate("b").limit == DEFAULT_QUEUE_DEPTH
+    gate = controller.gate("a")
+    assert gate.limit == 4
+    gate.in_use = 3
+    controller.reject("a")
+    assert gate.limit == 2
+    gate.in_use = 0
+    now = controller.timer.time()
+    for _i in range(3):
+        controller.retire("a", now - 100.0, 1024, queue_depth=0)
+        controller.retire("a", now - 110.0, 1024, queue_depth=1)
+    assert controller.servers["a"].d_crit is None
+    for _i in range(3):
+        controller.retire("a", now - 500.0, 1024, queue_depth=2)
+    assert controller.servers["a"].d_crit == 2
+    assert gate.limit == 2
+    controller.servers["a"].d_max = 8
+    for _i in range(4):
+        controller.retire("a", now - 1000.0, 1024, queue_depth=1)
+    assert controller.servers["a"].d_crit == 1
+    assert gate.limit == 1
+
+
+@print_docstring()
+def test_rejection_recovery():
+    """Test D_max is cut once per rejection episode and then recovers."""
+    controller = LaunchController(MillisecondTimer(), {}, n_min=3)
+    controller.add_server("a")
+    state = controller.servers["a"]
+    gate = controller.gate("a")
+    gate.in_use = DEFAULT_QUEUE_DEPTH
+    for _i in range(DEFAULT_QUEUE_DEPTH):
+        controller.reject("a")
+    assert state.d_max == DEFAULT_QUEUE_DEPTH - 1
+    state.last_cut_t = controller.timer.time() - 2 * REJECTION_HOLDOFF
+    controller.reject("a")
+    assert state.d_max == DEFAULT_QUEUE_DEPTH - 2
+    gate.in_use = 0
+    now = controller.timer.time()
+    for _i in range(2 * DEPTH_RECOVERY_N):
+        controller.retire("a", now - 100.0, 1024)
+    assert state.d_max == DEFAULT_QUEUE_DEPTH
+    assert gate.limit == DEFAULT_QUEUE_DEPTH
+    for _i in range(DEPTH_RECOVERY_N):
+        controller.retire("a", now - 100.0, 1024)
+    assert state.d_max == DEFAULT_QUEUE_DEPTH
+
+
+@pytest.mark.anyio()
+async def test_depth_gate():
+    """Test depth gate blocks at limit until released."""
+    gate = DepthGate(1)
+    await gate.acquire()
+    acquired = []
+
+    async def second():
+        await gate.acquire()
+        acquired.append(True)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(second)
+        await anyio.sleep(0.01)
+        assert acquired == []
+        gate.release()
+    assert acquired == [True]
+    assert gate.in_use == 1
+
+
+def depth_sampler(latency_s: float, samples: dict[str, list[int]], runner_ref: list):
+    """Return a slow handler sampling depth on characterized servers."""
+    in_flight: dict[str, int] = defaultdict(int)
+
+    async def handler(request):
+        """Serve a file after latency, sampling depth at arrival."""
+        name = request.url.host.split(".")[0]
+        in_flight[name] += 1
+        controller = runner_ref[0].controller
+        if controller.servers[name].n_retired >= controller.n_min:
+            samples[name].append(in_flight[name])
+        try:
+            await anyio.sleep(latency_s)
+        finally:
+            in_flight[name] -= 1
+        return serve_file(request)
+
+    return handler
+
+
+@print_docstring()
+def test_sustained_depth(tmp_path):
+    """Test characterized servers keep more than one request in flight."""
+    samples: dict[str, list[int]] = defaultdict(list)
+    runner_ref: list = []
+    runner = mock_runner(tmp_path, handler=depth_sampler(0.05, samples, runner_ref))
+    runner_ref.append(runner)
+    names = [f"file{i}.txt" for i in range(200)]
+    results, fails, _stats = runner.main({"path": names, "out_filename": names})
+    assert len(results) == len(names)
+    assert fails == []
+    for name in ("a", "b"):
+        assert samples[name]
+        assert sum(samples[name]) / len(samples[name]) > 2.0
+
+
+@print_docstring()
+def test_depth_limit_reached(tmp_path):
+    """Test dispatch on a slow transport runs each server up to its depth limit."""
+    samples: dict[str, list[int]] = defaultdict(list)
+    runner_ref: list = []
+    runner = mock_runner(tmp_path, handler=depth_sampler(0.1, samples, runner_ref))
+    runner_ref.append(runner)
+    names = [f"file{i}.txt" for i in range(120)]
+    results, fails, _stats = runner.main({"path": names, "out_filename": names})
+    assert len(results) == len(names)
+    assert fails == []
+    for name in ("a", "b"):
+        assert max(samples[name]) == runner.controller.servers[name].depth_limit()
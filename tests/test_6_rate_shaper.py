@@ -0,0 +1,37 @@
+"""Test token-bucket rate shaping."""
+
+import pytest
+
+from flardl.common import BYTES_TO_MEGABITS
+from flardl.rate_shaper import RateShaper
+from flardl.rate_shaper import TokenBucket
+
+from . import print_docstring
+
+
+MBPS_PER_MBYTE = 1.0e6 * BYTES_TO_MEGABITS
+
+
+@print_docstring()
+def test_token_bucket():
+    """Test burst allowance and debt-based waits."""
+    bucket = TokenBucket(MBPS_PER_MBYTE, burst_time=0.1)
+    assert bucket.rate == pytest.approx(1.0e6)
+    assert bucket.reserve(100_000) == 0.0
+    assert bucket.reserve(100_000) == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve(200_000) == pytest.approx(0.3, abs=0.01)
+
+
+@print_docstring()
+def test_rate_shaper():
+    """Test waits are the larger of global and per-server waits."""
+    shaper = RateShaper(0.0)
+    shaper.add_server("unlimited")
+    assert shaper.reserve("unlimited", 10**9) == 0.0
+    shaper = RateShaper(10.0 * MBPS_PER_MBYTE)
+    shaper.add_server("fast")
+    shaper.add_server("slow", bw_limit_mbps=MBPS_PER_MBYTE)
+    assert shaper.reserve("fast", 1_000_000) == 0.0
+    assert shaper.reserve("fast", 1_000_000) == pytest.approx(0.1, abs=0.01)
+    assert shaper.reserve("slow", 100_000) == pytest.approx(0.11, abs=0.01)
+    assert shaper.reserve("slow", 100_000) == pytest.approx(0.12, abs=0.01)
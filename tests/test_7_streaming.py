@@ -0,0 +1,236 @@
+"""Test streaming downloads against a mock transport."""
+
+from functools import partial
+from pathlib import Path
+
+# third-party imports
+import anyio
+import httpx
+import pytest
+
+from flardl.common import DEFAULT_CHUNK_SIZE
+from flardl.common import PARTIAL_SUFFIX
+from flardl.instrumented_streams import RacerResultStream
+from flardl.partial_journal import PartialJournal
+
+from . import FILE_SIZE
+from . import mock_runner
+from . import print_docstring
+
+
+ANYIO_BACKEND = "asyncio"
+
+
+@pytest.fixture()
+def anyio_backend():
+    """Select backend for testing."""
+    return ANYIO_BACKEND
+
+
+@print_docstring()
+def test_stream_to_disk(tmp_path):
+    """Test chunks are written to files renamed on completion."""
+    n_files = 20
+    runner = mock_runner(tmp_path)
+    names = [f"file{i}.txt" for i in range(n_files)]
+    result_list, fail_list, global_stats = runner.main(
+        {"path": [*names, "bad"], "out_filename": [*names, "bad.txt"]}
+    )
+    assert len(result_list) == n_files
+    assert len(fail_list) == 1
+    assert all(r["bytes"] == FILE_SIZE for r in result_list)
+    for name in names:
+        assert (tmp_path / name).stat().st_size == FILE_SIZE
+    assert not list(Path(tmp_path).glob("*" + PARTIAL_SUFFIX))
+    assert not (tmp_path / "bad.txt").exists()
+
+
+class FailingStream(httpx.AsyncByteStream):
+    """Byte stream that fails after sending part of its content."""
+
+    def __init__(self, content: bytes, n_ok: int):
+        """Init with content and bytes to send before failing."""
+        self.content = content
+        self.n_ok = n_ok
+
+    async def __aiter__(self):
+        """Yield partial content, then raise a read error."""
+        yield self.content[: self.n_ok]
+        raise httpx.ReadError("connection reset (expected)")
+
+
+class RangeServer:
+    """Mock server that fails once mid-transfer and honors ranges."""
+
+    def __init__(self, honor_ranges: bool = True):
+        """Init request log."""
+        self.content = bytes(range(256)) * (FILE_SIZE // 256)
+        self.honor_ranges = honor_ranges
+        self.ranges: list = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        """Serve content, failing the first request halfway."""
+        headers = {"ETag": '"abc"'}
+        self.ranges.append(request.headers.get("Range"))
+        if len(self.ranges) == 1:
+            return httpx.Response(
+                200,
+                headers=headers,
+                stream=FailingStream(self.content, len(self.content) // 2),
+            )
+        if request.headers.get("Range") and self.honor_ranges:
+            start = int(request.headers["Range"][6:-1])
+            headers["Content-Range"] = f"bytes {start}-{len(self.content) - 1}/*"
+            return httpx.Response(206, headers=headers, content=self.content[start:])
+        return httpx.Response(200, headers=headers, content=self.content)
+
+
+@pytest.mark.parametrize("honor_ranges", [True, False])
+@print_docstring()
+def test_resume_partial(tmp_path, honor_ranges):
+    """Test a failed transfer resumes with a Range request."""
+    server = RangeServer(honor_ranges=honor_ranges)
+    runner = mock_runner(tmp_path, handler=server, worker_list=["a"])
+    result_list, fail_list, global_stats = runner.main(
+        {"path": ["file.bin"], "out_filename": ["file.bin"]}
+    )
+    assert len(fail_list) == 0
+    # only whole chunks were written before the failure
+    offset = (len(server.content) // 2 // DEFAULT_CHUNK_SIZE) * DEFAULT_CHUNK_SIZE
+    assert server.ranges == [None, f"bytes={offset}-"]
+    assert (tmp_path / "file.bin").read_bytes() == server.content
+    assert not list(Path(tmp_path).glob("*" + PARTIAL_SUFFIX + "*"))
+    if honor_ranges:
+        assert result_list[0]["bytes"] == len(server.content) - offset
+    else:
+        assert result_list[0]["bytes"] == len(server.content)
+
+
+class ConditionalServer:
+    """Mock server that answers conditional GETs."""
+
+    def __init__(self):
+        """Init request log."""
+        self.conditions: list = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        """Serve content, or 304 if the ETag matches."""
+        self.conditions.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200, headers={"ETag": '"v1"'}, content=b"x" * FILE_SIZE
+        )
+
+
+@print_docstring()
+def test_incremental_sync(tmp_path):
+    """Test skip and conditional sync of a previously-downloaded directory."""
+    names = [f"file{i}.txt" for i in range(4)]
+    arg_dict = {"path": names, "out_filename": names}
+    server = ConditionalServer()
+    result_list, fail_list, stats = mock_runner(
+        tmp_path, handler=server, sync="skip"
+    ).main(arg_dict)
+    assert stats["skipped"] == 0
+    assert [r["sync"] for r in result_list] == ["downloaded"] * 4
+    # skip unchanged files, fetch a locally-modified one
+    (tmp_path / names[0]).write_text("changed")
+    server.conditions.clear()
+    result_list, fail_list, stats = mock_runner(
+        tmp_path, handler=server, sync="skip"
+    ).main(arg_dict)
+    assert stats["skipped"] == 3
+    assert stats["downloaded"] == 1
+    assert [r["sync"] for r in result_list] == ["downloaded"] + ["skipped"] * 3
+    assert len(server.conditions) == 1
+    # conditional GETs of all files are not modified
+    server.conditions.clear()
+    result_list, fail_list, stats = mock_runner(
+        tmp_path, handler=server, sync="conditional"
+    ).main(arg_dict)
+    assert server.conditions == ['"v1"'] * 4
+    assert [r["sync"] for r in result_list] == ["unmodified"] * 4
+    assert (tmp_path / names[0]).stat().st_size == FILE_SIZE
+
+
+class StragglerServer:
+    """Mock server on which the first request for a file stalls."""
+
+    STALL_S = 10.0
+
+    def __init__(self):
+        """Init request log."""
+        self.hosts: dict = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        """Stall the first request for the straggler file."""
+        path = request.url.path
+        self.hosts.setdefault(path, []).append(request.url.host)
+        if path.endswith("straggler") and len(self.hosts[path]) == 1:
+            await anyio.sleep(self.STALL_S)
+        return httpx.Response(200, content=b"x" * FILE_SIZE)
+
+
+@print_docstring()
+def test_hedged_requests(tmp_path):
+    """Test a straggling request is raced on the other server."""
+    server = StragglerServer()
+    runner = mock_runner(tmp_path, handler=server, hedge_percentile=95.0, n_min=3)
+    # launched first, before its server is characterized
+    names = ["straggler"] + [f"file{i}" for i in range(30)]
+    result_list, fail_list, global_stats = runner.main(
+        {"path": names, "out_filename": names}
+    )
+    assert len(result_list) == len(names)
+    assert len(fail_list) == 0
+    first_host, second_host = server.hosts["/straggler"]
+    assert first_host != second_host
+    assert result_list[0]["worker"] == second_host[0]
+    assert not list(Path(tmp_path).glob("*" + PARTIAL_SUFFIX + "*"))
+    assert runner.controller.depth_total() == 0
+
+
+class SlowResults:
+    """Result stream whose puts yield before they are recorded."""
+
+    def __init__(self):
+        """Init record of puts."""
+        self.puts: list = []
+
+    async def put(self, args, /, worker_name, worker_count):
+        """Record put after yielding to other tasks."""
+        await anyio.sleep(0)
+        self.puts.append((args["idx"], worker_name, worker_count))
+
+
+@pytest.mark.anyio()
+async def test_racer_results():
+    """Test racers finishing together put one result, from the first."""
+    result_q = SlowResults()
+    winners: list[str] = []
+    async with anyio.create_task_group() as tg:
+        for name in ("a", "b"):
+            racer_q = RacerResultStream(result_q, winners)  # type: ignore[arg-type]
+            tg.start_soon(
+                partial(racer_q.put, {"idx": 3}, worker_name=name, worker_count=1)
+            )
+    assert winners == ["a"]
+    assert result_q.puts == [(3, "a", 1)]
+
+
+@print_docstring()
+def test_stale_partials_discarded(tmp_path):
+    """Test partials left on any server are removed once a file completes."""
+    for name in ("a", "b"):
+        part_path = tmp_path / f"stale.txt.{name}{PARTIAL_SUFFIX}"
+        part_path.write_bytes(b"x" * 100)
+        PartialJournal("https://elsewhere/stale.txt", etag='"v0"').save(
+            str(part_path)
+        )
+    result_list, fail_list, global_stats = mock_runner(tmp_path).main(
+        {"path": ["stale.txt"], "out_filename": ["stale.txt"]}
+    )
+    assert len(result_list) == 1
+    assert (tmp_path / "stale.txt").stat().st_size == FILE_SIZE
+    assert not list(Path(tmp_path).glob("*" + PARTIAL_SUFFIX + "*"))
@@ -0,0 +1,49 @@
+"""Test size-aware scheduling."""
+
+import logging
+
+from flardl import INDEX_KEY
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.size_schedule import schedule_by_size
+
+from . import print_docstring
+
+
+@print_docstring()
+def test_schedule_by_size():
+    """Test tiering of crappies and descending order of the rest."""
+    sizes = [100, 10, 11, 12, 13, 14, 15, 16, 17, 12, 13, 50, 1000]
+    arg_list = [{INDEX_KEY: i} for i in range(len(sizes))]
+    first, second = schedule_by_size(arg_list, sizes, n_servers=2, n_first=6)
+    first_sizes = [sizes[a[INDEX_KEY]] for a in first]
+    second_sizes = [sizes[a[INDEX_KEY]] for a in second]
+    assert first_sizes == [10, 11, 17, 16, 12, 12]
+    assert second_sizes == [1000, 100, 50, 15, 14, 13, 13]
+    # unknown sizes are modal
+    first, second = schedule_by_size(
+        arg_list, {0: 1000, 1: 10, 2: 10}, n_servers=2, n_first=2
+    )
+    assert len(first) == 2
+    assert second[0][INDEX_KEY] == 0
+
+
+@print_docstring()
+def test_sized_multidispatcher():
+    """Test mock downloads scheduled by size."""
+    n_items = 100
+    runner = MultiDispatcher(
+        [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")],
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+        n_min=3,
+    )
+    arg_dict = {
+        "code": [f"{i:04}" for i in range(n_items)],
+        "file_type": "txt",
+    }
+    sizes = [1000 + (i % 7) * 100 + (i == 50) * 10**6 for i in range(n_items)]
+    result_list, fail_list, global_stats = runner.main(arg_dict, file_sizes=sizes)
+    assert len(result_list) + len(fail_list) == n_items
@@ -0,0 +1,77 @@
+"""Test priority scheduling with affinity and stealing."""
+
+import logging
+
+import pytest
+
+from flardl import INDEX_KEY
+from flardl import MultiDispatcher
+from flardl import ServerDef
+from flardl.scheduler import RETRY_PRIORITY
+from flardl.scheduler import ArgumentScheduler
+
+from . import print_docstring
+
+
+def idx_list(scheduler: ArgumentScheduler, server: str, n: int) -> list[int]:
+    """Pop n arguments for a server and return their indices."""
+    return [scheduler.pop(server)[INDEX_KEY] for _i in range(n)]
+
+
+@print_docstring()
+def test_priority_order():
+    """Test priority order, FIFO among equals, and retries first."""
+    scheduler = ArgumentScheduler()
+    scheduler.extend(
+        [{INDEX_KEY: i} for i in range(6)], priority=lambda a: a[INDEX_KEY] % 2
+    )
+    assert len(scheduler) == 6
+    assert idx_list(scheduler, "a", 2) == [0, 2]
+    scheduler.push({INDEX_KEY: 2}, priority=RETRY_PRIORITY)
+    assert idx_list(scheduler, "a", 4) == [2, 4, 1, 3]
+    assert len(scheduler) == 1
+
+
+@print_docstring()
+def test_affinity_and_stealing():
+    """Test affine servers are preferred and idle servers steal."""
+    scheduler = ArgumentScheduler()
+    scheduler.extend(
+        [{INDEX_KEY: i} for i in range(4)],
+        affinity=lambda a: ("a", "b") if a[INDEX_KEY] < 3 else None,
+    )
+    assert idx_list(scheduler, "a", 1) == [0]
+    # entry taken via "a" is not offered again via "b"
+    assert idx_list(scheduler, "b", 1) == [1]
+    assert idx_list(scheduler, "c", 2) == [3, 2]
+    assert len(scheduler) == 0
+    with pytest.raises(IndexError):
+        scheduler.pop("a")
+    no_steal = ArgumentScheduler(steal=False)
+    no_steal.push({INDEX_KEY: 0}, servers=["a"])
+    with pytest.raises(IndexError):
+        no_steal.pop("b")
+    assert idx_list(no_steal, "a", 1) == [0]
+
+
+@print_docstring()
+def test_affinity_multidispatcher():
+    """Test mock downloads with affinity to servers."""
+    n_items = 50
+    runner = MultiDispatcher(
+        [ServerDef("aws", "s3.rcsb.org"), ServerDef("us", "files.rcsb.org")],
+        logger=logging.getLogger(__name__),
+        max_retries=2,
+        quiet=True,
+        mock=True,
+    )
+    arg_dict = {
+        "code": [f"{i:04}" for i in range(n_items)],
+        "file_type": "txt",
+    }
+    result_list, fail_list, global_stats = runner.main(
+        arg_dict,
+        priority=lambda a: -a[INDEX_KEY],
+        affinity=lambda a: ("aws",) if a[INDEX_KEY] % 2 else None,
+    )
+    assert len(result_list) + len(fail_list) == n_items